@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Both dashboards as one multipage app:
+#
+#     streamlit run app.py
+#
+# One process, one copy of the data: both pages read the snapshot held by
+# dashboard_data.py (both sheets, the geometry pack, the map views and the
+# segment cube), so switching pages reuses what the other page loaded instead
+# of running a second process with its own copy. The pages are the unchanged
+# dashboard scripts, which still run on their own as before.
+
+import streamlit as st
+
+st.set_page_config(page_title="Financial Resilience Dashboards - Canada", page_icon="🍁", layout="wide")
+
+pages = [
+    st.Page("dashboard_index_score.py", title="Financial Resilience Score", icon="🗺️", default=True),
+    st.Page("dashboard_segments.py", title="Financial Resilience Segments", icon="📊"),
+]
+st.navigation(pages).run()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Headless benchmark for both dashboards.
+#
+# Drives dashboard_index_score.py and dashboard_segments.py through
+# streamlit.testing.v1.AppTest over scripted interaction traces (survey rounds,
+# all/single/multi province selections, every chart type and the sidebar
+# presets) and reports, per app and data scale:
+#
+#     cold start   first run in a fresh process (imports, data load, cache fills)
+#     warm start   first run of a second session in the same process
+#     p50/p95      rerun latency over the trace
+#     peak RSS     of the process that ran the app
+#     payload      figure JSON bytes sent to the browser (median / max per rerun)
+#
+# Scales > 1 swap the workbook for synthetic data (synth_data.py) with more
+# survey rounds and sub-regions, up to 1000x the rows, to show how each code
+# path scales:
+#
+#     python benchmark.py                       # scales 1, 10, 100, 1000
+#     python benchmark.py --scales 1 10 --json bench.json
+#
+# Each (app, scale) runs in its own subprocess from a scratch directory holding
+# the scaled Parquet store, so the numbers don't leak between runs.
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import data_store
+import geo_pack
+import synth_data
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APPS = ["dashboard_index_score.py", "dashboard_segments.py"]
+DEFAULT_SCALES = [1, 10, 100, 1000]
+CHART_TYPES = ["Pie chart", "Bar chart", "Trended line chart"]
+
+# Extra survey rounds stop at 10x (decades of surveys); beyond that the data
+# grows through synthetic sub-regions of each province instead
+MAX_ROUND_FACTOR = 10
+
+
+# ───────────────────────────── Scaled datasets ─────────────────────────────
+
+def scale_frames(frames, factor, seed=0):
+    """
+    The workbook sheets at 1x; above that, synthetic sheets (synth_data.py) with
+    roughly `factor` times the rows, regions folded in as extra locations
+    """
+    if factor <= 1:
+        return frames
+    n_rounds = frames["Index_segment"]["Survey round"].nunique()
+    round_factor = min(factor, MAX_ROUND_FACTOR)
+    generated = synth_data.generate(
+        n_rounds=n_rounds * round_factor,
+        n_regions=math.ceil(factor / round_factor) - 1,
+        seed=seed
+    )
+    return synth_data.dashboard_frames(generated, include_regions=True)
+
+
+def prepare_scale(base_frames, factor, work_dir):
+    """Scratch directory with the scaled Parquet store and geometry pack for one scale"""
+    scale_dir = os.path.join(work_dir, f"scale_{factor}")
+    store_dir = os.path.join(scale_dir, data_store.STORE_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+    frames = scale_frames(base_frames, factor)
+    # Named source, so the apps serve this store as is
+    data_store.build_store(
+        store_dir=store_dir, frames=frames,
+        source=f"benchmark_{factor}x", source_sha256=synth_data.frames_hash(frames)
+    )
+    geojson = os.path.join(scale_dir, geo_pack.GEOJSON_PATH)
+    shutil.copyfile(os.path.join(REPO_DIR, geo_pack.GEOJSON_PATH), geojson)
+    geo_pack.build_pack(geojson, store_dir)
+    return scale_dir, {sheet: len(df) for sheet, df in frames.items()}
+
+
+# ─────────────────────────────── Traces ───────────────────────────────
+
+def _sample(values, limit):
+    """Up to `limit` evenly spaced values, always keeping the first and last"""
+    if limit is None or len(values) <= limit:
+        return list(values)
+    idx = np.unique(np.linspace(0, len(values) - 1, limit).round().astype(int))
+    return [values[i] for i in idx]
+
+
+def index_score_trace(at, max_rounds):
+    """Every survey round with all / one / several provinces selected"""
+    rounds = _sample(list(at.sidebar.selectbox[0].options), max_rounds)
+    provinces = [p for p in at.sidebar.multiselect[0].options if p != "All provinces"]
+    selections = [["All provinces"], provinces[:1], provinces[:5]]
+    for year in rounds:
+        for selection in selections:
+            at.sidebar.selectbox[0].set_value(year)
+            at.sidebar.multiselect[0].set_value(selection)
+            yield at
+
+
+def segments_trace(at, max_rounds):
+    """Each chart type over single/multi round and province selections, then the presets"""
+    years = list(at.multiselect(key="year_filter").options)
+    provinces = list(at.multiselect(key="province_filter").options)
+    latest = years[-1:]
+    selections = [
+        (latest, ["Canada (Overall)"]),
+        (years[-3:], ["Canada (Overall)"]),
+        (latest, provinces[:6]),
+        (years[-3:], provinces[:4]),
+        (latest, provinces),
+    ]
+    for chart_type in CHART_TYPES:
+        at.sidebar.radio[0].set_value(chart_type)
+        for year_sel, province_sel in selections:
+            at.multiselect(key="year_filter").set_value(year_sel)
+            at.multiselect(key="province_filter").set_value(province_sel)
+            yield at
+        # Every survey round on its own
+        for year in _sample(years, max_rounds):
+            at.multiselect(key="year_filter").set_value([year])
+            at.multiselect(key="province_filter").set_value(["Canada (Overall)"])
+            yield at
+
+    at.button(key="preset1").click()      # Latest Round
+    yield at
+    at.button(key="preset2").click()      # All Time
+    yield at
+    for button in at.sidebar.button:
+        if "Reset" in button.label:
+            button.click()
+    yield at
+
+
+TRACES = {
+    "dashboard_index_score.py": index_score_trace,
+    "dashboard_segments.py": segments_trace,
+}
+
+
+# ─────────────────────────────── Worker ───────────────────────────────
+
+def _payload_bytes(at):
+    return sum(len(chart.proto.spec) for chart in at.get("plotly_chart"))
+
+
+def _timed_run(at, timeout):
+    began = time.perf_counter()
+    at.run(timeout=timeout)
+    elapsed = time.perf_counter() - began
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def run_worker(app, max_rounds, timeout):
+    """Run one app over its trace from the current directory; returns the measurements"""
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, REPO_DIR)
+    script = os.path.join(REPO_DIR, app)
+
+    at = AppTest.from_file(script, default_timeout=timeout)
+    cold = _timed_run(at, timeout)
+    warm = _timed_run(AppTest.from_file(script, default_timeout=timeout), timeout)
+
+    latencies, payloads, errors = [], [_payload_bytes(at)], 0
+    for step in TRACES[app](at, max_rounds):
+        try:
+            latencies.append(_timed_run(step, timeout))
+            payloads.append(_payload_bytes(step))
+        except RuntimeError:
+            # Keep going; the failing selection still counts against the app
+            errors += 1
+
+    # POSIX only
+    import resource
+
+    return {
+        "cold_start_s": cold,
+        "warm_start_s": warm,
+        "reruns": len(latencies),
+        "errors": errors,
+        "p50_s": float(np.percentile(latencies, 50)) if latencies else None,
+        "p95_s": float(np.percentile(latencies, 95)) if latencies else None,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "payload_p50_bytes": int(np.percentile(payloads, 50)),
+        "payload_max_bytes": int(max(payloads)),
+    }
+
+
+def spawn_worker(app, scale_dir, max_rounds, timeout):
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", app, "--timeout", str(timeout)]
+    if max_rounds is not None:
+        cmd += ["--max-rounds", str(max_rounds)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(cmd, cwd=scale_dir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{app} failed:\n{proc.stderr[-2000:]}")
+    # The worker's result is its last line of output
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ─────────────────────────────── Report ───────────────────────────────
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+def print_report(results):
+    header = (f"{'app':<24}{'scale':>7}{'rows':>10}{'cold ms':>10}{'warm ms':>10}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}{'payload KB':>12}{'reruns':>8}{'err':>5}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['app'].replace('dashboard_', '').replace('.py', ''):<24}{r['scale']:>6}x{r['rows']:>10,}"
+              f"{_ms(r['cold_start_s']):>10}{_ms(r['warm_start_s']):>10}"
+              f"{_ms(r['p50_s']):>9}{_ms(r['p95_s']):>9}{r['peak_rss_mb']:>9.0f}"
+              f"{r['payload_p50_bytes'] / 1024:>6.0f}/{r['payload_max_bytes'] / 1024:<5.0f}"
+              f"{r['reruns']:>8}{r['errors']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark both dashboards headlessly with Streamlit's AppTest.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Data scale factors")
+    parser.add_argument("--apps", nargs="+", default=APPS, choices=APPS, help="Dashboards to benchmark")
+    parser.add_argument("--max-rounds", type=int, default=24,
+                        help="Cap on the survey rounds swept per trace (evenly sampled); 0 = every round")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-rerun timeout in seconds")
+    parser.add_argument("--workbook", default=os.path.join(REPO_DIR, data_store.WORKBOOK_PATH))
+    parser.add_argument("--work-dir", default=None, help="Keep the scaled datasets here instead of a temp dir")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    max_rounds = args.max_rounds or None
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, max_rounds, args.timeout)))
+        return
+
+    base_frames = data_store.read_workbook(args.workbook)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="fri_bench_")
+    results = []
+    try:
+        for factor in args.scales:
+            scale_dir, rows = prepare_scale(base_frames, factor, work_dir)
+            for app in args.apps:
+                print(f"{app} at {factor}x ({sum(rows.values()):,} rows)...", file=sys.stderr, flush=True)
+                result = spawn_worker(app, scale_dir, max_rounds, args.timeout)
+                results.append(dict(result, app=app, scale=factor, rows=sum(rows.values())))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In-browser explorer for the segments dashboard.
+#
+# Every filter change in dashboard_segments.py is a server round-trip: the
+# script reruns and a new figure is built and sent. Index_segment is small
+# (rounds x provinces x segments, a few hundred numbers), so this mode sends the
+# segment cube to the browser once, together with the figure skeletons of
+# figure_templates.py, and filtering, chart switching, the summary numbers and
+# the CSV download all happen in JavaScript with Plotly.js. Exploring costs the
+# server nothing; the page only reruns when the data itself changes.
+#
+# The charts follow segment_charts.py: same layouts (the skeletons are the ones
+# the server uses), colours, titles and chart per selection shape.
+#
+# Plotly.js is embedded in the page from the installed plotly package (about
+# 4.8 MB, once per session), so the dashboard stays self-contained. Set
+# FRI_PLOTLYJS=cdn to load the same version from cdn.plot.ly instead, where
+# browsers can reach it and the smaller page matters.
+
+import json
+import os
+
+import numpy as np
+
+from figure_templates import skeleton
+from resilience_categories import SEGMENT_COLORS
+from segment_charts import LINE_DASHES, NOT_SELECTED_COLOR, bar_grid_shape, palette
+
+PLOTLYJS_ENV = "FRI_PLOTLYJS"
+CANADA = "Canada (Overall)"
+# Pie grids hold up to six pies, three per row (see the dashboard's combinations)
+PIE_GRID_SHAPES = [(1, 2), (1, 3), (2, 3)]
+# The largest layout (a 4 x 4 bar grid) plus the controls; the frame scrolls beyond that
+FRAME_HEIGHT = 1800
+
+
+def _nested(values, present):
+    """(rounds, provinces, segments) arrays as nested lists; NaN becomes null"""
+    values = np.where(present & ~np.isnan(values), values, np.nan)
+    return [[[None if np.isnan(v) else float(v) for v in row] for row in plane] for plane in values]
+
+
+def explorer_payload(cube):
+    """Everything the page needs, JSON-able: labels, cube arrays, colours and figure skeletons"""
+    # Same province order as the server-side filter
+    provinces = [CANADA] + sorted(p for p in cube.provinces if p != CANADA)
+    order = [cube.provinces.index(p) for p in provinces if p in cube.provinces]
+    provinces = [cube.provinces[i] for i in order]
+    values = cube.values[:, order, :]
+    present = cube.present[:, order, :]
+
+    skeletons = {
+        "pie": skeleton("pie"),
+        "bar:by_province": skeleton("bar", "by_province"),
+        "bar:by_round": skeleton("bar", "by_round"),
+        "bar:segments": skeleton("bar", "segments"),
+        "hbar": skeleton("hbar"),
+        "line": skeleton("line"),
+    }
+    for rows, cols in PIE_GRID_SHAPES:
+        skeletons[f"pie_grid:{rows}x{cols}"] = skeleton("pie_grid", rows, cols)
+    for n in range(2, len(provinces) + 1):
+        grid = bar_grid_shape(n)
+        skeletons.setdefault(f"bar_grid:{grid[0]}x{grid[1]}", skeleton("bar_grid", *grid))
+
+    # Every skeleton carries the same "fri" template; send it once
+    skeletons = {key: dict(skel, layout=dict(skel["layout"])) for key, skel in skeletons.items()}
+    template = [skel["layout"].pop("template", None) for skel in skeletons.values()][0]
+
+    return {
+        "rounds": list(cube.rounds),
+        "provinces": provinces,
+        "segments": list(cube.segments),
+        "values": _nested(values, present),
+        "present": present.astype(int).tolist(),
+        "colors": SEGMENT_COLORS,
+        "notSelectedColor": NOT_SELECTED_COLOR,
+        "palettes": {"Plotly": list(palette("Plotly")), "Set2": list(palette("Set2"))},
+        "dashes": LINE_DASHES,
+        "skeletons": skeletons,
+        "template": template,
+    }
+
+
+def plotlyjs_tag():
+    import plotly.offline
+
+    if os.environ.get(PLOTLYJS_ENV, "").strip().lower() == "cdn":
+        version = plotly.offline.get_plotlyjs_version()
+        return f'<script src="https://cdn.plot.ly/plotly-{version}.min.js" charset="utf-8"></script>'
+    return f'<script type="text/javascript">{plotly.offline.get_plotlyjs()}</script>'
+
+
+def explorer_html(cube):
+    """The self-contained page, for st.iframe"""
+    # "</" would end the <script> element early
+    payload = json.dumps(explorer_payload(cube), separators=(",", ":")).replace("</", "<\\/")
+    return _PAGE.replace("%PLOTLYJS%", plotlyjs_tag()).replace("%PAYLOAD%", payload)
+
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+%PLOTLYJS%
+<style>
+  body { font-family: "Source Sans Pro", sans-serif; color: #262730; margin: 0 4px; }
+  .controls { display: flex; flex-wrap: wrap; gap: 12px; }
+  fieldset { border: 1px solid #e6e9ef; border-radius: 0.5rem; padding: 6px 10px; }
+  legend { font-weight: 600; font-size: 0.9rem; }
+  .checks { max-height: 150px; overflow-y: auto; font-size: 0.85rem; }
+  .checks label, .types label { display: block; white-space: nowrap; }
+  button { margin: 4px 4px 0 0; border: 1px solid #d0d3d9; border-radius: 0.4rem;
+           background: #fff; padding: 2px 8px; cursor: pointer; }
+  button:hover { border-color: #00AEEF; color: #00AEEF; }
+  .note { border-radius: 0.5rem; padding: 10px 14px; margin: 10px 0; font-size: 0.9rem; }
+  .info { background: #e8f4fb; } .warning { background: #fffbe6; } .success { background: #e9f7ef; }
+  .metrics { display: flex; gap: 32px; flex-wrap: wrap; margin: 8px 0; }
+  .metric .label { font-size: 0.85rem; color: #555; } .metric .value { font-size: 1.6rem; }
+  table { border-collapse: collapse; font-size: 0.85rem; margin: 8px 0; }
+  th, td { border: 1px solid #e6e9ef; padding: 4px 8px; text-align: right; }
+  th:first-child, td:first-child { text-align: left; }
+  hr { border: none; border-top: 1px solid #e6e9ef; margin: 16px 0; }
+</style>
+</head>
+<body>
+<div class="controls">
+  <fieldset class="types"><legend>📈 Chart type</legend>
+    <label><input type="radio" name="chart" value="Pie chart" checked> Pie chart</label>
+    <label><input type="radio" name="chart" value="Bar chart"> Bar chart</label>
+    <label><input type="radio" name="chart" value="Trended line chart"> Trended line chart</label>
+  </fieldset>
+  <fieldset><legend>📅 Survey Round(s)</legend>
+    <div class="checks" id="rounds"></div>
+    <button id="latest">Latest Round</button><button id="all-time">All Time</button>
+  </fieldset>
+  <fieldset><legend>📍 Location(s)</legend>
+    <div class="checks" id="provinces"></div>
+    <button id="all-provinces">All Provinces</button><button id="clear-provinces">Clear All</button>
+  </fieldset>
+  <fieldset><legend>🎯 Segments</legend>
+    <div class="checks" id="segments"></div>
+    <button id="all-segments">All Segments</button>
+  </fieldset>
+</div>
+<div id="subtitle"></div>
+<label id="horizontal-toggle" style="display:none"><input type="checkbox" id="horizontal"> Use horizontal bars</label>
+<div id="chart"></div>
+<div id="notes"></div>
+<div id="table"></div>
+<div id="summary"></div>
+<button id="download">📥 Download Filtered Data (CSV)</button>
+<script type="application/json" id="payload">%PAYLOAD%</script>
+<script>
+const D = JSON.parse(document.getElementById("payload").textContent);
+const state = {chart: "Pie chart", horizontal: null};
+
+// ── Data access ──────────────────────────────────────────────────────────
+const ri = label => D.rounds.indexOf(label), pi = label => D.provinces.indexOf(label),
+      si = label => D.segments.indexOf(label);
+const present = (r, p, s) => D.present[r][p][s] === 1;
+const value = (r, p, s) => D.values[r][p][s];
+const pct = (v, digits) => (v * 100).toFixed(digits === undefined ? 1 : digits) + "%";
+
+function checked(id) {
+  return Array.from(document.querySelectorAll("#" + id + " input:checked")).map(el => el.value);
+}
+function setChecked(id, labels) {
+  document.querySelectorAll("#" + id + " input").forEach(el => { el.checked = labels.includes(el.value); });
+}
+function selection() {
+  const segments = checked("segments");
+  return {
+    years: checked("rounds"),
+    // No province ticked means no province filter, as on the server
+    provinces: checked("provinces"),
+    segments: segments.length ? segments : D.segments.slice(),
+  };
+}
+function filterProvinces(sel) { return sel.provinces.length ? sel.provinces : D.provinces; }
+
+// Rows of the filtered table: [round, province, segment, proportion|null]
+function rows(sel) {
+  const out = [];
+  for (const y of sel.years) for (const p of filterProvinces(sel)) for (const s of sel.segments) {
+    const r = ri(y), q = pi(p), k = si(s);
+    if (r >= 0 && q >= 0 && k >= 0 && present(r, q, k)) out.push([y, p, s, value(r, q, k)]);
+  }
+  return out;
+}
+const maxOf = values => { const v = values.filter(x => x !== null); return v.length ? Math.max(...v) : 1; };
+
+// ── Figures from the shared skeletons ────────────────────────────────────
+const isObj = v => v !== null && typeof v === "object" && !Array.isArray(v);
+function merge(base, over) {
+  const out = Object.assign({}, base);
+  for (const [k, v] of Object.entries(over)) out[k] = isObj(v) && isObj(out[k]) ? merge(out[k], v) : v;
+  return out;
+}
+function build(kind, traces, layout, annotationTexts) {
+  const skel = JSON.parse(JSON.stringify(D.skeletons[kind]));
+  const data = traces.map(t => {
+    const trace = Object.assign({}, t);
+    const cell = trace.cell || 0;
+    delete trace.cell;
+    return merge(skel.data[cell], trace);
+  });
+  const figLayout = merge(skel.layout, layout || {});
+  figLayout.template = D.template;
+  if (annotationTexts) {
+    figLayout.annotations = figLayout.annotations.map(
+      (a, i) => (i in annotationTexts ? Object.assign({}, a, {text: annotationTexts[i]}) : a));
+  }
+  return {data: data, layout: figLayout};
+}
+
+function pieSlices(y, p, segments) {
+  const r = ri(y), q = pi(p);
+  let total = 0, selected = 0;
+  const labels = [], values = [], colors = [];
+  if (r < 0 || q < 0) return null;
+  D.segments.forEach((s, k) => {
+    if (!present(r, q, k)) return;
+    const v = value(r, q, k) || 0;  // missing proportions count as 0
+    total += v;
+    if (segments.includes(s)) { selected += v; labels.push(s); values.push(v); colors.push(D.colors[s]); }
+  });
+  const unselected = total - selected;
+  if (unselected > 0.001) { labels.push("Not Selected"); values.push(unselected); colors.push(D.notSelectedColor); }
+  return {labels, values, colors, selected, unselected, any: total > 0 || labels.length > 0};
+}
+
+function pieFigure(sel, notes) {
+  const {years, segments} = sel, provinces = filterProvinces(sel);
+  if (years.length > 1 || provinces.length > 1) {
+    let combos;
+    if (years.length > 1 && provinces.length > 1) {
+      combos = years.slice(0, 3).flatMap(y => provinces.slice(0, 2).map(p => [y, p])).slice(0, 6);
+    } else if (years.length > 1) {
+      combos = years.slice(0, 6).map(y => [y, provinces[0]]);
+    } else {
+      combos = provinces.slice(0, 6).map(p => [years[0], p]);
+    }
+    const cols = Math.min(3, combos.length), rowsN = Math.ceil(combos.length / cols);
+    const traces = combos.map(([y, p], idx) => {
+      const pie = pieSlices(y, p, segments) || {labels: [], values: [], colors: []};
+      return {cell: idx, labels: pie.labels, values: pie.values, marker: {colors: pie.colors},
+              pull: pie.labels.map(l => (l === "Not Selected" ? 0.03 : 0)), showlegend: idx === 0};
+    });
+    const titles = {};
+    combos.forEach(([y, p], idx) => { titles[idx] = y + " – " + p; });
+    if (segments.length < D.segments.length) {
+      notes.push(["info", "📊 Showing " + segments.length + " of " + D.segments.length +
+                  " segments. Gray areas represent unselected segments."]);
+    }
+    return build("pie_grid:" + rowsN + "x" + cols, traces, null, titles);
+  }
+  const y = years[0], p = provinces[0];
+  const pie = pieSlices(y, p, segments);
+  if (!pie || !pie.any) { notes.push(["warning", "No data available for selected filters"]); return null; }
+  if (segments.length < D.segments.length) {
+    notes.push(["info", "📊 Showing " + segments.length + " of " + D.segments.length +
+                " segments. Gray area represents unselected segments. Selected: " + pct(pie.selected) +
+                " · Unselected: " + pct(pie.unselected)]);
+  } else {
+    notes.push(["success", "✅ All segments selected – showing complete distribution"]);
+  }
+  if (pie.labels.length && !pie.labels.includes("Not Selected")) {
+    const largest = pie.values.indexOf(Math.max(...pie.values));
+    notes.push(["info", "Largest Segment: " + pie.labels[largest] + ": " + pct(pie.values[largest])]);
+  }
+  return build("pie", [{labels: pie.labels, values: pie.values, marker: {colors: pie.colors},
+                        pull: pie.labels.map(l => (l === "Not Selected" ? 0.04 : 0))}],
+               {title: {text: "Segment Distribution – " + y + " – " + p}},
+               {0: pct(pie.selected) + "<br>Selected"});
+}
+
+function groupedTraces(data, groupIdx, groupName, colors, horizontal) {
+  const groups = [];
+  for (const row of data) {
+    let g = groups.find(x => x.key === row[groupIdx]);
+    if (!g) { g = {key: row[groupIdx], seg: [], val: []}; groups.push(g); }
+    g.seg.push(row[2]); g.val.push(row[3]);
+  }
+  return groups.map((g, idx) => {
+    const trace = {name: String(g.key), legendgroup: String(g.key), marker: {color: colors[idx % colors.length]}};
+    if (horizontal) {
+      return Object.assign(trace, {y: g.seg, x: g.val, hovertemplate:
+        "Province=" + g.key + "<br>Proportion=%{x}<br>Index segments=%{y}<extra></extra>"});
+    }
+    return Object.assign(trace, {offsetgroup: String(g.key), x: g.seg, y: g.val, hovertemplate:
+      groupName + "=" + g.key + "<br>Index segments=%{x}<br>Proportion=%{y}<extra></extra>"});
+  });
+}
+
+function barFigure(sel, notes, data) {
+  const {years, segments} = sel, provinces = filterProvinces(sel);
+  const toggle = document.getElementById("horizontal-toggle");
+  toggle.style.display = "none";
+  const maxVal = maxOf(data.map(r => r[3]));
+  if (provinces.length > 1 && years.length > 1) {
+    notes.unshift(["info", "📊 Showing " + years.length + " years across " + provinces.length + " provinces"]);
+    const cols = Math.min(provinces.length, 4), rowsN = Math.ceil(provinces.length / cols);
+    const colors = D.palettes.Set2, traces = [], inLegend = new Set();
+    provinces.forEach((p, idx) => {
+      const q = pi(p);
+      if (q < 0) return;
+      years.forEach(y => {
+        const r = ri(y);
+        if (r < 0) return;
+        const yearIdx = years.indexOf(y), x = [], v = [];
+        segments.forEach(s => {
+          const k = si(s);
+          if (k >= 0 && present(r, q, k) && value(r, q, k) !== null) { x.push(s); v.push(value(r, q, k)); }
+        });
+        if (!v.length) return;
+        traces.push({cell: idx, name: y, x: x, y: v, marker: {color: colors[yearIdx % colors.length]},
+                     text: v.map(z => pct(z)), showlegend: !inLegend.has(y), legendgroup: y});
+        inLegend.add(y);
+      });
+    });
+    const titles = {};
+    provinces.forEach((p, idx) => { titles[idx] = p; });
+    const fig = build("bar_grid:" + rowsN + "x" + cols, traces, null, titles);
+    for (const key of Object.keys(fig.layout)) {
+      if (key.startsWith("yaxis")) fig.layout[key] = Object.assign({}, fig.layout[key], {range: [0, maxVal * 1.2]});
+    }
+    return fig;
+  }
+  if (provinces.length > 1) {
+    const year = years[0];
+    toggle.style.display = "block";
+    const box = document.getElementById("horizontal");
+    if (state.horizontal === null) box.checked = provinces.length > 6;
+    const title = "Financial Resilience Distribution by Province – " + year;
+    state.table = {year: year, data: data};
+    if (box.checked) {
+      return build("hbar", groupedTraces(data, 1, "Province", D.palettes.Plotly, true),
+                   {title: {text: title}, xaxis: {range: [0, maxVal * 1.15]}});
+    }
+    return build("bar:by_province", groupedTraces(data, 1, "Province", D.palettes.Plotly, false),
+                 {title: {text: title}, yaxis: {range: [0, maxVal * 1.2]}});
+  }
+  if (years.length > 1) {
+    return build("bar:by_round", groupedTraces(data, 0, "Survey round", D.palettes.Set2, false),
+                 {title: {text: "Financial Resilience Trends – " + provinces[0]}, yaxis: {range: [0, maxVal * 1.2]}});
+  }
+  const segs = data.map(r => r[2]);
+  return build("bar:segments", [{x: segs, y: data.map(r => r[3]), marker: {color: segs.map(s => D.colors[s])},
+                                 hovertemplate: "Index segments=%{x}<br>Proportion=%{y}<extra></extra>"}],
+               {title: {text: "Financial Resilience Distribution – " + provinces[0] + " – " + years[0]},
+                yaxis: {range: [0, maxVal * 1.15]}});
+}
+
+function lineFigure(sel, notes, data) {
+  if (sel.years.length < 2) {
+    notes.push(["info", "📈 Please select at least two survey rounds to see trends over time"]);
+    return null;
+  }
+  const multiple = filterProvinces(sel).length > 1;
+  const provinces = Array.from(new Set(data.map(r => r[1]))).sort();
+  const traces = [];
+  for (const s of D.segments) for (const p of (multiple ? provinces : [null])) {
+    const sub = data.filter(r => r[2] === s && (p === null || r[1] === p))
+                    .sort((a, b) => ri(a[0]) - ri(b[0]));
+    if (!sub.length) continue;
+    const name = multiple ? s + ", " + p : s;
+    const dash = multiple ? D.dashes[provinces.indexOf(p) % D.dashes.length] : "solid";
+    traces.push({name: name, legendgroup: name, x: sub.map(r => r[0]), y: sub.map(r => r[3]),
+                 marker: {color: D.colors[s]}, line: {color: D.colors[s], dash: dash},
+                 customdata: sub.map(r => [r[1]])});
+  }
+  return build("line", traces, {legend: {title: {text: "Segment" + (multiple ? " / Province" : "")}}});
+}
+
+// ── Page ─────────────────────────────────────────────────────────────────
+function note(kind, text) { return '<div class="note ' + kind + '">' + text + "</div>"; }
+function escapeHtml(text) {
+  return String(text).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+}
+
+function summaryTable(year, data) {
+  const provinces = Array.from(new Set(data.filter(r => r[3] !== null).map(r => r[1]))).sort();
+  const segments = Array.from(new Set(data.filter(r => r[3] !== null).map(r => r[2]))).sort();
+  const cell = (p, s) => { const r = data.find(x => x[1] === p && x[2] === s); return r && r[3] !== null ? pct(r[3]) : ""; };
+  return "<h3>Summary by Province</h3><table><tr><th>Index segments</th>" +
+    provinces.map(p => "<th>" + escapeHtml(p) + "</th>").join("") + "</tr>" +
+    segments.map(s => "<tr><td>" + escapeHtml(s) + "</td>" +
+      provinces.map(p => "<td>" + cell(p, s) + "</td>").join("") + "</tr>").join("") + "</table>";
+}
+
+function summary(data) {
+  if (!data.length) return "";
+  const rounds = new Set(data.map(r => r[0])), locations = new Set(data.map(r => r[1]));
+  let best = null, bestMean = -Infinity;
+  for (const s of D.segments) {
+    const v = data.filter(r => r[2] === s && r[3] !== null).map(r => r[3]);
+    if (v.length && v.reduce((a, b) => a + b, 0) / v.length > bestMean) {
+      bestMean = v.reduce((a, b) => a + b, 0) / v.length; best = s;
+    }
+  }
+  const metric = (label, value) =>
+    '<div class="metric"><div class="label">' + label + '</div><div class="value">' + value + "</div></div>";
+  return "<hr><h3>📊 Summary Statistics</h3><div class=\\"metrics\\">" +
+    metric("📊 Total Records", data.length.toLocaleString()) + metric("📅 Survey Rounds", rounds.size) +
+    metric("📍 Locations", locations.size) + (best ? metric("🏆 Largest Segment", best) : "") + "</div>";
+}
+
+function render() {
+  const sel = selection(), data = sel.years.length ? rows(sel) : [], notes = [];
+  state.table = null;
+  document.getElementById("subtitle").innerHTML = sel.years.length && sel.provinces.length
+    ? "<p><b>Survey Rounds:</b> " + sel.years.join(", ") + " | <b>Locations:</b> " + sel.provinces.join(", ") +
+      " | <b>Segments:</b> " + (checked("segments").length ? sel.segments.join(", ") : "All Segments") + "</p><hr>"
+    : "";
+  let fig = null;
+  if (!data.length) {
+    notes.push(["warning", "⚠️ No data available for your filter selection. Please adjust your filters."]);
+    document.getElementById("horizontal-toggle").style.display = "none";
+  } else if (state.chart === "Pie chart") {
+    document.getElementById("horizontal-toggle").style.display = "none";
+    fig = pieFigure(sel, notes);
+  } else if (state.chart === "Bar chart") {
+    fig = barFigure(sel, notes, data);
+  } else {
+    document.getElementById("horizontal-toggle").style.display = "none";
+    fig = lineFigure(sel, notes, data);
+  }
+  const chart = document.getElementById("chart");
+  if (fig) {
+    Plotly.react(chart, fig.data, fig.layout, {responsive: true, displaylogo: false});
+  } else {
+    Plotly.purge(chart);
+  }
+  document.getElementById("notes").innerHTML = notes.map(([kind, text]) => note(kind, text)).join("");
+  document.getElementById("table").innerHTML = state.table ? summaryTable(state.table.year, state.table.data) : "";
+  document.getElementById("summary").innerHTML = summary(data);
+  state.rows = data;
+}
+
+function download() {
+  const lines = ["Province,Index segments,Survey round,Proportion"].concat(
+    state.rows.map(r => [r[1], r[2], r[0], r[3] === null ? "" : r[3]]
+      .map(v => (/[",\\n]/.test(String(v)) ? '"' + String(v).replace(/"/g, '""') + '"' : v)).join(",")));
+  const link = document.createElement("a");
+  link.href = URL.createObjectURL(new Blob([lines.join("\\n") + "\\n"], {type: "text/csv"}));
+  link.download = "resilience_data_" + selection().years.join("-") + ".csv";
+  link.click();
+  URL.revokeObjectURL(link.href);
+}
+
+function checkboxes(id, labels) {
+  document.getElementById(id).innerHTML = labels.map(l =>
+    '<label><input type="checkbox" value="' + escapeHtml(l) + '"> ' + escapeHtml(l) + "</label>").join("");
+}
+
+checkboxes("rounds", D.rounds);
+checkboxes("provinces", D.provinces);
+checkboxes("segments", D.segments);
+const latest = D.rounds.length ? [D.rounds[D.rounds.length - 1]] : [];
+setChecked("rounds", latest);
+setChecked("provinces", [D.provinces[0]]);
+setChecked("segments", D.segments);
+
+document.querySelectorAll("input").forEach(el => el.addEventListener("change", event => {
+  if (event.target.name === "chart") state.chart = event.target.value;
+  if (event.target.id === "horizontal") state.horizontal = event.target.checked;
+  render();
+}));
+const preset = (id, action) => document.getElementById(id).addEventListener("click", () => { action(); render(); });
+preset("latest", () => { setChecked("rounds", latest); setChecked("provinces", [D.provinces[0]]); setChecked("segments", D.segments); });
+preset("all-time", () => { setChecked("rounds", D.rounds); setChecked("provinces", [D.provinces[0]]); setChecked("segments", D.segments); });
+preset("all-provinces", () => setChecked("provinces", D.provinces));
+preset("clear-provinces", () => setChecked("provinces", [D.provinces[0]]));
+preset("all-segments", () => setChecked("segments", D.segments));
+document.getElementById("download").addEventListener("click", download);
+render();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Data layer shared by both dashboards and the multipage app (app.py).
+#
+# Both sheets and the geometry pack are loaded once per process into a single
+# LiveData (live_data.py) held in st.cache_resource, together with everything
+# derived from them: the map views of the index score page and the segment
+# cube of the segments page. Whichever page runs first pays the load and the
+# other reuses it, whether they run as one multipage app or as two scripts.
+# The sidebar styling and the segment categories (resilience_categories.py)
+# are exposed here too, so the pages share them rather than carrying their own
+# copies.
+#
+# On a cold process the geometry pack is read on a worker thread while the
+# sheets load, and current_snapshot() puts a placeholder page and sidebar on
+# screen first, so a fresh worker paints before its data is in.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+import profiling
+from geo_pack import GEOJSON_PATH, load_geometry_pack
+from live_data import LiveData, file_token
+from map_views import MapViewCache
+from resilience_categories import SEGMENT_CATEGORIES  # noqa: F401 (re-exported for the pages)
+from segment_cube import SegmentCube
+
+SHEETS = ["Index_score", "Index_segment"]
+CANADA = "Canada (Overall)"
+
+# Cold-start loads that overlap the sheet reads (file reads and Arrow decoding
+# release the GIL). A process pool was slower: the pack has to be pickled back
+_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard-load")
+_ready = threading.Event()
+_prefetched = {}
+
+SIDEBAR_CSS = """
+<style>
+    /* Increase sidebar width */
+    section[data-testid="stSidebar"] {
+        width: 375px !important;
+    }
+
+    /* Adjust main content area */
+    .main > div {
+        padding-left: 400px !important;
+    }
+
+    /* Improve sidebar content styling */
+    section[data-testid="stSidebar"] .stMarkdown {
+        font-size: 0.95rem;
+    }
+
+    section[data-testid="stSidebar"] .stMultiSelect label {
+        font-weight: 600;
+        color: #262730;
+        margin-bottom: 0.5rem;
+    }
+
+    /* Style the dividers */
+    section[data-testid="stSidebar"] hr {
+        margin: 1.5rem 0;
+    }
+
+    /* Info box styling */
+    .sidebar-info {
+        background-color: #f0f2f6;
+        padding: 1rem 0.7rem;
+        border-radius: 0.5rem;
+        border-left: 4px solid #00AEEF;
+        font-size: 0.85rem;
+        line-height: 1.5;
+    }
+
+    /* Color legend styling */
+    .color-legend-item {
+        display: flex;
+        align-items: center;
+        margin: 8px 0;
+        font-size: 0.95rem;
+    }
+
+    .color-box {
+        width: 20px;
+        height: 20px;
+        border-radius: 4px;
+        margin-right: 10px;
+        border: 1px solid #ccc;
+    }
+</style>
+"""
+
+
+def apply_sidebar_style():
+    st.markdown(SIDEBAR_CSS, unsafe_allow_html=True)
+
+
+def load_geojson(geo_token):
+    # Simplified outlines per view_mode plus centroids/bboxes, see geo_pack.py.
+    # Not a Streamlit cache: derive() also runs on the watcher thread, and the
+    # pack is shared through the LiveData snapshot (one read-only copy for
+    # every session). A prefetch started for another GeoJSON token is dropped.
+    prefetched = _prefetched.pop(geo_token, None)
+    _prefetched.clear()
+    return prefetched.result() if prefetched is not None else load_geometry_pack()
+
+
+def clean_segments(segments_data):
+    """Index_segment with empty provinces treated as 'Canada (Overall)'"""
+    # Shallow: copy-on-write keeps the shared (possibly memory-mapped) columns
+    segments_data = segments_data.copy(deep=False)
+    province = segments_data["Province"].astype(object)
+    blank = province.isna() | (province.astype(str).str.strip() == "")
+    segments_data["Province"] = province.where(~blank, CANADA).astype("category")
+    return segments_data
+
+
+def derive(sheets, previous, changed):
+    """
+    Map views and segment cube for a snapshot. After a refresh only the map
+    views of changed rounds are rebuilt, and the cube only when Index_segment
+    changed; the geometry pack doesn't depend on rounds.
+    """
+    geo_token = file_token(GEOJSON_PATH)
+    if previous is None or previous["geo_token"] != geo_token:
+        geo_pack = load_geojson(geo_token)
+    else:
+        geo_pack = previous["map_views"].geo_pack
+    map_views = MapViewCache(sheets["Index_score"], geo_pack)
+    if previous is not None:
+        map_views.carry_over(previous["map_views"], changed["Index_score"])
+
+    if previous is None or changed["Index_segment"]:
+        segments_data = clean_segments(sheets["Index_segment"])
+        # Dense round x province x segment arrays; one vectorised pass, so rebuilt whole
+        segment_cube = SegmentCube(segments_data)
+    else:
+        segments_data, segment_cube = previous["segments_data"], previous["segment_cube"]
+
+    return {
+        "map_views": map_views,
+        "geo_token": geo_token,
+        "segments_data": segments_data,
+        "segment_cube": segment_cube,
+    }
+
+
+@profiling.cached(st.cache_resource)
+def load_live_data():
+    # The store ingested from respondents.parquet when present (microdata.py, ingest.py),
+    # otherwise the Parquet store built by `python data_store.py`, falling back to a single read of
+    # the workbook when stale. Shared by every session and page and swapped in place
+    # when the source files change; a background watcher reloads once for everyone
+    # (live_data.py).
+    # The geometry starts loading first, outside Streamlit on the worker thread;
+    # load_geojson() picks up (or waits for) that result when derive() asks for it,
+    # unless the file changed in between
+    _prefetched[file_token(GEOJSON_PATH)] = _loader.submit(load_geometry_pack)
+    live = LiveData(SHEETS, derive, watch_paths=[GEOJSON_PATH]).start_watcher()
+    _ready.set()
+    return live
+
+
+def current_snapshot(title=None):
+    """
+    The snapshot for this run; take it once per run so a refresh can't mix old
+    and new data. Until the first load has finished, a placeholder page (with
+    `title`) and sidebar are shown while it runs.
+    """
+    if _ready.is_set():
+        return load_live_data().current()
+    skeleton, sidebar = st.empty(), st.sidebar.empty()
+    with skeleton.container():
+        if title:
+            st.title(title)
+        st.info("⏳ Loading survey data and map geometry…")
+    sidebar.caption("Filters appear once the data has loaded.")
+    try:
+        return load_live_data().current()
+    finally:
+        skeleton.empty()
+        sidebar.empty()
@@ -5,53 +5,39 @@
 
 
 # Step 1: Setup and Imports
-import pandas as pd
-import numpy as np
 import streamlit as st
-import plotly.graph_objects as go
-import json
+import profiling
+import dashboard_data
+from figure_store import cached_figure
+from data_store import survey_round_key
+from map_views import figure_version, map_figure, rounds_figure, view_key
 
 st.set_page_config(page_title="Financial Resilience Score Dashboard - Canada", page_icon="🍁", layout="wide")
+# Opt-in timings (FRI_PROFILE=1 or ?profile=1), see profiling.py
+profiling.start("index_score", "Step 1: Setup and Imports")
 
 
 # In[ ]:
 
 
 # Step 2: Data and GeoJSON Loading
+profiling.step("Step 2: Data and GeoJSON Loading")
 
-@st.cache_data
-def load_data():
-    dataset = pd.read_excel("Interative dashboard.xlsx", sheet_name="Index_score")
-    segments_data = pd.read_excel("Interative dashboard.xlsx", sheet_name="Index_segment")
-    return dataset, segments_data
-
-@st.cache_data
-def load_geojson():
-    with open("canada_provinces.geojson", "r") as f:
-        geojson = json.load(f)
-    return geojson
-
-dataset, segments_data = load_data()
-geojson = load_geojson()
+# Both sheets, the geometry pack and the map views per (round, province selection)
+# are loaded once per process in dashboard_data.py, shared with the segments page.
+# One snapshot per run, so a refresh mid-run can't mix old and new data
+snapshot = dashboard_data.current_snapshot("🍁 Financial Resilience Score Dashboard")
+dataset, segments_data = snapshot.sheets["Index_score"], snapshot.sheets["Index_segment"]
+map_views = snapshot["map_views"]
 
 
 # In[ ]:
 
 
 # Step 3: Sidebar - Year and Province(s) Selection
-# --- CSS for sidebar width and style (add after your page config) ---
-st.markdown("""
-<style>
-section[data-testid="stSidebar"] { width: 375px !important; }
-.main > div { padding-left: 400px !important; }
-.sidebar-info { background:#f0f2f6;padding:1rem 0.7rem;
-    border-radius:0.5rem; border-left:4px solid #00AEEF;
-    font-size:0.85rem; line-height:1.5;}
-.color-legend-item { display:flex; align-items:center; margin:8px 0; font-size:0.95rem;}
-.color-box { width:20px; height:20px; border-radius:4px; margin-right:10px;
-    border:1px solid #ccc; }
-</style>
-""", unsafe_allow_html=True)
+profiling.step("Step 3: Sidebar")
+# Sidebar width and styles, shared with the segments page
+dashboard_data.apply_sidebar_style()
 
 
 # Info and color legend
@@ -102,193 +88,109 @@ st.sidebar.markdown(
 
 
 # Step 4: Filtering Data
+# Filtered rows, sub-FeatureCollection, codes and stats are cached per selection in map_views.py
+profiling.step("Step 4: Filtering Data")
 
-filtered = dataset[dataset['Survey round'] == selected_year]
-# Remove national rows for map
-filtered = filtered[filtered['Province'].notnull()]
-filtered['Mean Financial Resilience Score'] = filtered['Mean Financial Resilience Score'].round(1)
-
-# Province selection logic
-if "All provinces" in selected_provinces or not selected_provinces:
-    # Show all provinces
-    display_provinces = [f['properties']['name'] for f in geojson['features']]
-    provinces_geojson = geojson
-    view_mode = 'all'
-elif len(selected_provinces) == 1:
-    display_provinces = [selected_provinces[0]]
-    provinces_geojson = {
-        "type": "FeatureCollection",
-        "features": [f for f in geojson['features'] if f['properties']['name'] == selected_provinces[0]]
-    }
-    view_mode = 'single'
-else:
-    display_provinces = selected_provinces
-    provinces_geojson = {
-        "type": "FeatureCollection",
-        "features": [f for f in geojson['features'] if f['properties']['name'] in selected_provinces]
-    }
-    view_mode = 'multi'
-
-filtered_map = filtered[filtered['Province'].isin(display_provinces)]
+hits = map_views.hits
+view = map_views.get(selected_year, selected_provinces)
+profiling.record_cache("map_views", hit=map_views.hits > hits)
+view_mode = view['view_mode']
+display_provinces = view['display_provinces']
+provinces_geojson = view['geojson']
+filtered_map = view['table']
 
 
 # In[ ]:
 
 
 # Step 5: Mapping and Color Logic
+# Thresholds, labels and colours live in resilience_categories.py (shared with the segments app)
+profiling.step("Step 5: Mapping and Color Logic")
 
-def score_code(val):
-    if pd.isna(val) or val == -1:
-        return -1
-    elif val < 30:
-        return 0
-    elif val < 50:
-        return 1
-    elif val < 70:
-        return 2
-    else:
-        return 3
-
-category_labels = {
-    -1: "No Data",
-     0: "Extremely Vulnerable",
-     1: "Financially Vulnerable",
-     2: "Approaching Resilience",
-     3: "Financially Resilient"
-}
-category_colors = {
-    -1: "#A6A6A6",  # Gray
-     0: "#C00000",  # 0-30: Dark Red
-     1: "#ED175B",  # 30-50: Reddish Pink
-     2: "#1E196A",  # 50-70: Deep Indigo
-     3: "#00AEEF"   # 70-100: Sky Blue
-}
-
-z_codes, hover_labels = [], []
-for prov in display_provinces:
-    row = filtered_map[filtered_map['Province'] == prov]
-    if not row.empty:
-        val = row['Mean Financial Resilience Score'].values[0]
-        code = score_code(val)
-        label = f"{prov}<br>Score: {val if not (pd.isna(val) or val==-1) else 'No Data'}<br>{category_labels[code]}"
-    else:
-        code = -1
-        label = f"{prov}<br>No Data"
-    z_codes.append(code)
-    hover_labels.append(label)
-
-discrete_colorscale = [
-    [0.0/4, category_colors[-1]],   # gray ("No Data")
-    [1.0/4, category_colors[0]],
-    [2.0/4, category_colors[1]],
-    [3.0/4, category_colors[2]],
-    [4.0/4, category_colors[3]],
-]
+z_codes = view['z_codes']
+hover_labels = view['hover_labels']
 
 
 # In[1]:
 
 
 # Step 6: Map and Zoom Logic
+profiling.step("Step 6: Map and Zoom Logic")
 col1, col2 = st.columns([6, 2])
 
-with col1:
-    fig = go.Figure(go.Choropleth(
-        geojson=provinces_geojson,
-        locations=display_provinces,
-        z=z_codes,
-        featureidkey="properties.name",
-        text=hover_labels,
-        hoverinfo="text",
-        showscale=False,
-        colorscale=discrete_colorscale,
-        zmin=-1,
-        zmax=3,
-        marker_line_color='white',
-        marker_line_width=0.5
-    ))
-
-    # Smart zooming with conic conformal projection
-    if view_mode == 'single' and provinces_geojson['features']:
-        try:
-            from shapely.geometry import shape
-            selected_feat = provinces_geojson['features'][0]
-            centroid = shape(selected_feat['geometry']).centroid
-            fig.update_geos(
-                fitbounds="locations", visible=False,
-                center={"lat": centroid.y, "lon": centroid.x},
-                projection_type="conic conformal",
-                projection_scale=10
-            )
-        except Exception:
-            fig.update_geos(
-                fitbounds="locations", visible=False,
-                projection_type="conic conformal",
-                projection_scale=10
-            )
+# The map panel is a fragment holding its own animate toggle, so switching
+# between the single-round and the animated map reruns only this panel, not
+# the sidebar, the CSS or Key Statistics
+
+@st.fragment
+def map_panel(version, map_views, view, selected_year, selected_provinces, year_options):
+    animate_rounds = st.toggle(
+        "🎞️ Animate survey rounds", key="animate_rounds",
+        help="Every round in one map with a slider and play button; stepping through rounds happens in the browser"
+    )
+    # Prebuilt by warm_figures.py for the common selections, otherwise built here from
+    # the view (zoom, styling, colour scale and footer, see map_views.map_figure)
+    if animate_rounds:
+        # Animated map: the same selection in every round, oldest first
+        round_views = [
+            (year, map_views.get(year, selected_provinces)) for year in sorted(year_options, key=survey_round_key)
+        ]
+        # One geometry payload, one frame per round (map_views.rounds_figure)
+        fig, prebuilt = cached_figure(
+            version, "index_score", "map_rounds",
+            view_key(selected_year, selected_provinces), lambda: rounds_figure(round_views, selected_year)
+        )
     else:
-        fig.update_geos(
-            fitbounds="locations", visible=False,
-            projection_type="conic conformal"
+        fig, prebuilt = cached_figure(
+            version, "index_score", "map",
+            view_key(selected_year, selected_provinces), lambda: map_figure(view, selected_year)
         )
+    profiling.record_cache("prebuilt_figures", hit=prebuilt)
+    profiling.plotly_chart(fig, "map", use_container_width=True)
+    if animate_rounds:
+        st.caption(f"▶ Play or drag the slider to compare rounds; Key Statistics are for {selected_year}.")
 
-    fig.update_layout(
-        title=dict(
-            text=f"Provincial Mean Financial Resilience Score — {selected_year}",
-            font=dict(size=20, family="Avenir, sans-serif"),
-            x=0.5, xanchor='center'
-        ),
-        height=600,          # Shorter vertical height
-        width=2400,          # Much wider map; adjust as desired (900–1400 is typical)
-        autosize=False,      # Explicit sizing
-        margin=dict(l=0, r=0, t=30, b=10),
-        annotations=[
-            dict(
-                text="© 2025 Financial Resilience Institute. All Rights Reserved.",
-                showarrow=False,
-                xref="paper", yref="paper",
-                x=0.98, y=0.02,
-                xanchor="right", yanchor="bottom",
-                font=dict(size=10, color="#888888", family="Avenir, sans-serif")
-            )
-        ]
+with col1:
+    map_panel(
+        figure_version(snapshot.version, map_views.geo_pack), map_views, view,
+        selected_year, selected_provinces, year_options
     )
-    st.plotly_chart(fig, use_container_width=True)
 
 
 # In[ ]:
 
 
 # Step 7: Statistics & Data Table
+profiling.step("Step 7: Statistics & Data Table")
 
-with col2:
+def key_statistics(view, selected_year):
     st.markdown("### 📊 Key Statistics")
 
+    view_mode = view['view_mode']
+    display_provinces = view['display_provinces']
+    filtered_map = view['table']
+
     # Canada-wide comparison
-    national_data = dataset[(dataset['Survey round'] == selected_year) & (dataset['Province'].isnull())]
-    if not national_data.empty and ("All provinces" in selected_provinces or not selected_provinces):
-        national_score = national_data['Mean Financial Resilience Score'].iloc[0]
+    stats = view['stats']
+    national_score = stats['national_score']
+    if national_score is not None and view_mode == 'all':
         st.metric("🇨🇦 Canada-wide Score", f"{national_score:.1f}")
 
     st.markdown("---")
     if not filtered_map.empty:
         # Show top and bottom when many; else metrics for one
-        if ("All provinces" in selected_provinces or not selected_provinces) or len(display_provinces) > 3:
+        if view_mode == 'all' or len(display_provinces) > 3:
             st.markdown("**Top 3 Provinces:**")
-            top_provinces = filtered_map.nlargest(3, 'Mean Financial Resilience Score')[['Province', 'Mean Financial Resilience Score']]
-            for _, row in top_provinces.iterrows():
-                st.markdown(f"● {row['Province']}: **{row['Mean Financial Resilience Score']:.1f}**", unsafe_allow_html=True)
+            for province, score in stats['top']:
+                st.markdown(f"● {province}: **{score:.1f}**", unsafe_allow_html=True)
             st.markdown("**Bottom 3 Provinces:**")
-            bottom_provinces = filtered_map.nsmallest(3, 'Mean Financial Resilience Score')[['Province', 'Mean Financial Resilience Score']]
-            for _, row in bottom_provinces.iterrows():
-                st.markdown(f"● {row['Province']}: **{row['Mean Financial Resilience Score']:.1f}**", unsafe_allow_html=True)
-            avg_score = filtered_map['Mean Financial Resilience Score'].mean()
-            st.metric("Average Provincial Score", f"{avg_score:.1f}")
+            for province, score in stats['bottom']:
+                st.markdown(f"● {province}: **{score:.1f}**", unsafe_allow_html=True)
+            st.metric("Average Provincial Score", f"{stats['average']:.1f}")
         else:
-            score = filtered_map['Mean Financial Resilience Score'].iloc[0]
-            st.metric(f"{display_provinces[0]} Score", f"{score:.1f}")
-            if not national_data.empty:
-                national_score = national_data['Mean Financial Resilience Score'].iloc[0]
+            province, score = stats['first']
+            st.metric(f"{province} Score", f"{score:.1f}")
+            if national_score is not None:
                 diff = score - national_score
                 st.metric("vs. National Average", f"{national_score:.1f}", delta=f"{diff:+.1f}")
 
@@ -299,9 +201,14 @@ with col2:
         label="📥 Download Data (CSV)",
         data=csv,
         file_name=f"financial_resilience_{selected_year.replace(' ', '_')}.csv",
-        mime="text/csv"
+        mime="text/csv",
+        # Nothing on the page depends on the download, so it doesn't rerun anything
+        on_click="ignore"
     )
 
+with col2:
+    key_statistics(view, selected_year)
+
 
 # In[ ]:
 
@@ -336,3 +243,9 @@ with col2:
 
 #st.dataframe(table_data.style.format({'Resilience Score': '{:.1f}'}), use_container_width=True, height=400)
 
+
+# In[ ]:
+
+
+# Debug panel and JSON-lines log, only when profiling is enabled
+profiling.finish()
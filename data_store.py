@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Columnar data store for both dashboards.
+#
+# Reading "Interative dashboard.xlsx" through openpyxl is the slowest part of a
+# cold start, so the sheets are converted once into typed, compressed Parquet
+# files that the apps read back (memory-mapped) instead:
+#
+#     python data_store.py
+#
+# The store remembers the files it was built from and their hash. When they
+# change (or the store / pyarrow is missing) load_sheet() falls back to the
+# workbook and refreshes the store on the way. A store built from other files
+# (ingest.py) is served while those files are unchanged; one whose source is
+# gone (synth_data.py, benchmark.py) only where there is no workbook.
+#
+# For multi-worker deployments (deploy.py) the store can also hold every sheet
+# as an uncompressed, single-chunk Arrow IPC file. Those are memory-mapped and
+# converted zero-copy, so the numeric columns of every worker point at the same
+# page-cache pages. With FRI_PREBUILT=1 the store is served as is and never
+# rebuilt by a worker.
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+WORKBOOK_PATH = "Interative dashboard.xlsx"
+STORE_DIR = "data_cache"
+MANIFEST_NAME = "manifest.json"
+PREBUILT_ENV = "FRI_PREBUILT"
+SHEETS = ["Index_score", "Index_segment"]
+CATEGORY_COLUMNS = ["Province", "Index segments", "Survey round"]
+
+
+def survey_round_key(value):
+    """Sort key for survey rounds like 'October 2020' (chronological, unknowns last)"""
+    parsed = pd.to_datetime(value, format="%B %Y", errors="coerce")
+    if pd.isna(parsed):
+        return (1, pd.Timestamp.max, str(value))
+    return (0, parsed, str(value))
+
+
+def file_hash(path):
+    """sha256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sources_hash(paths):
+    """sha256 of a single source file, or of the concatenated file hashes of several"""
+    return combine_hashes([file_hash(path) for path in paths])
+
+
+def combine_hashes(hashes):
+    if len(hashes) == 1:
+        return hashes[0]
+    digest = hashlib.sha256()
+    for sha in hashes:
+        digest.update(sha.encode())
+    return digest.hexdigest()
+
+
+def round_hashes(df):
+    """
+    {survey round: sha256 of that round's rows}, independent of row order.
+    Rows without a round are hashed under "".
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    rounds = df["Survey round"].astype(object).where(df["Survey round"].notna(), "").astype(str).to_numpy()
+    hashes = {}
+    for label in pd.unique(rounds):
+        digest = hashlib.sha256(np.sort(row_hashes[rounds == label]).tobytes())
+        hashes[label] = digest.hexdigest()
+    return hashes
+
+
+def changed_rounds(old, new):
+    """Rounds added, removed or changed between two round_hashes() results, sorted chronologically"""
+    rounds = {r for r in set(old) | set(new) if old.get(r) != new.get(r)}
+    return sorted(rounds, key=survey_round_key)
+
+
+def _sheet_path(store_dir, sheet):
+    return os.path.join(store_dir, f"{sheet}.parquet")
+
+
+def _arrow_path(store_dir, sheet):
+    return os.path.join(store_dir, f"{sheet}.arrow")
+
+
+def is_prebuilt():
+    """True when running as a deploy.py worker: serve the prebuilt store, never rebuild it"""
+    return os.environ.get(PREBUILT_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def read_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def to_store_types(df):
+    """Cast the dimension columns to categoricals (survey rounds in chronological order)"""
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col].where(df[col].isna(), df[col].astype(str))
+        key = survey_round_key if col == "Survey round" else None
+        df[col] = pd.Categorical(values, categories=sorted(values.dropna().unique(), key=key))
+    return df
+
+
+def read_workbook(workbook=WORKBOOK_PATH, sheets=SHEETS):
+    """Read the requested sheets from the workbook in one pass"""
+    frames = pd.read_excel(workbook, sheet_name=list(sheets))
+    return {sheet: to_store_types(frames[sheet]) for sheet in sheets}
+
+
+def build_store(workbook=WORKBOOK_PATH, store_dir=STORE_DIR, frames=None, source=None, source_sha256=None,
+                source_files=None, arrow=False):
+    """
+    Write every sheet to <store_dir>/<sheet>.parquet plus a manifest. When the
+    frames don't come from the workbook (generated or ingested data) pass a
+    `source` name and `source_sha256`, plus the `source_files` they were read
+    from if any (hashed as sources_hash() does); the hash becomes the store's
+    data version. `arrow` also writes the memory-mappable <sheet>.arrow copies.
+    """
+    if frames is None:
+        frames = read_workbook(workbook)
+    source_files = list(source_files if source_files is not None else [] if source else [workbook])
+    source = source or os.path.basename(workbook)
+    source_sha256 = source_sha256 or file_hash(workbook)
+    os.makedirs(store_dir, exist_ok=True)
+    # Sheets this build doesn't cover are kept when they came from the same
+    # source (load_sheet() rebuilds one sheet at a time), dropped otherwise
+    previous = read_manifest(store_dir) or {}
+    same_source = previous.get("source_sha256") == source_sha256 and previous.get("source_files") == source_files
+    kept = []
+    for sheet in previous.get("sheets", {}):
+        if sheet in frames:
+            continue
+        if same_source and os.path.exists(_sheet_path(store_dir, sheet)):
+            kept.append(sheet)
+            continue
+        for path in (_sheet_path(store_dir, sheet), _arrow_path(store_dir, sheet)):
+            if os.path.exists(path):
+                os.remove(path)
+    for sheet, df in frames.items():
+        tmp_path = _sheet_path(store_dir, sheet) + ".tmp"
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+        os.replace(tmp_path, _sheet_path(store_dir, sheet))
+        if arrow:
+            write_arrow(df, _arrow_path(store_dir, sheet))
+        elif os.path.exists(_arrow_path(store_dir, sheet)):
+            # Would be stale next to the new Parquet file
+            os.remove(_arrow_path(store_dir, sheet))
+    manifest = {
+        "source": source,
+        "source_sha256": source_sha256,
+        "source_files": source_files,
+        "sheets": {**{s: previous["sheets"][s] for s in kept}, **{sheet: len(df) for sheet, df in frames.items()}},
+        "arrow": bool(arrow),
+        # Lets a refresh tell which survey rounds actually changed
+        "rounds": {**{s: previous.get("rounds", {}).get(s, {}) for s in kept},
+                   **{sheet: round_hashes(df) for sheet, df in frames.items()}},
+    }
+    tmp_manifest = os.path.join(store_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, os.path.join(store_dir, MANIFEST_NAME))
+    return manifest
+
+
+def write_arrow(df, path):
+    """Uncompressed Arrow IPC in one record batch, so every column can be mapped without a copy"""
+    import pyarrow.feather as feather
+
+    tmp_path = path + ".tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed", chunksize=max(len(df), 1))
+    os.replace(tmp_path, path)
+
+
+def built_from(manifest, workbook):
+    """True when the store came from this workbook and the workbook is still around"""
+    return os.path.exists(workbook) and manifest.get("source", os.path.basename(workbook)) == os.path.basename(workbook)
+
+
+def source_files(manifest, workbook):
+    """The files a store was built from (manifests older than the field name only the workbook)"""
+    if "source_files" in manifest:
+        return manifest["source_files"]
+    return [workbook] if manifest.get("source") == os.path.basename(workbook) else []
+
+
+def store_is_fresh(workbook=WORKBOOK_PATH, store_dir=STORE_DIR, sheets=SHEETS):
+    """True when the store holds every sheet and its source files are unchanged"""
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        return False
+    if not all(s in manifest.get("sheets", {}) and os.path.exists(_sheet_path(store_dir, s)) for s in sheets):
+        return False
+    if is_prebuilt():
+        # A deploy.py worker serves what the build left, whatever its source
+        return True
+    files = source_files(manifest, workbook)
+    if files and all(os.path.exists(path) for path in files):
+        return manifest.get("source_sha256") == sources_hash(files)
+    # Source gone (or never a file): the workbook takes over when there is one
+    return not os.path.exists(workbook)
+
+
+def data_version(workbook=WORKBOOK_PATH, store_dir=STORE_DIR):
+    """Token for the data being served: the store's source hash while it is fresh, else the workbook hash"""
+    manifest = read_manifest(store_dir)
+    if manifest and store_is_fresh(workbook, store_dir, list(manifest.get("sheets", SHEETS))):
+        return manifest.get("source_sha256", "")
+    return file_hash(workbook) if os.path.exists(workbook) else ""
+
+
+def read_store(sheet, store_dir=STORE_DIR):
+    """Read one sheet back from the store, memory-mapping the Arrow or Parquet file"""
+    import pyarrow.parquet as pq
+
+    if (read_manifest(store_dir) or {}).get("arrow") and os.path.exists(_arrow_path(store_dir, sheet)):
+        import pyarrow.feather as feather
+
+        # Numeric columns stay backed by the mapped file (read-only, shared between processes)
+        return feather.read_table(_arrow_path(store_dir, sheet), memory_map=True).to_pandas(split_blocks=True)
+
+    table = pq.read_table(_sheet_path(store_dir, sheet), memory_map=True)
+    # Frees each Arrow column as it is converted, so the table and the frame
+    # are never both held in full
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def load_sheets(sheets=SHEETS, workbook=WORKBOOK_PATH, store_dir=STORE_DIR):
+    """
+    {sheet: frame} from the Parquet store; when the store is stale the workbook
+    is read once for every sheet and the store rebuilt from that read
+    """
+    try:
+        # One freshness check (and workbook hash) for all the sheets
+        if store_is_fresh(workbook, store_dir, sheets):
+            return {sheet: read_store(sheet, store_dir) for sheet in sheets}
+    except (ImportError, OSError, ValueError):
+        pass
+
+    frames = read_workbook(workbook, sheets)
+    try:
+        build_store(workbook, store_dir, frames=frames)
+    except (ImportError, OSError, ValueError):
+        # Read-only checkout or no pyarrow: keep serving from the workbook
+        pass
+    return {sheet: frames[sheet] for sheet in sheets}
+
+
+def load_sheet(sheet, workbook=WORKBOOK_PATH, store_dir=STORE_DIR):
+    """Load a sheet from the Parquet store, falling back to the workbook if the store is stale"""
+    return load_sheets([sheet], workbook, store_dir)[sheet]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the dashboard workbook into the Parquet data store.")
+    parser.add_argument("--workbook", default=WORKBOOK_PATH, help="Source Excel workbook")
+    parser.add_argument("--out", default=STORE_DIR, help="Output directory for the Parquet files")
+    parser.add_argument("--arrow", action="store_true", help="Also write memory-mappable Arrow IPC copies")
+    args = parser.parse_args()
+
+    previous = read_manifest(args.out) or {}
+    manifest = build_store(args.workbook, args.out, arrow=args.arrow)
+    for sheet, rows in manifest["sheets"].items():
+        changed = changed_rounds(previous.get("rounds", {}).get(sheet, {}), manifest["rounds"][sheet])
+        note = f" ({len(changed)} rounds new or changed: {', '.join(changed)})" if previous and changed else ""
+        print(f"{sheet}: {rows} rows -> {_sheet_path(args.out, sheet)}{note}")
+
+
+if __name__ == "__main__":
+    main()
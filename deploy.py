@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Multi-worker deployment of the dashboards.
+#
+# Behind a load balancer every Streamlit process used to parse the workbook and
+# GeoJSON and warm its own caches. Here the expensive part is done once:
+#
+#     python deploy.py --build-only          # data_cache/ with Arrow + figures
+#     python deploy.py --workers 4           # build, then 4 workers of app.py
+#     python deploy.py --workers 4 --skip-build --apps dashboard_index_score.py dashboard_segments.py
+#
+# By default the workers run the multipage app (app.py), so each one holds a
+# single copy of the data for both pages; --apps can serve the two dashboards
+# as separate apps instead.
+#
+# The build writes the Parquet store plus memory-mapped Arrow IPC copies of the
+# sheets (data_store.py), the simplified geometry pack (geo_pack.py) and the
+# figure JSON of the top-K selections of each app (warm_figures.py).
+# Workers run with FRI_PREBUILT=1: they map the same Arrow files, so their
+# numeric columns share page-cache pages. They read prebuilt figures instead of
+# drawing them and never rebuild the store themselves. Re-running the build
+# while workers are up is picked up by their file watchers (live_data.py).
+#
+# Worker i of an app listens on --base-port + i; the apps get consecutive port
+# ranges. Point the load balancer at them. Ctrl-C stops every worker. Run from
+# the directory holding the workbook and GeoJSON, like the apps themselves.
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import data_store
+import geo_pack
+import warm_figures
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APPS = ["app.py", "dashboard_index_score.py", "dashboard_segments.py"]
+DEFAULT_APPS = ["app.py"]
+DEFAULT_BASE_PORT = 8501
+
+
+# ─────────────────────────────── Build ───────────────────────────────
+
+def build_data(workbook=data_store.WORKBOOK_PATH, store_dir=data_store.STORE_DIR):
+    """(Re)write the store with Arrow copies; a fresh store from another source (ingest.py) is converted as is"""
+    manifest = data_store.read_manifest(store_dir)
+    if (manifest and not data_store.built_from(manifest, workbook)
+            and data_store.store_is_fresh(workbook, store_dir, list(manifest["sheets"]))):
+        frames = {sheet: data_store.read_store(sheet, store_dir) for sheet in manifest["sheets"]}
+        return data_store.build_store(
+            store_dir=store_dir, frames=frames, source=manifest["source"], source_sha256=manifest["source_sha256"],
+            source_files=data_store.source_files(manifest, workbook), arrow=True
+        )
+    return data_store.build_store(workbook, store_dir, arrow=True)
+
+
+def build(workbook=data_store.WORKBOOK_PATH, store_dir=data_store.STORE_DIR, geojson=geo_pack.GEOJSON_PATH,
+          apps=DEFAULT_APPS, top_k=warm_figures.DEFAULT_TOP_K):
+    manifest = build_data(workbook, store_dir)
+    geo_pack.build_pack(geojson, store_dir)
+    # Figures of the most common selections, drawn by the apps themselves
+    counts = warm_figures.warm(apps, top_k)
+    return manifest, counts
+
+
+# ─────────────────────────────── Launch ───────────────────────────────
+
+def worker_command(app, port):
+    return [
+        sys.executable, "-m", "streamlit", "run", os.path.join(REPO_DIR, app),
+        "--server.port", str(port), "--server.headless", "true",
+        # The watcher in live_data.py handles data changes; no source reloads
+        "--server.runOnSave", "false", "--server.fileWatcherType", "none",
+    ]
+
+
+def launch(apps, workers, base_port=DEFAULT_BASE_PORT):
+    """Start `workers` processes per app; returns [(app, port, Popen)]"""
+    env = dict(os.environ, **{data_store.PREBUILT_ENV: "1"})
+    procs = []
+    for a, app in enumerate(apps):
+        for i in range(workers):
+            port = base_port + a * workers + i
+            procs.append((app, port, subprocess.Popen(worker_command(app, port), env=env)))
+    return procs
+
+
+def stop(procs, timeout=10):
+    for _, _, proc in procs:
+        if proc.poll() is None:
+            proc.terminate()
+    deadline = time.monotonic() + timeout
+    for _, _, proc in procs:
+        try:
+            proc.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def supervise(procs):
+    """Block until Ctrl-C/SIGTERM or until a worker exits, then stop the rest"""
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        while True:
+            for app, port, proc in procs:
+                if proc.poll() is not None:
+                    print(f"{app} on port {port} exited with {proc.returncode}; stopping the others", file=sys.stderr)
+                    return proc.returncode
+            time.sleep(1)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        stop(procs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the shared on-disk cache and run N workers per dashboard.")
+    parser.add_argument("--workers", type=int, default=2, help="Streamlit processes per app")
+    parser.add_argument("--apps", nargs="+", default=DEFAULT_APPS, choices=APPS, help="Dashboards to serve")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT)
+    parser.add_argument("--build-only", action="store_true", help="Build the cache and exit")
+    parser.add_argument("--skip-build", action="store_true", help="Serve the cache as it is")
+    parser.add_argument("--top-k", type=int, default=warm_figures.DEFAULT_TOP_K,
+                        help="Selections per app pre-rendered into the figure store")
+    args = parser.parse_args()
+
+    if not args.skip_build:
+        manifest, counts = build(apps=args.apps, top_k=args.top_k)
+        print(f"cache: {', '.join(f'{s} {n} rows' for s, n in manifest['sheets'].items())}, "
+              f"{sum(counts.values())} selections pre-rendered in {data_store.STORE_DIR}")
+    if args.build_only:
+        return
+
+    procs = launch(args.apps, args.workers, args.base_port)
+    for app, port, proc in procs:
+        print(f"{app}: http://localhost:{port} (pid {proc.pid})")
+    sys.exit(supervise(procs))
+
+
+if __name__ == "__main__":
+    main()
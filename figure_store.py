@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Pre-serialized figure JSON shared by every dashboard worker.
+#
+# deploy.py renders the figures most sessions ask for once, at build time, and
+# writes them under <store_dir>/figures/<version>/<app>/. A worker that needs one
+# of those figures loads the JSON file instead of building it (the page cache
+# keeps the files in memory once for all workers). The version is the data
+# snapshot the figure was drawn from, so a refreshed dataset never picks up an
+# old figure; anything not on disk is built live as before.
+#
+# warm_figures.py fills the store for the most common selections of both apps
+# by running them headlessly with FRI_FIGURE_CAPTURE=1: every figure built
+# through cached_figure() is then written out under the same key the app looks
+# it up by, so offline and live rendering share one code path.
+#
+# A worker parses each file and builds its figure once: the path names the
+# data version, so the file never changes under it, and later hits return the
+# same (read-only) figure without touching the disk.
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+
+import data_store
+
+FIGURES_DIR = "figures"
+CAPTURE_ENV = "FRI_FIGURE_CAPTURE"
+# Prebuilt figures kept per worker; a map_rounds figure is the largest at ~60 KB of JSON
+MAX_LOADED_FIGURES = 256
+
+
+def selection_key(selection):
+    """Stable file name for a selection (any JSON-able value; sets are sorted)"""
+    def normal(value):
+        if isinstance(value, (set, frozenset)):
+            return sorted(normal(v) for v in value)
+        if isinstance(value, (list, tuple)):
+            return [normal(v) for v in value]
+        return str(value)
+    return hashlib.sha256(json.dumps(normal(selection)).encode()).hexdigest()[:32]
+
+
+def figure_path(version, app, name, selection, store_dir=data_store.STORE_DIR):
+    return os.path.join(store_dir, FIGURES_DIR, version, app, f"{name}-{selection_key(selection)}.json")
+
+
+def save_figure(fig, version, app, name, selection, store_dir=data_store.STORE_DIR):
+    path = figure_path(version, app, name, selection, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(fig.to_json(validate=False))
+    os.replace(tmp_path, path)
+    return path
+
+
+@functools.lru_cache(maxsize=MAX_LOADED_FIGURES)
+def _read_figure(path):
+    # Raises for a missing file, so a figure written later is still found
+    with open(path, "r") as f:
+        spec = json.load(f)
+    import plotly.graph_objects as go
+
+    # Written by plotly itself, so validation would only repeat work
+    return go.Figure(spec, _validate=False)
+
+
+def load_figure(version, app, name, selection, store_dir=data_store.STORE_DIR):
+    """
+    The prebuilt figure, or None when there is none for this version and
+    selection. The figure is shared by every session of the worker: draw it,
+    don't modify it.
+    """
+    try:
+        return _read_figure(figure_path(version, app, name, selection, store_dir))
+    except (OSError, ValueError):
+        return None
+
+
+def is_capturing():
+    return os.environ.get(CAPTURE_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def cached_figure(version, app, name, selection, build, store_dir=data_store.STORE_DIR):
+    """
+    (figure, hit): the prebuilt figure when there is one, otherwise build().
+    While a warm-up is capturing, build() is always used and written out.
+    """
+    if is_capturing():
+        # Warm-up: always redraw, so every figure on disk is fresh from this run
+        fig = build()
+        save_figure(fig, version, app, name, selection, store_dir)
+        return fig, False
+    fig = load_figure(version, app, name, selection, store_dir)
+    if fig is not None:
+        return fig, True
+    return build(), False
+
+
+def _newest_mtime(path):
+    newest = 0.0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            newest = max(newest, os.path.getmtime(os.path.join(dirpath, name)))
+    return newest
+
+
+def prune(written_since, apps=None, store_dir=data_store.STORE_DIR):
+    """
+    Remove figures of versions no longer served: per app (all apps when None),
+    every version directory nothing was written to since `written_since`
+    """
+    root = os.path.join(store_dir, FIGURES_DIR)
+    if not os.path.isdir(root):
+        return []
+    removed = []
+    for version in os.listdir(root):
+        version_dir = os.path.join(root, version)
+        for app in os.listdir(version_dir):
+            if apps is not None and app not in apps:
+                continue
+            if _newest_mtime(os.path.join(version_dir, app)) < written_since:
+                shutil.rmtree(os.path.join(version_dir, app), ignore_errors=True)
+                removed.append(os.path.join(version, app))
+        if not os.listdir(version_dir):
+            os.rmdir(version_dir)
+    return removed
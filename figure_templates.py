@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Shared Plotly template and cached figure skeletons for both dashboards.
+#
+# Every chart used to rebuild the same layout on each rerun (fonts, margins,
+# the copyright footer, tick formats, colour scales) and Plotly validated all
+# of it again. Here each chart type is built once per shape as a "skeleton":
+# a validated layout plus one prototype trace per subplot cell. A rerun only
+# merges the data arrays (and a few per-selection values like the title) onto
+# the skeleton and skips validation.
+#
+# Plotly itself is imported, and the template registered, when the first
+# figure is built rather than when the dashboards start: a run served from
+# prebuilt figures (figure_store.py) never builds one, and make_subplots
+# (plotly.subplots) only comes in with the chart types laid out in a grid.
+
+import functools
+
+from resilience_categories import SEGMENT_CATEGORIES, discrete_colorscale
+
+TEMPLATE = "fri"
+FONT_FAMILY = "Avenir, sans-serif"
+FOOTER_TEXT = "© 2025 Financial Resilience Institute. All Rights Reserved."
+
+
+@functools.lru_cache(maxsize=None)
+def _plotly():
+    """plotly.graph_objects, with the dashboards' template registered on first use"""
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    template = go.layout.Template(pio.templates["plotly"])
+    template.layout.title.font.family = FONT_FAMILY
+    pio.templates[TEMPLATE] = template
+    return go
+
+
+def footer(y_position=-0.10):
+    """Copyright footer annotation; negative y places it below the chart area"""
+    return dict(
+        text=FOOTER_TEXT,
+        showarrow=False,
+        xref="paper", yref="paper",
+        x=0.98, y=y_position,
+        xanchor="right", yanchor="bottom",
+        font=dict(size=10, color="#888888", family=FONT_FAMILY)
+    )
+
+
+# ─────────────────────────────── Skeletons ───────────────────────────────
+
+def _choropleth():
+    go = _plotly()
+    fig = go.Figure(go.Choropleth(
+        featureidkey="properties.name",
+        hoverinfo="text",
+        showscale=False,
+        colorscale=discrete_colorscale,
+        zmin=-1,
+        zmax=3,
+        marker_line_color='white',
+        marker_line_width=0.5
+    ))
+    # The view sets the framing (map_views.geo_layout)
+    fig.update_geos(visible=False, projection_type="conic conformal")
+    fig.update_layout(
+        template=TEMPLATE,
+        title=dict(font=dict(size=20, family=FONT_FAMILY), x=0.5, xanchor='center'),
+        height=600,          # Shorter vertical height
+        width=2400,          # Much wider map; adjust as desired (900–1400 is typical)
+        autosize=False,      # Explicit sizing
+        margin=dict(l=0, r=0, t=30, b=10),
+        annotations=[footer(0.02)]
+    )
+    return fig
+
+
+_PIE_TRACE = dict(
+    marker=dict(line=dict(color="white", width=2)),
+    textinfo="label+percent",
+    hovertemplate="<b>%{label}</b><br>Proportion: %{value:.1%}<br>%{percent} of total",
+    sort=False
+)
+
+
+def _pie():
+    go = _plotly()
+    fig = go.Figure(go.Pie(hole=0.35, **_PIE_TRACE))
+    fig.update_layout(
+        template=TEMPLATE,
+        height=560,
+        margin=dict(t=80, b=120),
+        annotations=[
+            # Centre label, text filled in per chart
+            dict(text="", x=0.5, y=0.5, font_size=22, showarrow=False),
+            footer(-0.14)
+        ]
+    )
+    return fig
+
+
+def _pie_grid(rows, cols):
+    go = _plotly()
+    from plotly.subplots import make_subplots
+
+    # Blank subplot titles are placeholders, filled in per chart
+    fig = make_subplots(
+        rows=rows,
+        cols=cols,
+        specs=[[{"type": "pie"} for _ in range(cols)] for _ in range(rows)],
+        subplot_titles=[" "] * (rows * cols),
+        vertical_spacing=0.14,
+        horizontal_spacing=0.08
+    )
+    for idx in range(rows * cols):
+        fig.add_trace(go.Pie(**_PIE_TRACE), row=idx // cols + 1, col=idx % cols + 1)
+    fig.update_layout(
+        template=TEMPLATE,
+        height=380 * rows + 100,
+        title="Financial Resilience Segment Distribution – Actual Proportions",
+        margin=dict(t=80, b=140),
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=-0.15, xanchor="center", x=0.5)
+    )
+    fig.add_annotation(footer(-0.20))
+    return fig
+
+
+def _bar_grid(rows, cols, height, vertical_spacing):
+    go = _plotly()
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(
+        rows=rows,
+        cols=cols,
+        subplot_titles=[" "] * (rows * cols),
+        shared_yaxes=True,
+        horizontal_spacing=0.05,
+        vertical_spacing=vertical_spacing
+    )
+    for idx in range(rows * cols):
+        fig.add_trace(go.Bar(textposition='outside'), row=idx // cols + 1, col=idx % cols + 1)
+    fig.update_layout(
+        template=TEMPLATE,
+        title="Financial Resilience Distribution by Province and Year",
+        height=height,
+        barmode='group',
+        legend_title="Survey Round",
+        margin=dict(b=180, t=80)
+    )
+    fig.update_xaxes(tickangle=-45, categoryorder='array', categoryarray=SEGMENT_CATEGORIES)
+    fig.update_yaxes(tickformat=".0%", title="Proportion", col=1)
+    fig.add_annotation(footer(-0.12))
+    return fig
+
+
+# Vertical grouped bars: (trace style, layout) per dashboard case
+_BAR_VARIANTS = {
+    # Multiple provinces, single round
+    "by_province": (
+        dict(textfont_size=10),
+        dict(height=650, legend_title="Province", margin=dict(b=130, t=80), bargap=0.15, bargroupgap=0.05),
+    ),
+    # Single province, multiple rounds
+    "by_round": (
+        dict(textfont_size=10),
+        dict(height=650, legend_title="Survey Round", margin=dict(b=120, t=80), bargap=0.15, bargroupgap=0.1),
+    ),
+    # Single province, single round: one bar per segment in its own colour
+    "segments": (
+        dict(textfont_size=14),
+        dict(height=550, showlegend=False, xaxis_title="", margin=dict(b=120, t=80)),
+    ),
+}
+
+
+def _bar(variant):
+    go = _plotly()
+    trace_style, layout = _BAR_VARIANTS[variant]
+    fig = go.Figure(go.Bar(texttemplate='%{y:.1%}', textposition='outside', **trace_style))
+    fig.update_layout(
+        template=TEMPLATE,
+        barmode="group",
+        yaxis_tickformat=".0%",
+        xaxis_title="Segment",
+        yaxis_title="Proportion",
+        xaxis=dict(tickangle=0, categoryorder='array', categoryarray=SEGMENT_CATEGORIES),
+        annotations=[footer(-0.10)]
+    )
+    fig.update_layout(**layout)
+    return fig
+
+
+def _hbar():
+    go = _plotly()
+    fig = go.Figure(go.Bar(orientation='h', texttemplate='%{x:.1%}', textposition='outside'))
+    fig.update_layout(
+        template=TEMPLATE,
+        barmode="relative",
+        xaxis_tickformat=".0%",
+        yaxis_title="Segment",
+        xaxis_title="Proportion",
+        yaxis=dict(categoryorder='array', categoryarray=list(reversed(SEGMENT_CATEGORIES))),
+        height=max(500, 80 * len(SEGMENT_CATEGORIES) + 100),
+        legend_title="Province",
+        margin=dict(l=200, b=120, r=80, t=80),
+        annotations=[footer(-0.14)]
+    )
+    return fig
+
+
+def _line():
+    go = _plotly()
+    fig = go.Figure(go.Scatter(
+        mode='lines+markers',
+        marker=dict(size=9),
+        line=dict(width=3),
+        hovertemplate="<b>Segment:</b> %{legendgroup}<br>" +
+                      "<b>Province:</b> %{customdata[0]}<br>" +
+                      "<b>Survey Round:</b> %{x}<br>" +
+                      "<b>Proportion:</b> %{y:.1%}<extra></extra>"
+    ))
+    fig.update_layout(
+        template=TEMPLATE,
+        title="Financial Resilience Segments Trend Over Time",
+        yaxis_tickformat=".0%",
+        xaxis_title="Survey Round",
+        yaxis_title="Proportion",
+        height=550,
+        hovermode='x unified',
+        margin=dict(b=100, t=80),
+        annotations=[footer(-0.10)]
+    )
+    return fig
+
+
+_SKELETONS = {
+    "choropleth": _choropleth,
+    "pie": _pie,
+    "pie_grid": _pie_grid,
+    "bar_grid": _bar_grid,
+    "bar": _bar,
+    "hbar": _hbar,
+    "line": _line,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def skeleton(kind, *args):
+    """Validated {'data': [prototype per cell], 'layout': {...}} for a chart type; never mutate"""
+    return _SKELETONS[kind](*args).to_dict()
+
+
+def _merge(base, overrides):
+    """Nested dict merge that copies only the branches it changes"""
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def build_figure(kind, *args, traces=(), layout=None, annotation_texts=None, frames=None):
+    """
+    Figure from the cached skeleton of `kind`. Each trace dict is merged onto the
+    prototype of its subplot cell (`cell`, default 0); `layout` is merged onto the
+    skeleton layout and `annotation_texts` ({index: text}) fills in placeholder
+    annotations such as subplot titles. `frames` (animation frame dicts) are
+    passed through as they are.
+    """
+    skel = skeleton(kind, *args)
+    prototypes = skel["data"]
+    data = []
+    for trace in traces:
+        trace = dict(trace)
+        data.append(_merge(prototypes[trace.pop("cell", 0)], trace))
+
+    fig_layout = _merge(skel["layout"], layout or {})
+    if annotation_texts:
+        annotations = list(fig_layout["annotations"])
+        for idx, text in annotation_texts.items():
+            annotations[idx] = dict(annotations[idx], text=text)
+        fig_layout["annotations"] = annotations
+    return _plotly().Figure(data=data, layout=fig_layout, frames=frames, _validate=False)
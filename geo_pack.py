@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Pre-simplified province geometry for the choropleth.
+#
+# canada_provinces.geojson is ~700 KB of high-resolution outlines, but the map
+# is drawn at country scale. This builds a pack with the outlines simplified at
+# a few zoom levels (one per map view_mode) plus centroids and bounding boxes:
+#
+#     python geo_pack.py
+#
+# Simplification runs on the provinces as one coverage, so shared borders stay
+# identical between neighbours (no slivers or gaps). Like the data store, the
+# pack is rebuilt automatically when the source GeoJSON changes.
+#
+# The "provinces" entry is the zoom index used by the map: centroid, bbox and a
+# suggested projection_scale per province, keyed by properties.name.
+
+import argparse
+import json
+import math
+import os
+
+from data_store import STORE_DIR, file_hash
+
+GEOJSON_PATH = "canada_provinces.geojson"
+PACK_NAME = "province_geometry.json"
+PACK_VERSION = 2
+
+# tolerance/min_part_area in degrees, precision is the coordinate grid size
+GEOMETRY_LEVELS = {
+    "all": {"tolerance": 0.2, "min_part_area": 0.2, "precision": 0.01},
+    "multi": {"tolerance": 0.1, "min_part_area": 0.05, "precision": 0.01},
+    "single": {"tolerance": 0.02, "min_part_area": 0.0, "precision": 0.001},
+}
+
+# Zoom is relative to the whole country (projection_scale 1), capped like the
+# old fixed single-province zoom
+MAX_PROJECTION_SCALE = 10
+
+
+def _pack_path(store_dir):
+    return os.path.join(store_dir, PACK_NAME)
+
+
+def _coordinates(geometry):
+    """Flatten the (lon, lat) pairs of a Polygon/MultiPolygon"""
+    polygons = geometry["coordinates"]
+    if geometry["type"] == "Polygon":
+        polygons = [polygons]
+    for polygon in polygons:
+        for ring in polygon:
+            for lon, lat in ring:
+                yield lon, lat
+
+
+def geometry_bbox(geometry):
+    """[min_lon, min_lat, max_lon, max_lat] of a GeoJSON geometry"""
+    lons, lats = zip(*_coordinates(geometry))
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
+def union_bbox(bboxes):
+    bboxes = list(bboxes)
+    return [
+        min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+        max(b[2] for b in bboxes), max(b[3] for b in bboxes),
+    ]
+
+
+def _bbox_span(bbox):
+    """Largest side of a bbox in degrees of latitude (longitude shrunk by cos(lat))"""
+    mid_lat = math.radians((bbox[1] + bbox[3]) / 2)
+    return max((bbox[2] - bbox[0]) * math.cos(mid_lat), bbox[3] - bbox[1])
+
+
+def province_index(names, centroids, bboxes):
+    """{name: {centroid, bbox, projection_scale}} for the map zoom logic"""
+    country_span = _bbox_span(union_bbox(bboxes))
+    index = {}
+    for name, centroid, bbox in zip(names, centroids, bboxes):
+        scale = country_span / max(_bbox_span(bbox), 1e-6)
+        index[name] = {
+            "centroid": centroid,
+            "bbox": bbox,
+            "projection_scale": round(min(max(scale, 1.0), MAX_PROJECTION_SCALE), 2),
+        }
+    return index
+
+
+def zoom_settings(index, names):
+    """
+    Center and projection_scale framing the given provinces, None if none are
+    indexed. The scale is relative to the country's lon/lat ranges, which come
+    along so the map can be fitted to them (projection_scale 1 is the country).
+    """
+    known = [index[name] for name in names if name in index]
+    if not known:
+        return None
+    country = union_bbox(p["bbox"] for p in index.values())
+    ranges = {"lonaxis_range": [country[0], country[2]], "lataxis_range": [country[1], country[3]]}
+    if len(known) == 1:
+        lon, lat = known[0]["centroid"]
+        return {"center": {"lat": lat, "lon": lon}, "projection_scale": known[0]["projection_scale"], **ranges}
+    bbox = union_bbox(p["bbox"] for p in known)
+    scale = _bbox_span(country) / max(_bbox_span(bbox), 1e-6)
+    return {
+        "center": {"lat": (bbox[1] + bbox[3]) / 2, "lon": (bbox[0] + bbox[2]) / 2},
+        "projection_scale": round(min(max(scale, 1.0), MAX_PROJECTION_SCALE), 2),
+        **ranges,
+    }
+
+
+def _drop_small_parts(geom, min_area):
+    from shapely.geometry import MultiPolygon
+
+    parts = list(getattr(geom, "geoms", [geom]))
+    keep = [p for p in parts if p.area >= min_area]
+    # Never drop a province entirely, keep at least its largest part
+    return MultiPolygon(keep or [max(parts, key=lambda p: p.area)])
+
+
+def _simplify_levels(features):
+    import shapely
+    from shapely.geometry import mapping, shape
+
+    geoms = [shape(f["geometry"]) for f in features]
+    levels = {}
+    for level, cfg in GEOMETRY_LEVELS.items():
+        try:
+            simplified = shapely.coverage_simplify(geoms, cfg["tolerance"])
+        except (AttributeError, shapely.errors.GEOSException):
+            # Older GEOS: per-feature simplification (borders may drift slightly)
+            simplified = [g.simplify(cfg["tolerance"], preserve_topology=True) for g in geoms]
+        simplified = [_drop_small_parts(g, cfg["min_part_area"]) for g in simplified]
+        simplified = shapely.set_precision(simplified, cfg["precision"])
+        levels[level] = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": {"name": f["properties"]["name"]}, "geometry": mapping(g)}
+                for f, g in zip(features, simplified)
+            ],
+        }
+    centroids = [[round(c.x, 4), round(c.y, 4)] for c in shapely.centroid(geoms)]
+    return levels, centroids
+
+
+def make_pack(source=GEOJSON_PATH):
+    """Simplify every level and collect centroids/bboxes for each province"""
+    with open(source, "r") as f:
+        geojson = json.load(f)
+    features = geojson["features"]
+    levels, centroids = _simplify_levels(features)
+    return {
+        "version": PACK_VERSION,
+        "source": os.path.basename(source),
+        "source_sha256": file_hash(source),
+        "levels": levels,
+        "provinces": province_index(
+            [f["properties"]["name"] for f in features],
+            centroids,
+            [geometry_bbox(f["geometry"]) for f in features],
+        ),
+    }
+
+
+def write_pack(pack, store_dir=STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = _pack_path(store_dir) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(pack, f, separators=(",", ":"))
+    os.replace(tmp_path, _pack_path(store_dir))
+
+
+def build_pack(source=GEOJSON_PATH, store_dir=STORE_DIR):
+    """Build the pack and write it to <store_dir>"""
+    pack = make_pack(source)
+    write_pack(pack, store_dir)
+    return pack
+
+
+def _unsimplified_pack(source):
+    """Pack built from the raw GeoJSON, for when shapely is not installed"""
+    with open(source, "r") as f:
+        geojson = json.load(f)
+    features = geojson["features"]
+    bboxes = [geometry_bbox(f["geometry"]) for f in features]
+    # bbox centre stands in for the centroid
+    centroids = [[(b[0] + b[2]) / 2, (b[1] + b[3]) / 2] for b in bboxes]
+    return {
+        "version": PACK_VERSION,
+        "source": os.path.basename(source),
+        "levels": {level: geojson for level in GEOMETRY_LEVELS},
+        "provinces": province_index([f["properties"]["name"] for f in features], centroids, bboxes),
+    }
+
+
+def load_geometry_pack(source=GEOJSON_PATH, store_dir=STORE_DIR):
+    """Load the geometry pack, rebuilding it when missing or built from another GeoJSON"""
+    try:
+        with open(_pack_path(store_dir), "r") as f:
+            pack = json.load(f)
+        if pack.get("version") == PACK_VERSION and (
+            not os.path.exists(source) or pack.get("source_sha256") == file_hash(source)
+        ):
+            return pack
+    except (OSError, ValueError):
+        pass
+
+    try:
+        pack = make_pack(source)
+    except ImportError:
+        return _unsimplified_pack(source)
+    try:
+        write_pack(pack, store_dir)
+    except OSError:
+        # Read-only checkout: rebuild in memory on the next cold start
+        pass
+    return pack
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the simplified province geometry pack.")
+    parser.add_argument("--geojson", default=GEOJSON_PATH, help="Source province GeoJSON")
+    parser.add_argument("--out", default=STORE_DIR, help="Output directory for the pack")
+    args = parser.parse_args()
+
+    pack = build_pack(args.geojson, args.out)
+    for level, fc in pack["levels"].items():
+        size = len(json.dumps(fc, separators=(",", ":")))
+        print(f"{level}: {size / 1024:.0f} KB")
+    print(f"-> {_pack_path(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
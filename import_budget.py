@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import-time budget for the dashboards' startup path.
+#
+# Runs `python -X importtime` in a fresh interpreter that imports Streamlit
+# (which the pages always run under, and which itself brings in
+# plotly.graph_objects) and then the modules the pages import at startup.
+#
+#     lazy modules   plotly.subplots, plotly.colors, plotly.express and shapely
+#                    are only imported once a chart type (or a geometry build)
+#                    needs them; none may show up on the startup path
+#     budget         cumulative import time of the startup modules on top of
+#                    Streamlit, best of --repeat fresh interpreters, must stay
+#                    under --budget-ms. The best run is stable to a few percent;
+#                    the default leaves room for slower machines (about 360 ms
+#                    here, most of it pandas/pyarrow), and FRI_IMPORT_BUDGET_MS
+#                    overrides it
+#
+# Exit status 1 on either failure. tests/test_import_budget.py runs the same
+# checks under pytest.
+#
+#     python import_budget.py
+#     python import_budget.py --budget-ms 400 --repeat 5
+
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_MODULES = ["dashboard_data", "figure_store", "segment_charts", "map_views", "figure_templates"]
+LAZY_MODULES = ["plotly.subplots", "plotly.colors", "plotly.express", "shapely"]
+DEFAULT_BUDGET_MS = 600
+DEFAULT_REPEAT = 5
+BUDGET_ENV = "FRI_IMPORT_BUDGET_MS"
+BASELINE = "streamlit"
+
+
+def import_times(modules, baseline=BASELINE):
+    """[(self_us, cumulative_us, depth, name)] for importing `modules` after `baseline`, in a fresh interpreter"""
+    code = f"import {baseline}; import {', '.join(modules)}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def startup_cost(rows, modules=STARTUP_MODULES):
+    """Milliseconds spent importing `modules` (top-level entries only, so nothing is counted twice)"""
+    return sum(cumulative for _, cumulative, depth, name in rows if depth == 0 and name in modules) / 1000
+
+
+def after_baseline(rows, baseline=BASELINE):
+    """The rows imported after the baseline module had finished"""
+    for i, (_, _, depth, name) in enumerate(rows):
+        if depth == 0 and name == baseline:
+            return rows[i + 1:]
+    return rows
+
+
+def budget_ms():
+    return float(os.environ.get(BUDGET_ENV) or DEFAULT_BUDGET_MS)
+
+
+def best_startup(repeat=DEFAULT_REPEAT):
+    """Rows after the baseline of the fastest of `repeat` fresh interpreters"""
+    runs = [after_baseline(import_times(STARTUP_MODULES)) for _ in range(max(repeat, 1))]
+    return min(runs, key=startup_cost)
+
+
+def lazy_imported(rows, modules=LAZY_MODULES):
+    """The lazy modules that were imported anyway"""
+    imported = {name for _, _, _, name in rows}
+    return [module for module in modules if module in imported]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the dashboards' startup imports stay lazy and report their time.")
+    parser.add_argument("--budget-ms", type=float, default=budget_ms(),
+                        help=f"Most the startup modules' imports may take (default {DEFAULT_BUDGET_MS}, or ${BUDGET_ENV})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Fresh interpreters to run; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    rows = best_startup(args.repeat)
+    cost = startup_cost(rows)
+
+    failures = [f"{module} is imported at startup" for module in lazy_imported(rows)]
+    if cost > args.budget_ms:
+        failures.append(f"startup imports take {cost:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+
+    print(f"startup imports on top of {BASELINE}: {cost:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest (self time):")
+    for self_us, cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Streaming ingestion of respondent microdata into the dashboard data store.
+#
+# microdata.py holds every respondent in memory. For files larger than RAM,
+# this reads a CSV or Parquet file chunk by chunk and only keeps the additive
+# sums per (Survey round, Province): respondent count, weight, weighted score
+# and weight per segment (30/50/70 cutoffs). Memory is bounded by the number of
+# rounds x provinces, not by the input size. The finished sums become the
+# Index_score / Index_segment sheets, written to the Parquet store the apps read:
+#
+#     python ingest.py respondents.csv
+#     python ingest.py respondents.parquet --chunk-rows 500000 --out data_cache
+#
+# With respondents.parquet in the app directory the apps serve the store built
+# from it (load_ingested_sheets), checked against the file's hash; when it is
+# missing or stale they run the same streaming ingest themselves first.
+#
+# Survey rounds usually arrive as one file each. Given several files (or a
+# directory of them), the sums of each file are kept in <out>/ingest_sums/,
+# named by the file's sha256. Re-running after a new round is appended then
+# streams only the new or changed files and merges the rest from their sums:
+#
+#     python ingest.py rounds/
+
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import microdata
+
+CHUNK_ROWS = 1_000_000
+GROUP_COLUMNS = ["Survey round", "Province"]
+SUMS_DIR = "ingest_sums"
+INPUT_EXTENSIONS = (".csv", ".parquet", ".pq")
+CHANNEL_COLUMNS = [f"channel_{i}" for i in range(microdata.N_CHANNELS)]
+
+
+class LabelCodes:
+    """Growing label -> code table for one grouping column; code 0 is "missing" """
+
+    def __init__(self):
+        self.labels = []
+        self.position = {}
+
+    def encode(self, values):
+        """Codes for a chunk of values, registering labels seen for the first time"""
+        local, uniques = pd.factorize(values.astype(object))
+        mapping = np.empty(len(uniques) + 1, dtype=np.int64)
+        for i, label in enumerate(uniques):
+            label = str(label)
+            if label not in self.position:
+                self.labels.append(label)
+                self.position[label] = len(self.labels)
+            mapping[i] = self.position[label]
+        mapping[-1] = 0  # pd.factorize gives -1 for missing values
+        return mapping[local]
+
+
+class StreamingAccumulator:
+    """
+    Fixed-memory sums per (round, province). The dense (rounds + 1, provinces + 1,
+    N_CHANNELS) array grows only when a new round or province shows up; index 0
+    on each axis collects rows missing that value, so they still count towards
+    the totals above them.
+    """
+
+    def __init__(self):
+        self.rounds = LabelCodes()
+        self.provinces = LabelCodes()
+        self.stats = np.zeros((1, 1, microdata.N_CHANNELS))
+        self.rows = 0
+
+    def _grow(self):
+        shape = (len(self.rounds.labels) + 1, len(self.provinces.labels) + 1)
+        if shape != self.stats.shape[:2]:
+            pad = [(0, shape[0] - self.stats.shape[0]), (0, shape[1] - self.stats.shape[1]), (0, 0)]
+            self.stats = np.pad(self.stats, pad)
+
+    def add(self, chunk, weight_col=microdata.WEIGHT_COL, score_col=microdata.RESPONDENT_SCORE_COL):
+        r = self.rounds.encode(chunk["Survey round"])
+        p = self.provinces.encode(chunk["Province"])
+        self._grow()
+        n_provinces = self.stats.shape[1]
+        flat = self.stats.reshape(-1, microdata.N_CHANNELS)
+        microdata.add_chunk(
+            flat, r * n_provinces + p,
+            *microdata.row_channels(chunk[weight_col].to_numpy(), chunk[score_col].to_numpy())
+        )
+        self.rows += len(chunk)
+
+    def sums_frame(self):
+        """Non-empty (round, province) sums as a frame, missing labels as None; merge() reads it back"""
+        cells = self.stats.reshape(-1, microdata.N_CHANNELS)
+        r_idx, p_idx = np.unravel_index(np.arange(len(cells)), self.stats.shape[:2])
+        present = cells[:, microdata.RESPONDENTS] > 0
+        rounds = np.array([None] + self.rounds.labels, dtype=object)
+        provinces = np.array([None] + self.provinces.labels, dtype=object)
+        frame = pd.DataFrame(cells[present], columns=CHANNEL_COLUMNS)
+        frame.insert(0, "Province", provinces[p_idx[present]])
+        frame.insert(0, "Survey round", rounds[r_idx[present]])
+        return frame
+
+    def merge(self, sums):
+        """Add a sums_frame() (e.g. another file's) into this accumulator"""
+        r = self.rounds.encode(sums["Survey round"])
+        p = self.provinces.encode(sums["Province"])
+        self._grow()
+        flat = self.stats.reshape(-1, microdata.N_CHANNELS)
+        np.add.at(flat, r * self.stats.shape[1] + p, sums[CHANNEL_COLUMNS].to_numpy())
+        self.rows += int(sums[CHANNEL_COLUMNS[microdata.RESPONDENTS]].sum())
+
+    def summaries(self):
+        """(per Province x Survey round, per Survey round) summaries, rounds in chronological order"""
+        order = sorted(range(len(self.rounds.labels)), key=lambda i: data_store.survey_round_key(self.rounds.labels[i]))
+        rounds = [self.rounds.labels[i] for i in order]
+        stats = self.stats[[0] + [i + 1 for i in order]]
+
+        # Canada: every province (and rows without one) summed; rows without a round are dropped
+        national = stats[1:].sum(axis=1)
+        present = national[:, microdata.RESPONDENTS] > 0
+        by_round = microdata.summarize({"Survey round": np.array(rounds, dtype=object)[present]}, national[present])
+
+        cells = stats[1:, 1:].reshape(-1, microdata.N_CHANNELS)
+        r_idx, p_idx = np.unravel_index(np.arange(len(cells)), stats[1:, 1:].shape[:2])
+        present = cells[:, microdata.RESPONDENTS] > 0
+        by_province = microdata.summarize({
+            "Province": np.array(self.provinces.labels, dtype=object)[p_idx[present]],
+            "Survey round": np.array(rounds, dtype=object)[r_idx[present]],
+        }, cells[present])
+        return by_province.sort_values(["Province"], kind="stable").reset_index(drop=True), by_round
+
+    def dashboard_sheets(self, country="Canada"):
+        return microdata.dashboard_sheets(*self.summaries(), country=country)
+
+
+def read_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    """DataFrame chunks of `columns` from a CSV or Parquet file"""
+    if path.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def ingest(path, chunk_rows=CHUNK_ROWS, weight_col=microdata.WEIGHT_COL, score_col=microdata.RESPONDENT_SCORE_COL):
+    """Stream a respondents file through a StreamingAccumulator"""
+    acc = StreamingAccumulator()
+    for chunk in read_chunks(path, GROUP_COLUMNS + [weight_col, score_col], chunk_rows):
+        acc.add(chunk, weight_col, score_col)
+    return acc
+
+
+def input_files(paths):
+    """Expand directories to the CSV/Parquet files in them, in name order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(INPUT_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def ingest_files(paths, sums_dir=None, chunk_rows=CHUNK_ROWS,
+                 weight_col=microdata.WEIGHT_COL, score_col=microdata.RESPONDENT_SCORE_COL):
+    """
+    One accumulator over several files. With `sums_dir`, each file's sums are
+    cached under its content hash, so unchanged files are merged without being
+    read again. Returns (accumulator, {path: True if it was streamed}, combined hash).
+    """
+    acc = StreamingAccumulator()
+    streamed = {}
+    hashes = []
+    for path in paths:
+        sha = data_store.file_hash(path)
+        hashes.append(sha)
+        # The column choice changes the sums, so it is part of the key
+        key = hashlib.sha256(f"{sha}\0{weight_col}\0{score_col}".encode()).hexdigest()
+        sums_path = os.path.join(sums_dir, key + ".parquet") if sums_dir else None
+        if sums_path and os.path.exists(sums_path):
+            acc.merge(pd.read_parquet(sums_path))
+            streamed[path] = False
+            continue
+        sums = ingest(path, chunk_rows, weight_col, score_col).sums_frame()
+        if sums_path:
+            os.makedirs(sums_dir, exist_ok=True)
+            tmp_path = sums_path + ".tmp"
+            sums.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, sums_path)
+        acc.merge(sums)
+        streamed[path] = True
+    return acc, streamed, data_store.combine_hashes(hashes)
+
+
+def source_name(paths):
+    """What the store manifest records as the source of an ingest of `paths`"""
+    return os.path.basename(paths[0]) if len(paths) == 1 else f"{len(paths)} files"
+
+
+def load_ingested_sheets(path, sheets=data_store.SHEETS, store_dir=data_store.STORE_DIR):
+    """
+    {sheet: frame} from a respondents file, in fixed memory: read back from the
+    store when it was ingested from this file, otherwise streamed now (merging
+    any cached per-file sums) and written to the store for the next load
+    """
+    manifest = data_store.read_manifest(store_dir) or {}
+    if manifest.get("source") == source_name([path]):
+        try:
+            if data_store.is_prebuilt() or manifest.get("source_sha256") == data_store.sources_hash([path]):
+                return {sheet: data_store.read_store(sheet, store_dir) for sheet in sheets}
+        except (ImportError, OSError, ValueError):
+            pass
+
+    acc, _, sha = ingest_files([path], os.path.join(store_dir, SUMS_DIR))
+    frames = acc.dashboard_sheets()
+    try:
+        data_store.build_store(store_dir=store_dir, frames=frames, source=source_name([path]), source_sha256=sha,
+                               source_files=[path])
+    except (ImportError, OSError, ValueError):
+        # Read-only checkout: serve this ingest without storing it
+        pass
+    return {sheet: frames[sheet] for sheet in sheets}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate respondent microdata (CSV/Parquet) into the data store.")
+    parser.add_argument("input", nargs="+", help="Respondents files (.csv or .parquet) or directories of them")
+    parser.add_argument("--out", default=data_store.STORE_DIR, help="Output directory for the Parquet store")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows read per chunk")
+    parser.add_argument("--weight-col", default=microdata.WEIGHT_COL)
+    parser.add_argument("--score-col", default=microdata.RESPONDENT_SCORE_COL)
+    parser.add_argument("--no-cache", action="store_true", help="Stream every file, ignoring the per-file sums")
+    args = parser.parse_args()
+
+    files = input_files(args.input)
+    if not files:
+        parser.error("no .csv or .parquet input files")
+    sums_dir = None if args.no_cache else os.path.join(args.out, SUMS_DIR)
+    acc, streamed, sha = ingest_files(files, sums_dir, args.chunk_rows, args.weight_col, args.score_col)
+    sheets = acc.dashboard_sheets()
+    previous = data_store.read_manifest(args.out) or {}
+    manifest = data_store.build_store(store_dir=args.out, frames=sheets, source=source_name(files), source_sha256=sha,
+                                      source_files=files)
+    print(f"{acc.rows:,} respondents, {len(acc.rounds.labels)} rounds, {len(acc.provinces.labels)} provinces")
+    if sums_dir:
+        print(f"{sum(streamed.values())} of {len(files)} files streamed, the rest merged from {sums_dir}")
+    for sheet, rows in manifest["sheets"].items():
+        changed = data_store.changed_rounds(previous.get("rounds", {}).get(sheet, {}), manifest["rounds"][sheet])
+        note = f" ({len(changed)} rounds new or changed)" if previous and changed else ""
+        print(f"{sheet}: {rows} rows -> {os.path.join(args.out, sheet + '.parquet')}{note}")
+    # POSIX only; ru_maxrss is in kilobytes on Linux
+    import resource
+
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Hot-swappable data for the running dashboards.
+#
+# A LiveData object lives in st.cache_resource, so every session shares it.
+# Each rerun calls current(), which stats the source files (workbook, store
+# manifest, respondents file). When one of them has changed, the sheets are
+# reloaded and hashed per survey round (data_store.round_hashes). The app's
+# `derive` callback then gets the previous snapshot and the rounds that changed,
+# so it only recomputes what depends on those rounds and carries the rest over.
+# The new Snapshot replaces the old one in a single assignment. A run that
+# already holds the old snapshot finishes on it; the next rerun sees the new
+# data. No cold restart is needed. Sessions all read the same frames and
+# derived objects, so nothing in a snapshot may be modified in place; pandas
+# copy-on-write turns their slices into lazy copies.
+#
+# start_watcher() adds a daemon thread that polls the same files every
+# FRI_WATCH_INTERVAL seconds (default 5, 0 = off). Replacing the data file then
+# triggers a single reload in the background, shared by every session, and
+# reruns stay off the slow path. Each snapshot carries `token`, the mtime/size
+# signature it was loaded from. Functions cached with st.cache_data take it as
+# an argument, so their entries follow the data instead of living until a
+# restart.
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import data_store
+import microdata
+
+WATCH_ENV = "FRI_WATCH_INTERVAL"
+DEFAULT_WATCH_INTERVAL = 5.0
+
+log = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """One consistent version of the sheets plus whatever the app derived from them"""
+
+    def __init__(self, sheets, round_hashes, derived, changed=None, token=""):
+        self.sheets = sheets
+        self.token = token
+        self.round_hashes = round_hashes
+        self.derived = derived
+        # {sheet: rounds that differ from the previous snapshot}; None on the first load
+        self.changed = changed
+        digest = hashlib.sha256()
+        for sheet in sorted(round_hashes):
+            for label, value in sorted(round_hashes[sheet].items()):
+                digest.update(f"{sheet}\0{label}\0{value}\n".encode())
+        self.version = digest.hexdigest()
+
+    def __getitem__(self, name):
+        return self.derived[name]
+
+    def round_version(self, sheet, label):
+        """Content hash of one survey round, for caches that only depend on that round"""
+        return self.round_hashes[sheet].get(str(label), "")
+
+
+def file_signature(paths):
+    """(path, mtime, size) per path; a missing file is (path, None, None)"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def file_token(*paths):
+    """Short version token from the files' mtime and size, for use as a cache key"""
+    return hashlib.sha256(repr(file_signature(paths)).encode()).hexdigest()[:16]
+
+
+def source_signature(workbook=data_store.WORKBOOK_PATH, store_dir=data_store.STORE_DIR,
+                     microdata_path=microdata.MICRODATA_PATH):
+    """Signature of every file the sheets can come from; cheap enough to check on each rerun"""
+    return file_signature([microdata_path, workbook, os.path.join(store_dir, data_store.MANIFEST_NAME)])
+
+
+def watch_interval():
+    try:
+        return float(os.environ.get(WATCH_ENV, DEFAULT_WATCH_INTERVAL))
+    except ValueError:
+        return DEFAULT_WATCH_INTERVAL
+
+
+class LiveData:
+    """
+    Holds the current Snapshot. `derive(sheets, previous, changed)` returns a
+    dict of derived objects; `previous` is the old Snapshot (None on first load)
+    and `changed` maps each sheet to the rounds added, removed or modified.
+    `watch_paths` are extra files (e.g. the GeoJSON) whose change also counts
+    as new data.
+    """
+
+    def __init__(self, sheets, derive, load=microdata.load_dashboard_sheets, signature=source_signature,
+                 watch_paths=()):
+        self.sheet_names = list(sheets)
+        self.derive = derive
+        self.load = load
+        self.source_signature = signature
+        self.watch_paths = tuple(watch_paths)
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self._signature = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.refresh()
+
+    def signature(self):
+        return self.source_signature() + file_signature(self.watch_paths)
+
+    def current(self):
+        """The latest snapshot, refreshing first when a source file has changed"""
+        if self.signature() != self._signature:
+            try:
+                self.refresh()
+            except (OSError, ValueError, KeyError):
+                # A file caught mid-write; keep serving the last good data and retry next time
+                self.failed_refreshes += 1
+        return self._snapshot
+
+    def start_watcher(self, interval=None):
+        """Poll the source files from a daemon thread so changes load in the background; idempotent"""
+        interval = watch_interval() if interval is None else interval
+        if interval <= 0 or self._watcher is not None:
+            return self
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="live-data-watcher", daemon=True)
+        self._watcher.start()
+        return self
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.current()
+            except Exception:
+                # A failed reload mustn't end the thread, or hot reload stops for good
+                log.exception("Reloading the dashboard data failed; retrying in %s s", interval)
+
+    def refresh(self):
+        # One refresh at a time; other sessions keep reading the old snapshot meanwhile
+        with self._lock:
+            if self.signature() == self._signature:
+                return self._snapshot
+            sheets = self.load(self.sheet_names)
+            # Taken after the load, which may itself rewrite the store manifest;
+            # otherwise the next poll would see that write and reload for nothing
+            signature = self.signature()
+            token = hashlib.sha256(repr(signature).encode()).hexdigest()[:16]
+            hashes = {sheet: data_store.round_hashes(df) for sheet, df in sheets.items()}
+            previous = self._snapshot
+            watched = len(self.watch_paths)
+            if (previous is not None and hashes == previous.round_hashes
+                    and signature[len(signature) - watched:] == self._signature[len(signature) - watched:]):
+                # Touched but identical (e.g. the store rebuilt from the same workbook):
+                # keep the old snapshot and token so nothing keyed on them goes cold
+                self._signature = signature
+                return previous
+            changed = None
+            if previous is not None:
+                changed = {
+                    sheet: data_store.changed_rounds(previous.round_hashes.get(sheet, {}), hashes[sheet])
+                    for sheet in sheets
+                }
+            derived = self.derive(sheets, previous, changed)
+            self._snapshot = Snapshot(sheets, hashes, derived, changed, token)
+            self._signature = signature
+            self.refreshes += 1
+            return self._snapshot
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Precomputed views for the index score map.
+#
+# Everything the map page draws for a (survey round, province selection) pair
+# - the sub-FeatureCollection, z codes, hover text, zoom and the Key Statistics
+# values - is built once and kept in a small LRU shared by all sessions, so a
+# repeated selection is a dictionary lookup instead of a re-filter of the data.
+# The scores are sorted by survey round once, so a view starts from a slice of
+# that shared frame (a view under pandas copy-on-write) rather than a copy.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from figure_templates import build_figure
+from geo_pack import zoom_settings
+from resilience_categories import categorize_scores
+
+SCORE_COL = "Mean Financial Resilience Score"
+ALL_PROVINCES = "All provinces"
+# Bump when map_figure()/rounds_figure() draw differently, so prebuilt figures are redrawn
+MAP_LAYOUT_VERSION = 2
+
+
+def view_key(selected_year, selected_provinces):
+    """Cache key: the survey round plus the (unordered) province selection"""
+    provinces = frozenset(selected_provinces)
+    if not provinces or ALL_PROVINCES in provinces:
+        provinces = frozenset([ALL_PROVINCES])
+    return selected_year, provinces
+
+
+def _top_bottom(rows, n=3):
+    top = rows.nlargest(n, SCORE_COL)
+    bottom = rows.nsmallest(n, SCORE_COL)
+    return (
+        list(zip(top["Province"].astype(str), top[SCORE_COL])),
+        list(zip(bottom["Province"].astype(str), bottom[SCORE_COL])),
+    )
+
+
+def build_map_view(round_rows, national, geo_pack, selected_year, provinces):
+    """
+    Build one map view. `round_rows` holds the provincial rows of the selected
+    round with scores already rounded to 1 decimal, `national` the Canada-wide
+    score per survey round.
+    """
+    province_index = geo_pack["provinces"]
+    if ALL_PROVINCES in provinces:
+        display_provinces = list(province_index)
+        view_mode = "all"
+    else:
+        # Map order first, then anything the map doesn't know about
+        order = {name: i for i, name in enumerate(province_index)}
+        display_provinces = sorted(provinces, key=lambda p: (order.get(p, len(order)), p))
+        view_mode = "single" if len(display_provinces) == 1 else "multi"
+
+    # Coarser outlines the further out the map is zoomed
+    geojson = geo_pack["levels"][view_mode]
+    if view_mode != "all":
+        geojson = {
+            "type": "FeatureCollection",
+            "features": [f for f in geojson["features"] if f["properties"]["name"] in provinces],
+        }
+
+    table = round_rows[round_rows["Province"].isin(display_provinces)].reset_index(drop=True)
+    categories = categorize_scores(display_provinces, table)
+
+    stats = {"national_score": national.get(selected_year)}
+    if not table.empty:
+        stats["top"], stats["bottom"] = _top_bottom(table)
+        stats["average"] = table[SCORE_COL].mean()
+        stats["first"] = (str(table["Province"].iloc[0]), table[SCORE_COL].iloc[0])
+
+    return {
+        "view_mode": view_mode,
+        "display_provinces": display_provinces,
+        "geojson": geojson,
+        "z_codes": categories["code"].tolist(),
+        "hover_labels": categories["hover"].tolist(),
+        "zoom": zoom_settings(province_index, display_provinces),
+        "table": table,
+        "stats": stats,
+    }
+
+
+def geo_layout(zoom):
+    """
+    Smart zooming with conic conformal projection (precomputed, see geo_pack.py).
+    Plotly fits the map to the country's lon/lat ranges, then zooms by
+    projection_scale around the center; fitbounds would override both, so it is
+    off unless there is no zoom (nothing on the map is indexed).
+    """
+    if not zoom:
+        return dict(fitbounds="locations")
+    lon_range = zoom["lonaxis_range"]
+    return dict(
+        fitbounds=False,
+        lonaxis=dict(range=lon_range),
+        lataxis=dict(range=zoom["lataxis_range"]),
+        center=zoom["center"],
+        # Same orientation for every view: the country's central meridian
+        projection=dict(scale=zoom["projection_scale"], rotation=dict(lon=(lon_range[0] + lon_range[1]) / 2))
+    )
+
+
+def map_figure(view, selected_year):
+    """The choropleth for one view; styling, colour scale and footer come from the cached skeleton"""
+    layout = dict(
+        title=dict(text=f"Provincial Mean Financial Resilience Score — {selected_year}"),
+        geo=geo_layout(view["zoom"])
+    )
+    return build_figure(
+        "choropleth",
+        traces=[dict(
+            geojson=view["geojson"],
+            locations=view["display_provinces"],
+            z=view["z_codes"],
+            text=view["hover_labels"]
+        )],
+        layout=layout
+    )
+
+
+def _animation_args(duration):
+    return dict(mode="immediate", frame=dict(duration=duration, redraw=True), transition=dict(duration=0))
+
+
+def rounds_figure(round_views, selected_year, frame_ms=900):
+    """
+    Every survey round in one choropleth, for [(round, view)] of one province
+    selection in chronological order. The geometry is sent once, with the base
+    trace; each round is a Plotly frame carrying only its z codes, hover text
+    and title, so the slider and play button step through rounds in the browser.
+    """
+    years = [year for year, _ in round_views]
+    views = dict(round_views)
+    active = selected_year if selected_year in views else years[-1]
+
+    def title(year):
+        return dict(text=f"Provincial Mean Financial Resilience Score — {year}")
+
+    # The type is repeated so Plotly.js updates the trace instead of replacing it
+    frames = [
+        dict(
+            name=year,
+            data=[dict(type="choropleth", z=view["z_codes"], text=view["hover_labels"])],
+            traces=[0],
+            layout=dict(title=title(year))
+        )
+        for year, view in round_views
+    ]
+    steps = [dict(method="animate", label=year, args=[[year], _animation_args(0)]) for year in years]
+    layout = dict(
+        title=title(active),
+        margin=dict(b=90),
+        sliders=[dict(
+            active=years.index(active), steps=steps, x=0.08, len=0.9, y=0, yanchor="top",
+            pad=dict(t=10), currentvalue=dict(prefix="Survey round: ", font=dict(size=14))
+        )],
+        updatemenus=[dict(
+            type="buttons", direction="left", showactive=False, x=0.08, xanchor="right", y=0, yanchor="top",
+            pad=dict(t=10, r=10),
+            buttons=[
+                dict(label="▶ Play", method="animate", args=[None, dict(_animation_args(frame_ms), fromcurrent=True)]),
+                dict(label="❚❚ Pause", method="animate", args=[[None], _animation_args(0)]),
+            ]
+        )]
+    )
+    view = views[active]
+    layout["geo"] = geo_layout(view["zoom"])
+    return build_figure(
+        "choropleth",
+        traces=[dict(
+            geojson=view["geojson"],
+            locations=view["display_provinces"],
+            z=view["z_codes"],
+            text=view["hover_labels"]
+        )],
+        layout=layout,
+        frames=frames
+    )
+
+
+def figure_version(data_version, geo_pack):
+    """Version of a prebuilt map figure: the data snapshot, the geometry it was drawn with and the map layout"""
+    return (f"{data_version[:16]}-{str(geo_pack.get('source_sha256', ''))[:16]}-v{geo_pack.get('version', 0)}"
+            f"-m{MAP_LAYOUT_VERSION}")
+
+
+class MapViewCache:
+    """LRU of map views keyed by (selected_year, frozenset(selected_provinces))"""
+
+    def __init__(self, dataset, geo_pack, maxsize=128):
+        # One rounded copy up front instead of a .round(1) on every rerun
+        provincial = dataset[dataset["Province"].notnull()].copy()
+        provincial[SCORE_COL] = provincial[SCORE_COL].round(1)
+        rounds = np.asarray(provincial["Survey round"].astype(object).fillna(""), dtype=str)
+        order = np.argsort(rounds, kind="stable")
+        self.scores = provincial.iloc[order].reset_index(drop=True)
+        # survey round -> (start, stop) of its rows in self.scores
+        labels = rounds[order]
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if len(labels) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(labels)]
+        self._round_slices = {labels[a]: (a, b) for a, b in zip(starts, stops)}
+        national = dataset[dataset["Province"].isnull()].drop_duplicates("Survey round")
+        self.national = dict(zip(national["Survey round"].astype(str), national[SCORE_COL]))
+        self.geo_pack = geo_pack
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def carry_over(self, other, changed_rounds):
+        """
+        Copy views from `other` (the cache for the previous data) whose survey
+        round is not in `changed_rounds`. Views only depend on their own round's
+        rows and national score, so after a refresh just the changed rounds are
+        rebuilt. Call before this cache is shared.
+        """
+        changed = set(changed_rounds)
+        if other.geo_pack is not self.geo_pack:
+            return 0
+        with other._lock:
+            kept = [(key, view) for key, view in other._views.items() if key[0] not in changed]
+        for key, view in kept[-self.maxsize:]:
+            self._views[key] = view
+        return len(self._views)
+
+    def get(self, selected_year, selected_provinces):
+        key = view_key(selected_year, selected_provinces)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                self.hits += 1
+                return view
+            self.misses += 1
+
+        start, stop = self._round_slices.get(str(key[0]), (0, 0))
+        view = build_map_view(self.scores.iloc[start:stop], self.national, self.geo_pack, *key)
+        with self._lock:
+            self._views[key] = view
+            self._views.move_to_end(key)
+            while len(self._views) > self.maxsize:
+                self._views.popitem(last=False)
+        return view
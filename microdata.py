@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Respondent-level aggregation engine.
+#
+# The workbook only carries pre-aggregated scores and segment proportions. With
+# respondent microdata (one row per respondent: survey round, province,
+# demographic columns, a survey weight and a 0-100 resilience score) this
+# computes the same numbers for any group-by and filter, e.g. score by income
+# band in Ontario for June 2025:
+#
+#     engine = MicrodataEngine(respondents)
+#     engine.aggregate(["Income"], {"Province": ["Ontario"], "Survey round": ["June 2025"]})
+#
+# Every dimension is integer-coded once, with a per-dimension index (row
+# positions grouped by code). Aggregation is a weighted np.bincount pass over
+# fixed-size chunks, with segments from the shared 30/50/70 cutoffs. Weighted
+# means and shares are ratios of additive sums, so the engine makes that pass
+# once over all dimensions at load and keeps the sums as a small dense cube;
+# every later group-by/filter is a slice-and-sum of the cube (sub-millisecond
+# on 10M rows). Crosses too large for a cube fall back to the row pass, where
+# the indexes make a filter touch only the rows it selects. Results are kept
+# in a small LRU (like map_views.MapViewCache) so repeated selections are free.
+#
+# When a respondents file is present, load_dashboard_sheets() serves both apps
+# the Index_score / Index_segment sheets ingest.py streamed from it, in fixed
+# memory. Holding the respondents in an engine in the app process is opt-in
+# (FRI_MICRODATA_ENGINE=1), since it scales with the file.
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from resilience_categories import SEGMENT_CATEGORIES, score_codes
+
+MICRODATA_PATH = "respondents.parquet"
+ENGINE_ENV = "FRI_MICRODATA_ENGINE"
+WEIGHT_COL = "Survey weight"
+RESPONDENT_SCORE_COL = "Financial Resilience Score"
+SCORE_COL = "Mean Financial Resilience Score"
+DIMENSIONS = ["Survey round", "Province", "Age group", "Income", "Household type"]
+
+# Rows per bincount pass; bounds the temporary key/weight arrays
+CHUNK_ROWS = 1 << 21
+
+
+def _encode(values, key=None):
+    """(codes, labels) for a column, labels sorted (by `key` if given); missing values get code -1"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        labels = [str(c) for c in values.cat.categories]
+        codes = values.cat.codes.to_numpy()
+    else:
+        codes, uniques = pd.factorize(values.astype(object))
+        labels = [str(u) for u in uniques]
+    order = sorted(range(len(labels)), key=lambda i: key(labels[i]) if key else labels[i])
+    # rank[-1] = -1 keeps missing values missing
+    rank = np.full(len(labels) + 1, -1, dtype=np.int32)
+    rank[order] = np.arange(len(labels), dtype=np.int32)
+    return rank[codes], [labels[i] for i in order]
+
+
+class DimensionIndex:
+    """Integer codes of one dimension plus the row positions of every code"""
+
+    def __init__(self, codes, labels):
+        self.codes = codes
+        self.labels = labels
+        self.position = {label: i for i, label in enumerate(labels)}
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        row_dtype = np.int32 if len(codes) < 2 ** 31 else np.int64
+        # Stable sort keeps rows in file order within each code; the -1 rows sort first
+        order = np.argsort(codes, kind="stable").astype(row_dtype)
+        self.order = order[len(codes) - counts.sum():]
+
+    def code_list(self, labels):
+        """Sorted, distinct codes of the known `labels`"""
+        return sorted({self.position[l] for l in labels if l in self.position})
+
+    def count(self, labels):
+        return int(sum(self.offsets[c + 1] - self.offsets[c] for c in self.code_list(labels)))
+
+    def rows(self, labels):
+        """Row positions holding any of `labels`"""
+        parts = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in self.code_list(labels)]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self.order.dtype)
+
+    def mask(self, labels):
+        """Boolean lookup table by code (index -1 = missing, never selected)"""
+        table = np.zeros(len(self.labels) + 1, dtype=bool)
+        table[self.code_list(labels)] = True
+        return table
+
+
+# Sufficient statistics per group; every dashboard number is a ratio of these sums
+N_FIXED_CHANNELS = 4          # respondents, weight, scored weight, weighted score
+RESPONDENTS, WEIGHT, SCORED, SCORE = range(N_FIXED_CHANNELS)
+N_CHANNELS = N_FIXED_CHANNELS + len(SEGMENT_CATEGORIES)
+
+# Largest full cross-tab (product of dimension sizes) kept as a cube
+MAX_CUBE_CELLS = 1 << 20
+
+
+def row_channels(weight, score):
+    """
+    Per-respondent inputs to the sums: (weight, scored weight, weighted score,
+    segment code). Unscored respondents count towards the respondent total but
+    not the mean or the shares.
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    score = np.asarray(score, dtype=np.float64)
+    segment = score_codes(score).astype(np.int8)
+    scored = segment >= 0
+    weight = np.where(np.isnan(weight), 0.0, weight)
+    return (
+        weight,
+        np.where(scored, weight, 0.0),
+        np.where(scored, weight * np.nan_to_num(score), 0.0),
+        segment,
+    )
+
+
+def add_chunk(stats, key, weight, scored_weight, weighted_score, segment):
+    """Add one chunk of rows to `stats` (groups, N_CHANNELS); rows with key -1 are skipped"""
+    n_groups = len(stats)
+    n_seg = len(SEGMENT_CATEGORIES)
+    keep = key >= 0
+    if not keep.all():
+        key, segment, weight = key[keep], segment[keep], weight[keep]
+        scored_weight, weighted_score = scored_weight[keep], weighted_score[keep]
+
+    stats[:, RESPONDENTS] += np.bincount(key, minlength=n_groups)
+    stats[:, WEIGHT] += np.bincount(key, weights=weight, minlength=n_groups)
+    stats[:, SCORE] += np.bincount(key, weights=weighted_score, minlength=n_groups)
+    # Unscored rows land in a segment slot with zero weight
+    segments = np.bincount(key * n_seg + np.maximum(segment, 0), weights=scored_weight,
+                           minlength=n_groups * n_seg)
+    stats[:, N_FIXED_CHANNELS:] += segments.reshape(n_groups, n_seg)
+    stats[:, SCORED] = stats[:, N_FIXED_CHANNELS:].sum(axis=1)
+
+
+def summarize(groups, stats):
+    """
+    Frame of the group columns ({name: values}) plus respondent count, total
+    weight, weighted mean score and segment shares from (groups, N_CHANNELS) sums
+    """
+    frame = dict(groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frame["Respondents"] = stats[:, RESPONDENTS].astype(np.int64)
+        frame["Weight"] = stats[:, WEIGHT]
+        frame[SCORE_COL] = stats[:, SCORE] / stats[:, SCORED]
+        shares = stats[:, N_FIXED_CHANNELS:] / stats[:, SCORED, None]
+    for i, segment in enumerate(SEGMENT_CATEGORIES):
+        frame[segment] = shares[:, i]
+    return pd.DataFrame(frame)
+
+
+def long_shares(summary, by):
+    """Segment share columns of a summary in the long Index_segment layout"""
+    return summary.melt(
+        id_vars=list(by), value_vars=SEGMENT_CATEGORIES,
+        var_name="Index segments", value_name="Proportion"
+    )
+
+
+def dashboard_sheets(by_province, national, country="Canada"):
+    """
+    Index_score / Index_segment in the workbook layout from two summaries: per
+    (Province, Survey round) and per Survey round (the Canada rows, blank Province)
+    """
+    sheets = {}
+    for sheet in data_store.SHEETS:
+        parts = []
+        for summary, by in ((by_province, ["Province", "Survey round"]), (national, ["Survey round"])):
+            part = summary[by + [SCORE_COL]] if sheet == "Index_score" else long_shares(summary, by)
+            parts.append(part.astype({d: object for d in by}))
+        frame = pd.concat(parts, ignore_index=True)
+        frame.insert(0, "Country", country)
+        columns = (["Country", "Province", "Survey round", SCORE_COL] if sheet == "Index_score"
+                   else ["Country", "Province", "Index segments", "Survey round", "Proportion"])
+        sheets[sheet] = data_store.to_store_types(frame[columns])
+    return sheets
+
+
+class MicrodataEngine:
+    """Weighted scores and segment shares over respondent rows, for any group-by"""
+
+    def __init__(self, respondents, dimensions=None, weight_col=WEIGHT_COL,
+                 score_col=RESPONDENT_SCORE_COL, maxsize=256):
+        dimensions = [d for d in (dimensions or DIMENSIONS) if d in respondents.columns]
+        self.dimensions = {}
+        for dim in dimensions:
+            key = data_store.survey_round_key if dim == "Survey round" else None
+            self.dimensions[dim] = DimensionIndex(*_encode(respondents[dim], key=key))
+        self.n_rows = len(respondents)
+
+        self.weight, self.scored_weight, self.weighted_score, self.segment = row_channels(
+            respondents[weight_col].to_numpy(), respondents[score_col].to_numpy()
+        )
+
+        # Sums are additive, so one pass over every dimension at once answers any
+        # later group-by/filter on the known dimensions from a small dense cube
+        # Each cube axis has one extra slot at the end for rows missing that value
+        shape = tuple(len(index.labels) + 1 for index in self.dimensions.values())
+        self.cube = None
+        if int(np.prod(shape, dtype=np.int64)) <= MAX_CUBE_CELLS:
+            stats = self._accumulate(tuple(self.dimensions), None, missing_slot=True)
+            self.cube = stats.reshape(shape + (N_CHANNELS,))
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ── row path ──
+
+    def select(self, filters=None):
+        """Row positions matching {dimension: [labels]} (None = every row)"""
+        filters = {d: list(v) for d, v in (filters or {}).items() if v is not None}
+        if not filters:
+            return None
+        # Start from the most selective filter's index, mask the others on that subset
+        lead = min(filters, key=lambda d: self.dimensions[d].count(filters[d]))
+        rows = self.dimensions[lead].rows(filters[lead])
+        for dim, labels in filters.items():
+            if dim != lead and len(rows):
+                index = self.dimensions[dim]
+                rows = rows[index.mask(labels)[index.codes[rows]]]
+        return rows
+
+    def _group_sizes(self, by, missing_slot=False):
+        return [len(self.dimensions[d].labels) + missing_slot for d in by]
+
+    def _group_keys(self, by, chunk, size, missing_slot=False):
+        """
+        Combined group code per row of `chunk`. Rows missing a group-by value get
+        -1, or with missing_slot that dimension's extra last slot.
+        """
+        key = np.zeros(size, dtype=np.int64)
+        valid = np.ones(size, dtype=bool)
+        for dim, n in zip(by, self._group_sizes(by, missing_slot)):
+            codes = self.dimensions[dim].codes[chunk]
+            if missing_slot:
+                codes = np.where(codes < 0, n - 1, codes)
+            key = key * n + codes
+            valid &= codes >= 0
+        return np.where(valid, key, -1)
+
+    def _accumulate(self, by, rows, missing_slot=False):
+        """(groups, N_CHANNELS) sums over `rows` (None = all), chunk by chunk"""
+        n_groups = int(np.prod(self._group_sizes(by, missing_slot), dtype=np.int64))
+        stats = np.zeros((n_groups, N_CHANNELS))
+        total = self.n_rows if rows is None else len(rows)
+        for start in range(0, total, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, total)
+            chunk = slice(start, stop) if rows is None else rows[start:stop]
+            add_chunk(
+                stats, self._group_keys(by, chunk, stop - start, missing_slot),
+                self.weight[chunk], self.scored_weight[chunk], self.weighted_score[chunk], self.segment[chunk]
+            )
+        return stats
+
+    # ── cube path ──
+
+    def _reduce_cube(self, by, filters):
+        """(groups, N_CHANNELS) for `by` from the cube: slice the filters, sum the rest"""
+        cube = self.cube
+        for axis, (dim, index) in enumerate(self.dimensions.items()):
+            labels = (filters or {}).get(dim)
+            if labels is not None:
+                cube = np.take(cube, index.code_list(labels), axis=axis)
+            elif dim in by:
+                # Grouped rows need a value; the missing slot only counts towards totals
+                cube = np.take(cube, np.arange(len(index.labels)), axis=axis)
+        names = list(self.dimensions)
+        other = tuple(i for i, d in enumerate(names) if d not in by)
+        cube = cube.sum(axis=other)
+        # Remaining axes are in dimension order; put them in `by` order
+        remaining = [d for d in names if d in by]
+        cube = np.moveaxis(cube, [remaining.index(d) for d in by], list(range(len(by))))
+        return cube.reshape(-1, N_CHANNELS)
+
+    def _compute(self, by, filters):
+        filtered_codes = {}
+        if self.cube is not None:
+            stats = self._reduce_cube(by, filters)
+            # Group codes refer to the filtered cube axes, map them back to label codes
+            for dim in by:
+                labels = (filters or {}).get(dim)
+                if labels is not None:
+                    filtered_codes[dim] = np.asarray(self.dimensions[dim].code_list(labels), dtype=np.int64)
+        else:
+            stats = self._accumulate(by, self.select(filters))
+
+        sizes = [len(filtered_codes[d]) if d in filtered_codes else len(self.dimensions[d].labels) for d in by]
+        present = np.flatnonzero(stats[:, RESPONDENTS] > 0)
+        group_codes = np.unravel_index(present, sizes) if by else ()
+        groups = {}
+        for dim, codes in zip(by, group_codes):
+            if dim in filtered_codes:
+                codes = filtered_codes[dim][codes]
+            groups[dim] = pd.Categorical.from_codes(codes, categories=self.dimensions[dim].labels)
+        return summarize(groups, stats[present])
+
+    def aggregate(self, by=(), filters=None):
+        """
+        One row per group of `by` that has respondents: respondent count, total
+        weight, weighted mean score and the weighted share of each segment.
+        `filters` is {dimension: [labels]}; results are cached per (by, filters).
+        """
+        by = tuple(by)
+        key = (by, tuple(sorted((d, frozenset(v)) for d, v in (filters or {}).items() if v is not None)))
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = self._compute(by, filters)
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def segment_shares(self, by=(), filters=None):
+        """aggregate() in the long Index_segment layout: one row per group and segment"""
+        return long_shares(self.aggregate(by, filters), by)
+
+    def dashboard_sheets(self, country="Canada"):
+        """Index_score / Index_segment in the workbook layout (Canada rows have a blank Province)"""
+        return dashboard_sheets(
+            self.aggregate(("Province", "Survey round")), self.aggregate(("Survey round",)), country
+        )
+
+
+def has_microdata(path=MICRODATA_PATH):
+    return os.path.exists(path)
+
+
+def engine_enabled():
+    """True when the apps should aggregate the respondents file in memory rather than serve its ingested store"""
+    return os.environ.get(ENGINE_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def load_engine(path=MICRODATA_PATH, columns=None):
+    """Engine over a respondents Parquet file (memory-mapped read)"""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    return MicrodataEngine(table.to_pandas(split_blocks=True, self_destruct=True))
+
+
+def load_dashboard_sheets(sheets=data_store.SHEETS, path=MICRODATA_PATH, store_dir=data_store.STORE_DIR):
+    """
+    {sheet: frame} for load_data(). With a respondents file: the store ingested
+    from it (streamed first when missing or stale, see ingest.py), or with
+    FRI_MICRODATA_ENGINE=1 an in-memory engine. Otherwise read from the data
+    store / workbook as before.
+    """
+    if has_microdata(path):
+        if engine_enabled():
+            computed = load_engine(path).dashboard_sheets()
+            return {sheet: computed[sheet] for sheet in sheets}
+        import ingest
+
+        return ingest.load_ingested_sheets(path, sheets, store_dir)
+    return data_store.load_sheets(sheets)
+
+
+def data_version(path=MICRODATA_PATH):
+    """Version token of the data load_dashboard_sheets() serves"""
+    if has_microdata(path) and engine_enabled():
+        return data_store.file_hash(path)
+    # The ingested store's manifest carries the respondents file's hash
+    return data_store.data_version()
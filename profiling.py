@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Opt-in profiling for both dashboards.
+#
+# Off unless FRI_PROFILE=1 is set in the environment or the page is opened with
+# ?profile=1. When on, every `# Step N` cell is timed, the cached loaders report
+# hits and misses, and each figure handed to st.plotly_chart has its JSON size
+# and render time recorded. One JSON line per rerun is appended to
+# profile_log.jsonl (override with FRI_PROFILE_LOG) and the same numbers are
+# shown in a debug expander at the bottom of the page.
+#
+# When it is off every hook below is a no-op apart from passing calls through.
+
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+ENV_FLAG = "FRI_PROFILE"
+LOG_ENV = "FRI_PROFILE_LOG"
+QUERY_PARAM = "profile"
+DEFAULT_LOG = "profile_log.jsonl"
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+# Script runs happen on one thread per session, so the active run is thread-local
+_local = threading.local()
+_log_lock = threading.Lock()
+_run_counter = {}  # app -> runs in this process
+
+
+def is_enabled():
+    """True when profiling was asked for through the env var or the query string"""
+    if os.environ.get(ENV_FLAG, "").strip().lower() in _TRUTHY:
+        return True
+    try:
+        import streamlit as st
+        return str(st.query_params.get(QUERY_PARAM, "")).strip().lower() in _TRUTHY
+    except Exception:
+        # Not running under `streamlit run`
+        return False
+
+
+class RunProfile:
+    """Timings, cache counts and figure sizes for one script run"""
+
+    def __init__(self, app, first_step):
+        with _log_lock:
+            _run_counter[app] = _run_counter.get(app, 0) + 1
+            self.run = _run_counter[app]
+        self.app = app
+        self.started = time.perf_counter()
+        self.steps = {}
+        self.caches = {}
+        self.figures = {}
+        self._step = first_step
+        self._step_started = self.started
+
+    def step(self, name):
+        now = time.perf_counter()
+        if self._step is not None:
+            self.steps[self._step] = self.steps.get(self._step, 0.0) + (now - self._step_started) * 1000
+        self._step, self._step_started = name, now
+
+    def cache(self, name, hit):
+        counts = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def figure(self, name, json_bytes, render_ms):
+        self.figures[name] = {"json_bytes": json_bytes, "render_ms": round(render_ms, 2)}
+
+    def record(self):
+        self.step(None)
+        return {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "app": self.app,
+            "pid": os.getpid(),
+            "run": self.run,
+            # First run of this app in the process: pays for imports, file reads and cache fills
+            "cold": self.run == 1,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "steps": {name: round(ms, 2) for name, ms in self.steps.items()},
+            "caches": self.caches,
+            "figures": self.figures,
+        }
+
+
+def _current():
+    return getattr(_local, "run", None)
+
+
+def start(app, first_step="Step 1"):
+    """Begin profiling this rerun (if enabled); call once near the top of the script"""
+    _local.run = RunProfile(app, first_step) if is_enabled() else None
+
+
+def step(name):
+    """Close the previous step and start timing `name`"""
+    run = _current()
+    if run is not None:
+        run.step(name)
+
+
+def record_cache(name, hit):
+    run = _current()
+    if run is not None:
+        run.cache(name, hit)
+
+
+def cached(cache_decorator, **cache_kwargs):
+    """
+    Use in place of @st.cache_data / @st.cache_resource so each call is counted:
+    @profiling.cached(st.cache_data, show_spinner=False). A call is a miss when
+    the function body actually ran.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            _local.body_ran = True
+            return func(*args, **kwargs)
+
+        cached_func = cache_decorator(**cache_kwargs)(body) if cache_kwargs else cache_decorator(body)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            # Save/restore so a cached function calling another one is counted correctly
+            outer = getattr(_local, "body_ran", False)
+            _local.body_ran = False
+            try:
+                return cached_func(*args, **kwargs)
+            finally:
+                record_cache(func.__name__, hit=not _local.body_ran)
+                _local.body_ran = outer
+
+        call.clear = cached_func.clear
+        return call
+    return decorate
+
+
+def plotly_chart(fig, name, **kwargs):
+    """st.plotly_chart that also records the figure's JSON size and render time"""
+    import streamlit as st
+    run = _current()
+    if run is None:
+        return st.plotly_chart(fig, **kwargs)
+    began = time.perf_counter()
+    result = st.plotly_chart(fig, **kwargs)
+    render_ms = (time.perf_counter() - began) * 1000
+    # Measured outside the render time; Streamlit sends the same JSON to the browser
+    run.figure(name, len(fig.to_json(validate=False)), render_ms)
+    return result
+
+
+def _write_log(record):
+    path = os.environ.get(LOG_ENV, DEFAULT_LOG)
+    line = json.dumps(record)
+    with _log_lock:
+        try:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        except OSError:
+            # Read-only deployment; the panel still shows the numbers
+            pass
+
+
+def _show_panel(record):
+    import pandas as pd
+    import streamlit as st
+    with st.expander(f"⏱️ Profiling – run {record['run']} ({record['total_ms']:.0f} ms)", expanded=False):
+        st.caption(f"{record['app']} · pid {record['pid']} · {'cold' if record['cold'] else 'warm'} run")
+        steps = pd.DataFrame(list(record["steps"].items()), columns=["Step", "ms"])
+        st.dataframe(steps, hide_index=True)
+        if record["caches"]:
+            caches = pd.DataFrame.from_dict(record["caches"], orient="index").rename_axis("Cache").reset_index()
+            st.dataframe(caches, hide_index=True)
+        if record["figures"]:
+            figures = pd.DataFrame.from_dict(record["figures"], orient="index").rename_axis("Figure").reset_index()
+            st.dataframe(figures, hide_index=True)
+
+
+def finish():
+    """Close the last step, append the run to the log and show the debug panel"""
+    run = _current()
+    if run is None:
+        return None
+    _local.run = None
+    record = run.record()
+    _write_log(record)
+    _show_panel(record)
+    return record
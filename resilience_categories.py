@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Financial resilience segments shared by both dashboards.
+#
+# A Mean Financial Resilience Score (0-100) falls into one of four segments
+# using the 30/50/70 cutoffs; the same labels and colours are used for the
+# segment proportions in dashboard_segments.py. Everything here works on whole
+# arrays, so categorizing thousands of regions (CMAs, FSAs) costs one pass.
+
+import numpy as np
+import pandas as pd
+
+SCORE_THRESHOLDS = [30, 50, 70]
+
+SEGMENT_CATEGORIES = [
+    "Extremely Vulnerable",
+    "Financially Vulnerable",
+    "Approaching Resilience",
+    "Financially Resilient"
+]
+SEGMENT_COLORS = {
+    "Extremely Vulnerable": "#C00000",    # 0-30: Dark Red
+    "Financially Vulnerable": "#ED175B",  # 30-50: Reddish Pink
+    "Approaching Resilience": "#1E196A",  # 50-70: Deep Indigo
+    "Financially Resilient": "#00AEEF"    # 70-100: Sky Blue
+}
+
+NO_DATA_CODE = -1
+NO_DATA_LABEL = "No Data"
+NO_DATA_COLOR = "#A6A6A6"  # Gray
+
+category_labels = {NO_DATA_CODE: NO_DATA_LABEL, **dict(enumerate(SEGMENT_CATEGORIES))}
+category_colors = {NO_DATA_CODE: NO_DATA_COLOR, **{i: SEGMENT_COLORS[s] for i, s in enumerate(SEGMENT_CATEGORIES)}}
+
+# z runs from -1 (No Data) to 3, one colour band per code
+discrete_colorscale = [
+    [(code + 1) / 4, category_colors[code]] for code in sorted(category_colors)
+]
+
+# Lookup tables indexed by code + 1
+_LABELS = np.array([category_labels[c] for c in sorted(category_labels)], dtype=object)
+_COLORS = np.array([category_colors[c] for c in sorted(category_colors)], dtype=object)
+
+
+def score_codes(scores):
+    """Segment code (0-3) for each score, -1 for missing scores or the -1 placeholder"""
+    values = np.asarray(scores, dtype=float)
+    codes = np.digitize(values, SCORE_THRESHOLDS)
+    return np.where(np.isnan(values) | (values == -1), NO_DATA_CODE, codes)
+
+
+def score_labels(scores):
+    """Segment name for each score ("No Data" when missing)"""
+    return _LABELS[score_codes(scores) + 1]
+
+
+def categorize_scores(regions, scores, region_col="Province", score_col="Mean Financial Resilience Score"):
+    """
+    Match regions against a score table and categorize them in one pass.
+    Returns one row per region (in the given order) with the score, its code,
+    label, colour and the hover text used on the map. Regions without a row
+    in `scores` get code -1.
+    """
+    matched = scores[[region_col, score_col]].drop_duplicates(region_col)
+    matched = matched.astype({region_col: object})
+    frame = pd.DataFrame({region_col: list(regions)}, dtype=object).merge(
+        matched, on=region_col, how="left", indicator=True
+    )
+
+    codes = score_codes(frame[score_col])
+    frame["code"] = codes
+    frame["label"] = _LABELS[codes + 1]
+    frame["color"] = _COLORS[codes + 1]
+
+    names = frame[region_col].astype(str)
+    score_text = frame[score_col].astype(str).where(codes != NO_DATA_CODE, NO_DATA_LABEL)
+    frame["hover"] = (names + "<br>Score: " + score_text + "<br>" + frame["label"]).where(
+        frame["_merge"] == "both", names + "<br>No Data"
+    )
+    return frame.drop(columns="_merge")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Chart builders for the segments dashboard.
+#
+# Each builder only prepares the data arrays; layout and trace styling come
+# from the cached skeletons in figure_templates.py.
+
+import math
+
+import numpy as np
+
+from figure_templates import build_figure
+from resilience_categories import SEGMENT_CATEGORIES, SEGMENT_COLORS
+
+NOT_SELECTED_COLOR = "#E8E8E8"
+
+# Provinces per row in the province x year bar grid
+BAR_GRID_COLUMNS = 4
+_ROW_PX, _GAP_PX, _MARGIN_PX = 390, 170, 260
+
+
+def palette(name):
+    """A plotly.colors.qualitative palette, imported when a chart first needs one"""
+    from plotly.colors import qualitative
+
+    return getattr(qualitative, name)
+
+
+def _grouped(frame, column):
+    """(value, rows) per distinct value of `column`, in order of first appearance"""
+    return frame.groupby(column, sort=False, observed=True)
+
+
+# ─────────────────────────────── Pie charts ───────────────────────────────
+
+def pie_slices(all_segments_data, selected_segments):
+    """
+    Labels, values and colours for the selected segments, plus a grey
+    "Not Selected" slice standing in for the rest of the distribution.
+    Returns (labels, values, colors, total_selected, unselected).
+    """
+    selected_data = all_segments_data[all_segments_data["Index segments"].isin(selected_segments)]
+    total_all = all_segments_data["Proportion"].sum()
+    total_selected = selected_data["Proportion"].sum()
+    unselected = total_all - total_selected
+
+    labels = selected_data["Index segments"].tolist()
+    values = selected_data["Proportion"].tolist()
+    colors = [SEGMENT_COLORS[seg] for seg in labels]
+
+    # Add gray slice for unselected segments if any
+    if unselected > 0.001:
+        labels.append("Not Selected")
+        values.append(unselected)
+        colors.append(NOT_SELECTED_COLOR)
+    return labels, values, colors, total_selected, unselected
+
+
+def pie_chart(all_segments_data, selected_segments, title):
+    """Single donut chart with the selected share in the centre"""
+    labels, values, colors, total_selected, unselected = pie_slices(all_segments_data, selected_segments)
+    fig = build_figure(
+        "pie",
+        traces=[dict(
+            labels=labels,
+            values=values,
+            marker=dict(colors=colors),
+            pull=[0.04 if label == "Not Selected" else 0 for label in labels]
+        )],
+        layout=dict(title=dict(text=title)),
+        annotation_texts={0: f"{total_selected:.1%}<br>Selected"}
+    )
+    return fig, labels, values, total_selected, unselected
+
+
+def pie_grid(pie_data, combinations, selected_segments):
+    """Up to six pies, three per row, one per (year, province) combination"""
+    n_charts = len(combinations)
+    cols = min(3, n_charts)
+    rows = (n_charts + cols - 1) // cols
+
+    traces = []
+    for idx, combo in enumerate(combinations):
+        labels, values, colors, _, _ = pie_slices(pie_data[combo], selected_segments)
+        traces.append(dict(
+            cell=idx,
+            labels=labels,
+            values=values,
+            marker=dict(colors=colors),
+            pull=[0.03 if label == "Not Selected" else 0 for label in labels],
+            showlegend=(idx == 0)  # Only show legend for first pie
+        ))
+    titles = {idx: f"{y} – {p}" for idx, (y, p) in enumerate(combinations)}
+    return build_figure("pie_grid", rows, cols, traces=traces, annotation_texts=titles)
+
+
+# ─────────────────────────────── Bar charts ───────────────────────────────
+
+def bar_grid_shape(n_provinces):
+    """(rows, cols, height, vertical_spacing) of the province x year bar grid"""
+    n_cols = min(n_provinces, BAR_GRID_COLUMNS)
+    n_rows = math.ceil(n_provinces / n_cols)
+    height = n_rows * _ROW_PX + (n_rows - 1) * _GAP_PX + _MARGIN_PX
+    vertical_spacing = _GAP_PX / (height - _MARGIN_PX) if n_rows > 1 else 0.0
+    return n_rows, n_cols, height, vertical_spacing
+
+
+def province_year_bars(cube, years, provinces, segments):
+    """
+    Grouped bars for several provinces and survey rounds: one subplot per
+    province (wrapping every BAR_GRID_COLUMNS) and one trace per
+    (province, round) carrying all of its segments.
+    """
+    ri, pi, si = cube.index(years, provinces, segments)
+    round_labels = [cube.rounds[i] for i in ri]
+    seg_labels = np.array([cube.segments[i] for i in si], dtype=object)
+    # The single pivot every trace is cut from: (round, province, segment)
+    values = np.where(cube.present[np.ix_(ri, pi, si)], cube.values[np.ix_(ri, pi, si)], np.nan)
+    column_of = {cube.provinces[i]: k for k, i in enumerate(pi)}
+
+    grid = bar_grid_shape(len(provinces))
+
+    colors = palette("Set2")
+    traces = []
+    in_legend = set()
+    for idx, province in enumerate(provinces):
+        k = column_of.get(province)
+        if k is None:
+            continue
+        for year_idx, year in enumerate(round_labels):
+            y = values[year_idx, k]
+            has_value = ~np.isnan(y)
+            if not has_value.any():
+                continue
+            y = y[has_value]
+            traces.append(dict(
+                cell=idx,
+                name=str(year),
+                x=seg_labels[has_value].tolist(),
+                y=y.tolist(),
+                marker=dict(color=colors[year_idx % len(colors)]),
+                text=[f"{v:.1%}" for v in y],
+                showlegend=year not in in_legend,
+                legendgroup=str(year)
+            ))
+            in_legend.add(year)
+
+    max_val = np.nanmax(values) if np.isfinite(values).any() else 1.0
+    fig = build_figure(
+        "bar_grid", *grid,
+        traces=traces,
+        annotation_texts=dict(enumerate(provinces))
+    )
+    fig.update_yaxes(range=[0, max_val * 1.2])
+    return fig
+
+
+def grouped_bars(bar_data, group_col, variant, title, palette):
+    """Vertical bars per segment with one coloured trace per `group_col` value"""
+    traces = []
+    for idx, (group, rows) in enumerate(_grouped(bar_data, group_col)):
+        traces.append(dict(
+            name=str(group),
+            legendgroup=str(group),
+            offsetgroup=str(group),
+            x=rows["Index segments"].astype(str).tolist(),
+            y=rows["Proportion"].tolist(),
+            marker=dict(color=palette[idx % len(palette)]),
+            hovertemplate=f"{group_col}={group}<br>Index segments=%{{x}}<br>Proportion=%{{y}}<extra></extra>"
+        ))
+    max_val = bar_data["Proportion"].max()
+    return build_figure(
+        "bar", variant,
+        traces=traces,
+        layout=dict(title=dict(text=title), yaxis=dict(range=[0, max_val * 1.2]))
+    )
+
+
+def segment_bars(bar_data, title):
+    """One bar per segment in its segment colour (single province, single round)"""
+    segments = bar_data["Index segments"].astype(str).tolist()
+    max_val = bar_data["Proportion"].max()
+    return build_figure(
+        "bar", "segments",
+        traces=[dict(
+            x=segments,
+            y=bar_data["Proportion"].tolist(),
+            marker=dict(color=[SEGMENT_COLORS[s] for s in segments]),
+            hovertemplate="Index segments=%{x}<br>Proportion=%{y}<extra></extra>"
+        )],
+        layout=dict(title=dict(text=title), yaxis=dict(range=[0, max_val * 1.15]))
+    )
+
+
+def horizontal_bars(bar_data, title):
+    """Horizontal bars per segment, one trace per province"""
+    colors = palette("Plotly")
+    traces = []
+    for idx, (province, rows) in enumerate(_grouped(bar_data, "Province")):
+        traces.append(dict(
+            name=str(province),
+            legendgroup=str(province),
+            y=rows["Index segments"].astype(str).tolist(),
+            x=rows["Proportion"].tolist(),
+            marker=dict(color=colors[idx % len(colors)]),
+            hovertemplate=f"Province={province}<br>Proportion=%{{x}}<br>Index segments=%{{y}}<extra></extra>"
+        ))
+    max_val = bar_data["Proportion"].max()
+    return build_figure(
+        "hbar",
+        traces=traces,
+        layout=dict(title=dict(text=title), xaxis=dict(range=[0, max_val * 1.15]))
+    )
+
+
+# ─────────────────────────────── Line chart ───────────────────────────────
+
+LINE_DASHES = ["solid", "dot", "dash", "longdash", "dashdot", "longdashdot"]
+
+
+def trend_lines(trend_data, multiple_prov):
+    """One line per segment (and per province when several are selected)"""
+    provinces = sorted(trend_data["Province"].astype(str).unique())
+    dash_of = {p: LINE_DASHES[i % len(LINE_DASHES)] for i, p in enumerate(provinces)}
+    keys = ["Index segments", "Province"] if multiple_prov else ["Index segments"]
+
+    traces = []
+    groups = dict(list(trend_data.groupby(keys, sort=False, observed=True)))
+    order = sorted(
+        groups,
+        key=lambda k: (SEGMENT_CATEGORIES.index(str(k[0])), provinces.index(str(k[1]))) if multiple_prov
+        else SEGMENT_CATEGORIES.index(str(k[0]))
+    )
+    for key in order:
+        rows = groups[key]
+        segment = str(key[0])
+        name = f"{segment}, {key[1]}" if multiple_prov else segment
+        traces.append(dict(
+            name=name,
+            legendgroup=name,
+            x=rows["Survey round"].astype(str).tolist(),
+            y=rows["Proportion"].tolist(),
+            marker=dict(color=SEGMENT_COLORS[segment]),
+            line=dict(color=SEGMENT_COLORS[segment], dash=dash_of[str(rows["Province"].iloc[0])] if multiple_prov else "solid"),
+            customdata=rows[["Province"]].astype(str).values.tolist()
+        ))
+    return build_figure(
+        "line",
+        traces=traces,
+        layout=dict(legend=dict(title=dict(text="Segment" + (" / Province" if multiple_prov else ""))))
+    )
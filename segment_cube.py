@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Dense (survey round x province x segment) cube of the Index_segment sheet.
+#
+# Built once when the data is loaded. Sidebar selections become integer index
+# arrays into the cube, so filtering, pivots and summary numbers are NumPy
+# slices instead of boolean scans over the whole DataFrame on every rerun.
+# One cube is shared by every session, so its arrays are made read-only.
+
+import numpy as np
+import pandas as pd
+
+from data_store import survey_round_key
+from resilience_categories import SEGMENT_CATEGORIES
+
+
+def _labels(series, key=None):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = [str(c) for c in series.cat.categories]
+    else:
+        labels = [str(v) for v in series.dropna().unique()]
+    return sorted(labels, key=key)
+
+
+class SegmentCube:
+    """
+    Index_segment as three aligned arrays of shape (rounds, provinces, segments):
+    `values` (Proportion, NaN when missing), `present` (a row exists in the sheet)
+    and `rows` (position of that row in the source frame, -1 when absent).
+    """
+
+    def __init__(self, segments_data):
+        self.data = segments_data.reset_index(drop=True)
+        self.rounds = _labels(self.data["Survey round"], key=survey_round_key)
+        self.provinces = _labels(self.data["Province"])
+        self.segments = list(SEGMENT_CATEGORIES)
+
+        r = pd.Index(self.rounds).get_indexer(self.data["Survey round"].astype(object))
+        p = pd.Index(self.provinces).get_indexer(self.data["Province"].astype(object))
+        s = pd.Index(self.segments).get_indexer(self.data["Index segments"].astype(object))
+        ok = (r >= 0) & (p >= 0) & (s >= 0)
+
+        shape = (len(self.rounds), len(self.provinces), len(self.segments))
+        self.values = np.full(shape, np.nan)
+        self.present = np.zeros(shape, dtype=bool)
+        self.rows = np.full(shape, -1, dtype=np.int64)
+        # Reverse order so the first row wins if the sheet has duplicates
+        idx = np.flatnonzero(ok)[::-1]
+        self.values[r[idx], p[idx], s[idx]] = self.data["Proportion"].to_numpy(dtype=float)[idx]
+        self.present[r[idx], p[idx], s[idx]] = True
+        self.rows[r[idx], p[idx], s[idx]] = idx
+
+        for arr in (self.values, self.present, self.rows):
+            arr.flags.writeable = False
+
+        self._round_pos = {label: i for i, label in enumerate(self.rounds)}
+        self._province_pos = {label: i for i, label in enumerate(self.provinces)}
+        self._segment_pos = {label: i for i, label in enumerate(self.segments)}
+
+    @staticmethod
+    def _positions(lookup, labels):
+        if labels is None:
+            return np.arange(len(lookup))
+        return np.array([lookup[l] for l in labels if l in lookup], dtype=np.int64)
+
+    def index(self, years=None, provinces=None, segments=None):
+        """Integer positions for a selection (None = everything), unknown labels dropped"""
+        return (
+            self._positions(self._round_pos, years),
+            self._positions(self._province_pos, provinces),
+            self._positions(self._segment_pos, segments),
+        )
+
+    def _slice(self, arr, years, provinces, segments):
+        ri, pi, si = self.index(years, provinces, segments)
+        return arr[np.ix_(ri, pi, si)]
+
+    def frame(self, years=None, provinces=None, segments=None):
+        """Rows of the source frame matching the selection, in their original order"""
+        rows = self._slice(self.rows, years, provinces, segments)
+        return self.data.take(np.sort(rows[rows >= 0]))
+
+    def record_count(self, years=None, provinces=None, segments=None):
+        return int(self._slice(self.present, years, provinces, segments).sum())
+
+    def rounds_with_data(self, years=None, provinces=None, segments=None):
+        ri = self.index(years, provinces, segments)[0]
+        present = self._slice(self.present, years, provinces, segments)
+        return [self.rounds[i] for i in ri[present.any(axis=(1, 2))]]
+
+    def provinces_with_data(self, years=None, provinces=None, segments=None):
+        pi = self.index(years, provinces, segments)[1]
+        present = self._slice(self.present, years, provinces, segments)
+        return [self.provinces[i] for i in pi[present.any(axis=(0, 2))]]
+
+    def segment_means(self, years=None, provinces=None, segments=None):
+        """Mean Proportion per segment over the selected rounds/provinces (NaN-skipping)"""
+        si = self.index(years, provinces, segments)[2]
+        values = self._slice(self.values, years, provinces, segments)
+        present = self._slice(self.present, years, provinces, segments)
+        observed = present.any(axis=(0, 1))
+        counts = (~np.isnan(values)).sum(axis=(0, 1))
+        sums = np.nansum(values, axis=(0, 1))
+        means = np.divide(sums, counts, out=np.full(len(si), np.nan), where=counts > 0)
+        return pd.Series(means[observed], index=[self.segments[i] for i in si[observed]], name="Proportion")
+
+    def pivot(self, year, provinces=None, segments=None):
+        """segment x province table of proportions for one survey round"""
+        ri, pi, si = self.index([year], provinces, segments)
+        if len(ri) == 0:
+            return pd.DataFrame()
+        values = self.values[np.ix_(ri, pi, si)][0]
+        present = self.present[np.ix_(ri, pi, si)][0]
+        # Same shape pivot_table would give: only provinces/segments with data
+        keep_p = (present & ~np.isnan(values)).any(axis=1)
+        keep_s = (present & ~np.isnan(values)).any(axis=0)
+        table = pd.DataFrame(
+            values[np.ix_(keep_p, keep_s)].T,
+            index=pd.Index([self.segments[i] for i in si[keep_s]], name="Index segments"),
+            columns=pd.Index([self.provinces[i] for i in pi[keep_p]], name="Province"),
+        )
+        return table.sort_index().sort_index(axis=1)
+
+    def pie_data(self, combinations):
+        """
+        {(year, province): frame of Index segments/Proportion} for every combination,
+        gathered from the cube in one go. Segments keep SEGMENT_CATEGORIES order and
+        only those with a row in the sheet are listed (missing proportions count as 0).
+        """
+        combinations = list(combinations)
+        ri = np.array([self._round_pos.get(y, -1) for y, _ in combinations], dtype=np.int64)
+        pi = np.array([self._province_pos.get(p, -1) for _, p in combinations], dtype=np.int64)
+        known = (ri >= 0) & (pi >= 0)
+        present = np.where(known[:, None], self.present[ri, pi], False)
+        values = np.nan_to_num(self.values[ri, pi])
+
+        segments = np.array(self.segments, dtype=object)
+        result = {}
+        for k, combo in enumerate(combinations):
+            mask = present[k]
+            result[combo] = pd.DataFrame({"Index segments": segments[mask], "Proportion": values[k][mask]})
+        return result
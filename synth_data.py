@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Synthetic survey data shaped like the dashboard workbook.
+#
+# The checked-in workbook only has a few hundred rows. This generates
+# Index_score / Index_segment style sheets at any size for load and memory
+# testing: configurable survey rounds, provinces, sub-provincial regions,
+# demographic groups and segments.
+#
+#     python synth_data.py --rounds 40 --regions 20 --demographics 4 --format csv parquet store
+#
+# Segment proportions are drawn per leaf cell (round, province, region,
+# demographic group) and every total above that - region, province, Canada -
+# is the population-weighted average of its cells, so each distribution sums
+# to 1 at every level. Scores are derived from the same distribution (segment
+# midpoints on the 0-100 scale plus a little noise), so the two sheets agree.
+#
+# Rows for regions and demographic groups carry the extra "Region" and
+# "Demographic" columns ("All" on totals). dashboard_frames() cuts the output
+# back to the workbook layout the apps read; `--format store` writes that
+# straight into an app-ready Parquet store (see data_store.py).
+# generate_respondents() produces respondent-level rows for microdata.py.
+
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import microdata
+from resilience_categories import SCORE_THRESHOLDS, SEGMENT_CATEGORIES
+
+COUNTRY = "Canada"
+TOTAL = "All"
+FIRST_ROUND = "October 2020"
+ROUND_SPACING_MONTHS = 4
+
+PROVINCES = [
+    "Alberta", "British Columbia", "Manitoba", "New Brunswick", "Newfoundland and Labrador",
+    "Northwest Territories", "Nova Scotia", "Nunavut", "Ontario", "Prince Edward Island",
+    "Quebec", "Saskatchewan", "Yukon",
+]
+AGE_GROUPS = ["18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+INCOME_BANDS = ["Under $40k", "$40k-$80k", "$80k-$120k", "$120k+"]
+HOUSEHOLD_TYPES = ["Single", "Couple", "Couple with children", "Single parent", "Other"]
+
+SCORE_COL = "Mean Financial Resilience Score"
+FORMATS = ["xlsx", "csv", "parquet", "store"]
+XLSX_MAX_ROWS = 1_048_575  # one row goes to the header
+
+
+# ─────────────────────────────── Dimensions ───────────────────────────────
+
+def round_labels(n, first=FIRST_ROUND, spacing=ROUND_SPACING_MONTHS):
+    """n "%B %Y" survey rounds, `spacing` months apart (the real cadence is every 4)"""
+    start = pd.to_datetime(first, format="%B %Y")
+    return [(start + pd.DateOffset(months=spacing * i)).strftime("%B %Y") for i in range(n)]
+
+
+def _names(known, n, generic):
+    return list(known[:n]) + [f"{generic} {i + 1}" for i in range(len(known), n)]
+
+
+def segment_midpoints(n_segments):
+    """Score at the middle of each segment band (30/50/70 cutoffs for the standard four)"""
+    if n_segments == len(SEGMENT_CATEGORIES):
+        edges = [0] + SCORE_THRESHOLDS + [100]
+    else:
+        edges = np.linspace(0, 100, n_segments + 1)
+    return np.array([(lo + hi) / 2 for lo, hi in zip(edges[:-1], edges[1:])])
+
+
+# ─────────────────────────────── Generation ───────────────────────────────
+
+def _normalize(x, axis=-1):
+    return x / x.sum(axis=axis, keepdims=True)
+
+
+def _weighted(values, weights, axis):
+    """Population-weighted mean of `values` (..., S) over `axis`; weights broadcast like values[..., 0]"""
+    w = weights[..., None]
+    return (values * w).sum(axis=axis) / w.sum(axis=axis)
+
+
+def _long(values, axes, value_name):
+    """Flatten an (a, b, ..., S) array into rows, one column per named axis"""
+    grids = np.meshgrid(*[np.arange(len(labels)) for _, labels in axes], indexing="ij")
+    frame = {
+        name: np.asarray(labels, dtype=object)[grid.ravel()]
+        for (name, labels), grid in zip(axes, grids)
+    }
+    frame[value_name] = values.ravel()
+    return pd.DataFrame(frame)
+
+
+def generate(n_rounds=11, n_provinces=len(PROVINCES), n_regions=0, n_demographics=0,
+             n_segments=len(SEGMENT_CATEGORIES), concentration=60.0, seed=0):
+    """
+    {"Index_score": frame, "Index_segment": frame}. With n_regions/n_demographics
+    at 0 the sheets have exactly the workbook's columns.
+    """
+    rng = np.random.default_rng(seed)
+    rounds = round_labels(n_rounds)
+    provinces = _names(PROVINCES, n_provinces, "Province")
+    segments = _names(SEGMENT_CATEGORIES, n_segments, "Segment")
+    regions = [f"Region {g + 1}" for g in range(max(n_regions, 1))]
+    groups = _names(AGE_GROUPS, max(n_demographics, 1), "Group")
+    R, P, G, D, S = len(rounds), len(provinces), len(regions), len(groups), len(segments)
+
+    # Mix per province, drifting a little from round to round, then region and
+    # group effects on top; each leaf cell is one Dirichlet draw around its mix
+    mix = rng.dirichlet(np.full(S, 3.0), size=P)
+    mix = mix[None] * np.exp(np.cumsum(rng.normal(0, 0.05, (R, P, S)), axis=0))
+    mix = mix[:, :, None, None] * np.exp(rng.normal(0, 0.15, (1, P, G, 1, S)))
+    mix = mix * np.exp(rng.normal(0, 0.15, (1, 1, 1, D, S)))
+    alpha = concentration * _normalize(mix)
+    leaf = _normalize(rng.gamma(np.broadcast_to(alpha, (R, P, G, D, S))))
+
+    # Population weights: provinces, regions within a province, groups within a region
+    w_province = rng.dirichlet(np.full(P, 2.0))
+    w_region = rng.dirichlet(np.full(G, 2.0), size=P)                      # (P, G)
+    w_group = rng.dirichlet(np.full(D, 5.0), size=(P, G))                  # (P, G, D)
+    w_cell = w_region[:, :, None] * w_group                                # (P, G, D)
+
+    region_total = _weighted(leaf, np.broadcast_to(w_group, (R, P, G, D)), axis=3)          # (R, P, G, S)
+    province_total = _weighted(region_total, np.broadcast_to(w_region, (R, P, G)), axis=2)  # (R, P, S)
+    canada = _weighted(province_total, np.broadcast_to(w_province, (R, P)), axis=1)         # (R, S)
+
+    levels = [
+        # (proportions, axes before the segment axis, region label, group label)
+        (canada[:, None], [("Survey round", rounds), ("Province", [None])], TOTAL, TOTAL),
+        (province_total, [("Survey round", rounds), ("Province", provinces)], TOTAL, TOTAL),
+    ]
+    if n_regions:
+        levels.append((region_total, [("Survey round", rounds), ("Province", provinces), ("Region", regions)], None, TOTAL))
+    if n_demographics:
+        province_group = _weighted(leaf, np.broadcast_to(w_cell, (R, P, G, D)), axis=2)     # (R, P, D, S)
+        levels.append((province_group, [("Survey round", rounds), ("Province", provinces), ("Demographic", groups)], TOTAL, None))
+        if n_regions:
+            levels.append((leaf, [("Survey round", rounds), ("Province", provinces), ("Region", regions), ("Demographic", groups)], None, None))
+
+    midpoints = segment_midpoints(S)
+    seg_parts, score_parts = [], []
+    for values, axes, region, group in levels:
+        seg = _long(values, axes + [("Index segments", segments)], "Proportion")
+        scores = np.clip(values @ midpoints + rng.normal(0, 1.5, values.shape[:-1]), 0, 100)
+        score = _long(scores, axes, SCORE_COL)
+        for frame in (seg, score):
+            if region is not None:
+                frame["Region"] = region
+            if group is not None:
+                frame["Demographic"] = group
+        seg_parts.append(seg)
+        score_parts.append(score)
+
+    extra = ([] if not n_regions else ["Region"]) + ([] if not n_demographics else ["Demographic"])
+    segment_cols = ["Country", "Province", "Index segments", "Survey round", "Proportion"] + extra
+    score_cols = ["Country", "Province", "Survey round", SCORE_COL] + extra
+    segments_frame = pd.concat(seg_parts, ignore_index=True).assign(Country=COUNTRY)[segment_cols]
+    scores_frame = pd.concat(score_parts, ignore_index=True).assign(Country=COUNTRY)[score_cols]
+    return {"Index_score": scores_frame, "Index_segment": segments_frame}
+
+
+def generate_respondents(n_respondents, n_rounds=11, n_provinces=len(PROVINCES), seed=0):
+    """
+    Respondent microdata for microdata.py: survey round, province, age group,
+    income band, household type, a survey weight and a 0-100 resilience score
+    """
+    rng = np.random.default_rng(seed)
+    dims = {
+        "Survey round": round_labels(n_rounds),
+        "Province": _names(PROVINCES, n_provinces, "Province"),
+        "Age group": AGE_GROUPS,
+        "Income": INCOME_BANDS,
+        "Household type": HOUSEHOLD_TYPES,
+    }
+    codes = {
+        dim: rng.choice(len(labels), size=n_respondents, p=rng.dirichlet(np.full(len(labels), 5.0)))
+        for dim, labels in dims.items()
+    }
+    # Score: a shift per value of every dimension (income moves it most) plus noise
+    score = np.full(n_respondents, 55.0)
+    for dim, spread in (("Survey round", 2.0), ("Province", 4.0), ("Age group", 3.0),
+                        ("Income", 8.0), ("Household type", 3.0)):
+        score += rng.normal(0, spread, len(dims[dim]))[codes[dim]]
+    score += rng.normal(0, 15.0, n_respondents)
+
+    frame = {
+        dim: pd.Categorical.from_codes(codes[dim], categories=labels)
+        for dim, labels in dims.items()
+    }
+    frame[microdata.WEIGHT_COL] = rng.lognormal(0.0, 0.4, n_respondents).astype(np.float32)
+    frame[microdata.RESPONDENT_SCORE_COL] = np.clip(score, 0, 100).astype(np.float32)
+    return pd.DataFrame(frame)
+
+
+def dashboard_frames(frames, include_regions=False):
+    """
+    Cut generated sheets back to the workbook layout (province totals plus the
+    Canada rows with a blank Province). With include_regions the region totals
+    are kept too, as their own "Province – Region" locations.
+    """
+    out = {}
+    for sheet, df in frames.items():
+        if "Demographic" in df.columns:
+            df = df[df["Demographic"] == TOTAL]
+        if "Region" in df.columns:
+            regional = df["Region"] != TOTAL
+            if include_regions:
+                df = df.assign(Province=df["Province"].where(~regional, df["Province"] + " – " + df["Region"]))
+            else:
+                df = df[~regional]
+        df = df.drop(columns=[c for c in ("Region", "Demographic") if c in df.columns])
+        out[sheet] = data_store.to_store_types(df.reset_index(drop=True))
+    return out
+
+
+def proportion_error(segments_frame):
+    """Largest |sum - 1| of Proportion over every (round, province, region, group) distribution"""
+    keys = [c for c in ("Survey round", "Province", "Region", "Demographic") if c in segments_frame.columns]
+    sums = segments_frame.groupby([segments_frame[k].astype(str) for k in keys])["Proportion"].sum()
+    return float((sums - 1).abs().max())
+
+
+def frames_hash(frames):
+    """Content hash of a set of sheets, used as the data version of generated stores"""
+    digest = hashlib.sha256()
+    for sheet in sorted(frames):
+        digest.update(sheet.encode())
+        digest.update(pd.util.hash_pandas_object(frames[sheet], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# ─────────────────────────────── Writers ───────────────────────────────
+
+def write_xlsx(frames, path):
+    too_big = [sheet for sheet, df in frames.items() if len(df) > XLSX_MAX_ROWS]
+    if too_big:
+        raise ValueError(f"{', '.join(too_big)} exceed the xlsx row limit; use csv or parquet")
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for sheet, df in frames.items():
+            df.to_excel(writer, sheet_name=sheet, index=False)
+    return [path]
+
+
+def write_csv(frames, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for sheet, df in frames.items():
+        paths.append(os.path.join(out_dir, f"{sheet}.csv"))
+        df.to_csv(paths[-1], index=False)
+    return paths
+
+
+def write_parquet(frames, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for sheet, df in frames.items():
+        paths.append(os.path.join(out_dir, f"{sheet}.parquet"))
+        df.to_parquet(paths[-1], engine="pyarrow", compression="zstd", index=False)
+    return paths
+
+
+def write_store(frames, store_dir, include_regions=True):
+    """App-ready Parquet store (see data_store.py) holding dashboard_frames(frames)"""
+    app_frames = dashboard_frames(frames, include_regions=include_regions)
+    data_store.build_store(
+        store_dir=store_dir, frames=app_frames,
+        source="synthetic", source_sha256=frames_hash(app_frames)
+    )
+    return [os.path.join(store_dir, data_store.MANIFEST_NAME)]
+
+
+def write(frames, out_dir, formats):
+    """Write the generated sheets in each requested format under out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        if fmt == "xlsx":
+            paths += write_xlsx(frames, os.path.join(out_dir, "synthetic_dashboard.xlsx"))
+        elif fmt == "csv":
+            paths += write_csv(frames, out_dir)
+        elif fmt == "parquet":
+            paths += write_parquet(frames, out_dir)
+        elif fmt == "store":
+            paths += write_store(frames, os.path.join(out_dir, data_store.STORE_DIR))
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Index_score/Index_segment data.")
+    parser.add_argument("--rounds", type=int, default=11, help="Survey rounds")
+    parser.add_argument("--provinces", type=int, default=len(PROVINCES), help="Provinces (extra ones get generic names)")
+    parser.add_argument("--regions", type=int, default=0, help="Sub-provincial regions per province")
+    parser.add_argument("--demographics", type=int, default=0, help="Demographic groups per region")
+    parser.add_argument("--segments", type=int, default=len(SEGMENT_CATEGORIES), help="Resilience segments")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", nargs="+", default=["parquet"], choices=FORMATS, dest="formats")
+    parser.add_argument("--out", default="synthetic_data", help="Output directory")
+    parser.add_argument("--respondents", type=int, default=0,
+                        help="Also write this many respondent rows to <out>/respondents.parquet")
+    args = parser.parse_args()
+
+    frames = generate(args.rounds, args.provinces, args.regions, args.demographics, args.segments, seed=args.seed)
+    for sheet, df in frames.items():
+        print(f"{sheet}: {len(df):,} rows")
+    print(f"max |sum(Proportion) - 1|: {proportion_error(frames['Index_segment']):.2e}")
+    for path in write(frames, args.out, args.formats):
+        print(f"-> {path}")
+    if args.respondents:
+        path = os.path.join(args.out, microdata.MICRODATA_PATH)
+        generate_respondents(args.respondents, args.rounds, args.provinces, seed=args.seed).to_parquet(
+            path, engine="pyarrow", compression="zstd", index=False
+        )
+        print(f"{args.respondents:,} respondents -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Shared fixtures: small synthetic sheets and respondents (synth_data.py), with
+# holes punched in them so the missing-value paths are covered too.
+#
+#     python -m pytest -q
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import geo_pack as geo  # noqa: E402
+import synth_data  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def sheets():
+    """Index_score / Index_segment in the workbook layout (Canada rows with a blank Province)"""
+    frames = synth_data.dashboard_frames(synth_data.generate(n_rounds=6, n_provinces=8, seed=3))
+    rng = np.random.default_rng(3)
+    segments = frames["Index_segment"]
+    # Missing rows and missing proportions
+    segments = segments.drop(index=rng.choice(segments.index, 12, replace=False)).reset_index(drop=True)
+    segments.loc[rng.choice(segments.index, 6, replace=False), "Proportion"] = np.nan
+    scores = frames["Index_score"].copy()
+    scores.loc[rng.choice(scores.index, 3, replace=False), synth_data.SCORE_COL] = np.nan
+    scores.loc[rng.choice(scores.index, 2, replace=False), synth_data.SCORE_COL] = -1
+    return {"Index_score": scores, "Index_segment": segments}
+
+
+@pytest.fixture(scope="session")
+def respondents():
+    """Respondent rows with some missing rounds, provinces, weights and scores"""
+    frame = synth_data.generate_respondents(40_000, n_rounds=5, n_provinces=6, seed=7)
+    rng = np.random.default_rng(7)
+    for column in ["Survey round", "Province", "Income", "Survey weight", "Financial Resilience Score"]:
+        frame.loc[rng.choice(len(frame), 200, replace=False), column] = np.nan
+    return frame
+
+
+@pytest.fixture(scope="session")
+def geo_pack():
+    """Geometry pack of the repo's GeoJSON, built in memory"""
+    return geo.make_pack(os.path.join(REPO_DIR, geo.GEOJSON_PATH))
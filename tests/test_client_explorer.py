@@ -0,0 +1,219 @@
+# The in-browser explorer (client_explorer.py) against the server-side charts.
+#
+# The page script runs under Node with a minimal DOM and Plotly stub; for each
+# selection shape the traces it hands to Plotly.react, its summary table and
+# its Summary Statistics are compared with what segment_charts.py and the
+# segment cube give the dashboard for the same selection. Skipped without node.
+
+import json
+import re
+import shutil
+import subprocess
+
+import pytest
+
+import client_explorer
+from dashboard_data import CANADA, clean_segments
+from resilience_categories import SEGMENT_CATEGORIES
+from segment_charts import (
+    grouped_bars, horizontal_bars, palette, pie_chart, pie_grid, province_year_bars, segment_bars, trend_lines
+)
+from segment_cube import SegmentCube
+
+NODE = shutil.which("node")
+pytestmark = pytest.mark.skipif(NODE is None, reason="needs node to run the page script")
+
+TRACE_KEYS = ["type", "name", "x", "y", "labels", "values", "text", "marker", "line", "pull", "showlegend",
+              "legendgroup", "offsetgroup", "hovertemplate", "customdata", "xaxis", "yaxis", "domain"]
+
+# Stands in for the browser: checkboxes parsed from the generated markup,
+# Plotly.react captured. The page script is evaluated in this scope, so the
+# harness can drive its functions directly.
+HARNESS = r"""
+const fs = require("fs");
+const input = JSON.parse(fs.readFileSync(process.argv[2], "utf8"));
+const elements = {}, inputs = [];
+function element(id) {
+  if (!elements[id]) {
+    elements[id] = {
+      id, style: {}, html: "", inputs: [], checked: false,
+      textContent: id === "payload" ? input.payload : "",
+      set innerHTML(html) {
+        this.html = html;
+        this.inputs = [];
+        for (const m of html.matchAll(/<input type="checkbox" value="([^"]*)">/g)) {
+          const box = {value: m[1].replace(/&lt;/g, "<").replace(/&gt;/g, ">").replace(/&amp;/g, "&"),
+                       checked: false, addEventListener() {}};
+          this.inputs.push(box);
+          inputs.push(box);
+        }
+      },
+      get innerHTML() { return this.html; },
+      addEventListener() {},
+    };
+  }
+  return elements[id];
+}
+global.document = {
+  getElementById: element,
+  querySelectorAll(selector) {
+    const m = selector.match(/^#([\w-]+) input(:checked)?$/);
+    if (m) return m[2] ? element(m[1]).inputs.filter(i => i.checked) : element(m[1]).inputs;
+    if (selector === "input") return inputs.concat([element("horizontal")]);
+    throw new Error("unsupported selector " + selector);
+  },
+  createElement() { return {click() {}}; },
+};
+let figure = null;
+global.Plotly = {react(div, data, layout) { figure = {data, layout}; }, purge() { figure = null; }};
+const page = eval(input.script + "\n;({render, state, setChecked});");
+const results = input.cases.map(c => {
+  page.setChecked("rounds", c.years);
+  page.setChecked("provinces", c.provinces);
+  page.setChecked("segments", c.segments);
+  page.state.chart = c.chart;
+  page.render();
+  return {figure, table: element("table").innerHTML, summary: element("summary").innerHTML};
+});
+process.stdout.write(JSON.stringify(results));
+"""
+
+
+@pytest.fixture(scope="module")
+def cube(sheets):
+    return SegmentCube(clean_segments(sheets["Index_segment"]))
+
+
+def cases(cube):
+    # Checkboxes give the selection in list order (rounds oldest first, Canada
+    # first), so the server side gets it in that order too
+    rounds = cube.rounds
+    provinces = sorted(p for p in cube.provinces if p != CANADA)
+    some = SEGMENT_CATEGORIES[1:3]
+    shapes = []
+    for chart in ["Pie chart", "Bar chart", "Trended line chart"]:
+        shapes += [
+            (chart, rounds[-1:], [CANADA], SEGMENT_CATEGORIES),
+            (chart, rounds[-1:], provinces[:1], some),
+            (chart, rounds[-3:], provinces[:1], SEGMENT_CATEGORIES),
+            (chart, rounds[-1:], [CANADA] + provinces[:3], SEGMENT_CATEGORIES),
+            (chart, rounds[-1:], provinces, some),
+            (chart, rounds[::2], provinces[:5], SEGMENT_CATEGORIES),
+            (chart, rounds[-2:], provinces[:2], some),
+        ]
+    return [dict(chart=c, years=list(y), provinces=list(p), segments=list(s)) for c, y, p, s in shapes]
+
+
+def server_figure(cube, chart, years, provinces, segments):
+    """The figure chart_panel in dashboard_segments.py draws for this selection (None when it draws none)"""
+    filtered = cube.frame(years, provinces, segments)
+    if chart == "Pie chart":
+        if len(years) > 1 or len(provinces) > 1:
+            if len(years) > 1 and len(provinces) > 1:
+                combinations = [(y, p) for y in years[:3] for p in provinces[:2]][:6]
+            elif len(years) > 1:
+                combinations = [(y, provinces[0]) for y in years[:6]]
+            else:
+                combinations = [(years[0], p) for p in provinces[:6]]
+            return pie_grid(cube.pie_data(combinations), combinations, segments)
+        data = cube.pie_data([(years[0], provinces[0])])[(years[0], provinces[0])]
+        return pie_chart(data, segments, f"Segment Distribution – {years[0]} – {provinces[0]}")[0]
+    if chart == "Bar chart":
+        if len(provinces) > 1 and len(years) > 1:
+            return province_year_bars(cube, years, provinces, segments)
+        if len(provinces) > 1:
+            title = f"Financial Resilience Distribution by Province – {years[0]}"
+            if len(provinces) > 6:
+                return horizontal_bars(filtered, title)
+            return grouped_bars(filtered, "Province", "by_province", title, palette("Plotly"))
+        if len(years) > 1:
+            return grouped_bars(filtered, "Survey round", "by_round",
+                                f"Financial Resilience Trends – {provinces[0]}", palette("Set2"))
+        return segment_bars(filtered, f"Financial Resilience Distribution – {provinces[0]} – {years[0]}")
+    if len(years) < 2:
+        return None
+    return trend_lines(filtered, multiple_prov=len(provinces) > 1)
+
+
+def assert_close(got, expected, where):
+    if isinstance(expected, float) or isinstance(got, float):
+        assert got == pytest.approx(expected, rel=1e-9, abs=1e-12), where
+    elif isinstance(expected, dict):
+        assert isinstance(got, dict) and set(got) == set(expected), where
+        for key in expected:
+            assert_close(got[key], expected[key], f"{where}.{key}")
+    elif isinstance(expected, list):
+        assert isinstance(got, list) and len(got) == len(expected), where
+        for i, (g, e) in enumerate(zip(got, expected)):
+            assert_close(g, e, f"{where}[{i}]")
+    else:
+        assert got == expected, where
+
+
+def layout_parts(layout):
+    """The data-dependent parts of a layout: title, annotation texts and axis ranges"""
+    parts = {"title": (layout.get("title") or {}).get("text"),
+             "annotations": [a.get("text") for a in layout.get("annotations", [])]}
+    for key, axis in layout.items():
+        if re.match(r"[xy]axis\d*$", key) and "range" in axis:
+            parts[key] = axis["range"]
+    return parts
+
+
+@pytest.fixture(scope="module")
+def browser_results(cube, tmp_path_factory):
+    page = client_explorer.explorer_html(cube)
+    script = page.rsplit("<script>", 1)[1].rsplit("</script>", 1)[0]
+    payload = json.dumps(client_explorer.explorer_payload(cube))
+    workdir = tmp_path_factory.mktemp("explorer")
+    (workdir / "harness.js").write_text(HARNESS)
+    (workdir / "input.json").write_text(json.dumps({"script": script, "payload": payload, "cases": cases(cube)}))
+    result = subprocess.run([NODE, str(workdir / "harness.js"), str(workdir / "input.json")],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def test_traces_match_segment_charts(cube, browser_results):
+    for case, result in zip(cases(cube), browser_results):
+        where = "{chart} {years} {provinces} {segments}".format(**case)
+        fig = server_figure(cube, **case)
+        if fig is None:
+            assert result["figure"] is None, where
+            continue
+        expected = json.loads(fig.to_json())
+        got = result["figure"]
+        assert got is not None, where
+        assert len(got["data"]) == len(expected["data"]), where
+        for i, (g, e) in enumerate(zip(got["data"], expected["data"])):
+            keys = [k for k in TRACE_KEYS if k in e or k in g]
+            assert_close({k: g.get(k) for k in keys}, {k: e.get(k) for k in keys}, f"{where} trace {i}")
+        assert_close(layout_parts(got["layout"]), layout_parts(expected["layout"]), f"{where} layout")
+
+
+def test_summary_table_matches_pivot(cube, browser_results):
+    for case, result in zip(cases(cube), browser_results):
+        if not (case["chart"] == "Bar chart" and len(case["years"]) == 1 and len(case["provinces"]) > 1):
+            assert result["table"] == ""
+            continue
+        pivot = cube.pivot(case["years"][0], case["provinces"], case["segments"])
+        header = re.findall(r"<th>(.*?)</th>", result["table"])
+        assert header == ["Index segments"] + list(pivot.columns)
+        rows = re.findall(r"<tr><td>(.*?)</td>(.*?)</tr>", result["table"])
+        assert [segment for segment, _ in rows] == list(pivot.index)
+        for (segment, cells), (_, expected) in zip(rows, pivot.iterrows()):
+            for text, value in zip(re.findall(r"<td>(.*?)</td>", cells), expected):
+                if value != value:
+                    assert text == ""
+                else:
+                    # One-decimal percentages; JS and Python may round a tie differently
+                    assert float(text.rstrip("%")) == pytest.approx(value * 100, abs=0.05 + 1e-9)
+
+
+def test_summary_statistics_match_cube(cube, browser_results):
+    for case, result in zip(cases(cube), browser_results):
+        selection = (case["years"], case["provinces"], case["segments"])
+        metrics = dict(re.findall(r'<div class="label">(.*?)</div><div class="value">(.*?)</div>', result["summary"]))
+        assert metrics["📊 Total Records"] == f"{cube.record_count(*selection):,}"
+        assert metrics["📅 Survey Rounds"] == str(len(cube.rounds_with_data(*selection)))
+        assert metrics["📍 Locations"] == str(len(cube.provinces_with_data(*selection)))
+        assert metrics["🏆 Largest Segment"] == cube.segment_means(*selection).idxmax()
@@ -0,0 +1,88 @@
+# When the Parquet store is served as is and when the workbook takes over.
+
+import pandas as pd
+import pytest
+
+import data_store
+import ingest
+
+
+@pytest.fixture
+def workbook(sheets, tmp_path):
+    path = str(tmp_path / "workbook.xlsx")
+    with pd.ExcelWriter(path) as writer:
+        for sheet in data_store.SHEETS:
+            sheets[sheet].to_excel(writer, sheet_name=sheet, index=False)
+    return path
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv(data_store.PREBUILT_ENV, raising=False)
+    return str(tmp_path / data_store.STORE_DIR)
+
+
+def ingested_store(respondents, path, store_dir):
+    respondents.to_parquet(path, index=False)
+    return ingest.load_ingested_sheets(path, store_dir=store_dir)
+
+
+def test_workbook_store_follows_the_workbook(workbook, store_dir, sheets):
+    data_store.build_store(workbook, store_dir)
+    assert data_store.store_is_fresh(workbook, store_dir)
+    assert data_store.data_version(workbook, store_dir) == data_store.file_hash(workbook)
+
+    with pd.ExcelWriter(workbook) as writer:
+        for sheet in data_store.SHEETS:
+            sheets[sheet].iloc[:-1].to_excel(writer, sheet_name=sheet, index=False)
+    assert not data_store.store_is_fresh(workbook, store_dir)
+    assert len(data_store.load_sheets(workbook=workbook, store_dir=store_dir)["Index_segment"]) == len(
+        sheets["Index_segment"]) - 1
+    assert data_store.store_is_fresh(workbook, store_dir)
+
+
+def test_ingested_store_is_served_while_its_source_is_unchanged(respondents, workbook, store_dir, tmp_path):
+    source = str(tmp_path / "respondents.parquet")
+    frames = ingested_store(respondents, source, store_dir)
+    assert data_store.store_is_fresh(workbook, store_dir)
+    assert data_store.data_version(workbook, store_dir) == data_store.file_hash(source)
+    pd.testing.assert_frame_equal(data_store.load_sheet("Index_score", workbook, store_dir), frames["Index_score"])
+
+    # The respondents file changes: the store no longer stands for it
+    respondents.iloc[:-100].to_parquet(source, index=False)
+    assert not data_store.store_is_fresh(workbook, store_dir)
+    assert data_store.data_version(workbook, store_dir) == data_store.file_hash(workbook)
+
+
+def test_store_without_its_source_falls_back_to_the_workbook(respondents, workbook, store_dir, sheets, tmp_path):
+    source = tmp_path / "respondents.parquet"
+    ingested_store(respondents, str(source), store_dir)
+    source.unlink()
+    assert not data_store.store_is_fresh(workbook, store_dir)
+    assert len(data_store.load_sheets(workbook=workbook, store_dir=store_dir)["Index_score"]) == len(sheets["Index_score"])
+    assert data_store.read_manifest(store_dir)["source_files"] == [workbook]
+
+
+def test_generated_store_is_served_without_a_workbook(sheets, workbook, store_dir, tmp_path, monkeypatch):
+    data_store.build_store(store_dir=store_dir, frames=sheets, source="synthetic", source_sha256="f" * 64)
+    assert not data_store.store_is_fresh(workbook, store_dir)
+    assert data_store.store_is_fresh(str(tmp_path / "missing.xlsx"), store_dir)
+    assert data_store.data_version(str(tmp_path / "missing.xlsx"), store_dir) == "f" * 64
+
+    # A deploy.py worker serves whatever the build left
+    monkeypatch.setenv(data_store.PREBUILT_ENV, "1")
+    assert data_store.store_is_fresh(workbook, store_dir)
+    assert data_store.data_version(workbook, store_dir) == "f" * 64
+
+
+def test_single_sheet_loads_share_one_store(workbook, store_dir, sheets, monkeypatch):
+    for sheet in data_store.SHEETS:
+        assert len(data_store.load_sheet(sheet, workbook, store_dir)) == len(sheets[sheet])
+    assert data_store.store_is_fresh(workbook, store_dir)
+
+    # Each sheet was parsed out of the workbook once; now both come from the store
+    def fail(*args, **kwargs):
+        raise AssertionError("workbook read again")
+    monkeypatch.setattr(data_store, "read_workbook", fail)
+    for sheet in data_store.SHEETS:
+        assert len(data_store.load_sheet(sheet, workbook, store_dir)) == len(sheets[sheet])
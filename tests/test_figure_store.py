@@ -0,0 +1,26 @@
+# Prebuilt figures: written once, read back once per worker.
+
+import builtins
+
+import plotly.graph_objects as go
+
+import figure_store
+
+
+def test_figure_is_read_once_per_path(tmp_path, monkeypatch):
+    monkeypatch.delenv(figure_store.CAPTURE_ENV, raising=False)
+    store_dir = str(tmp_path)
+    selection = (("October 2024",), ("Alberta",))
+    assert figure_store.load_figure("v1", "index_score", "map", selection, store_dir) is None
+
+    # Written after a miss: still found
+    fig = go.Figure(go.Bar(x=["a", "b"], y=[1, 2]), layout=dict(title="prebuilt"))
+    figure_store.save_figure(fig, "v1", "index_score", "map", selection, store_dir)
+    first = figure_store.load_figure("v1", "index_score", "map", selection, store_dir)
+    assert first.to_dict() == fig.to_dict()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("figure file read again")
+    monkeypatch.setattr(builtins, "open", fail)
+    assert figure_store.load_figure("v1", "index_score", "map", selection, store_dir) is first
+    assert figure_store.cached_figure("v1", "index_score", "map", selection, fail, store_dir) == (first, True)
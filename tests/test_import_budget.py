@@ -0,0 +1,22 @@
+# The dashboards' startup imports (import_budget.py): the heavy optional
+# modules stay off the startup path, and the rest stays within its budget.
+
+import pytest
+
+import import_budget
+
+
+@pytest.fixture(scope="module")
+def startup():
+    # Best of several fresh interpreters; a single run is too noisy to gate on
+    return import_budget.best_startup()
+
+
+def test_lazy_modules_stay_off_the_startup_path(startup):
+    assert import_budget.lazy_imported(startup) == []
+
+
+def test_startup_imports_within_budget(startup):
+    cost = import_budget.startup_cost(startup)
+    budget = import_budget.budget_ms()
+    assert cost <= budget, f"startup imports take {cost:.0f} ms, budget {budget:.0f} ms ({import_budget.BUDGET_ENV})"
@@ -0,0 +1,72 @@
+# Streaming ingest against the in-memory MicrodataEngine, and the store the
+# apps serve for a respondents file.
+
+import os
+
+import pandas as pd
+import pytest
+
+import data_store
+import ingest
+import microdata
+
+
+@pytest.fixture(scope="module")
+def expected(respondents):
+    return microdata.MicrodataEngine(respondents).dashboard_sheets()
+
+
+def assert_sheets_equal(got, expected, rtol=1e-9):
+    for sheet in data_store.SHEETS:
+        pd.testing.assert_frame_equal(got[sheet], expected[sheet], rtol=rtol)
+
+
+def test_parquet_stream_matches_engine(respondents, expected, tmp_path):
+    path = str(tmp_path / "respondents.parquet")
+    respondents.to_parquet(path, index=False)
+    assert_sheets_equal(ingest.ingest(path, chunk_rows=3000).dashboard_sheets(), expected)
+
+
+def test_csv_stream_matches_engine(respondents, expected, tmp_path):
+    path = str(tmp_path / "respondents.csv")
+    respondents.to_csv(path, index=False)
+    # float32 scores round-trip through text
+    assert_sheets_equal(ingest.ingest(path, chunk_rows=3000).dashboard_sheets(), expected, rtol=1e-6)
+
+
+def test_per_file_sums_merge_to_the_same_sheets(respondents, expected, tmp_path):
+    rounds = respondents["Survey round"]
+    parts = [respondents[rounds.isin(rounds.cat.categories[:2])], respondents[~rounds.isin(rounds.cat.categories[:2])]]
+    paths = []
+    for i, part in enumerate(parts):
+        paths.append(str(tmp_path / f"part{i}.parquet"))
+        part.to_parquet(paths[-1], index=False)
+    sums_dir = str(tmp_path / "sums")
+
+    acc, streamed, _ = ingest.ingest_files(paths, sums_dir, chunk_rows=5000)
+    assert all(streamed.values())
+    assert_sheets_equal(acc.dashboard_sheets(), expected)
+
+    # Second run: nothing is streamed, everything merges from the cached sums
+    acc, streamed, _ = ingest.ingest_files(paths, sums_dir)
+    assert not any(streamed.values())
+    assert_sheets_equal(acc.dashboard_sheets(), expected)
+
+
+def test_apps_serve_the_ingested_store(respondents, expected, tmp_path, monkeypatch):
+    path = str(tmp_path / microdata.MICRODATA_PATH)
+    store_dir = str(tmp_path / data_store.STORE_DIR)
+    respondents.to_parquet(path, index=False)
+    monkeypatch.delenv(microdata.ENGINE_ENV, raising=False)
+
+    # First load streams the file into the store...
+    first = microdata.load_dashboard_sheets(path=path, store_dir=store_dir)
+    assert data_store.read_manifest(store_dir)["source"] == os.path.basename(path)
+    assert_sheets_equal(first, expected)
+
+    # ...later loads read the store back without touching the engine or streaming again
+    def fail(*args, **kwargs):
+        raise AssertionError("respondents file read again")
+    monkeypatch.setattr(ingest, "ingest_files", fail)
+    monkeypatch.setattr(microdata, "load_engine", fail)
+    assert_sheets_equal(microdata.load_dashboard_sheets(path=path, store_dir=store_dir), expected)
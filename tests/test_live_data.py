@@ -0,0 +1,181 @@
+# Hot reloads (live_data.py): what a refresh rebuilds, what it carries over
+# from the previous snapshot, and what it keeps when a reload fails.
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import dashboard_data
+import data_store
+from live_data import LiveData, file_signature
+from map_views import ALL_PROVINCES, SCORE_COL
+
+SELECTIONS = [[ALL_PROVINCES], ["Alberta"], ["Alberta", "Manitoba"]]
+NEW_ROUND = "October 2022"
+
+
+class Source:
+    """The sheets as Parquet files in a directory, with LiveData's load and signature over them"""
+
+    def __init__(self, directory, sheets):
+        self.paths = {sheet: os.path.join(directory, f"{sheet}.parquet") for sheet in sheets}
+        self.loads = 0
+        self.fail_with = None
+        self.write(sheets)
+
+    def write(self, sheets):
+        for sheet, df in sheets.items():
+            df.to_parquet(self.paths[sheet], index=False)
+            # A rewrite within the filesystem's mtime resolution must still be seen
+            stat = os.stat(self.paths[sheet])
+            os.utime(self.paths[sheet], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000 * (self.loads + 1)))
+
+    def load(self, names):
+        self.loads += 1
+        if self.fail_with is not None:
+            raise self.fail_with
+        return {name: pd.read_parquet(self.paths[name]) for name in names}
+
+    def signature(self):
+        return file_signature(list(self.paths.values()))
+
+
+@pytest.fixture
+def source(sheets, tmp_path, geo_pack, monkeypatch):
+    # The geometry comes from the in-memory pack rather than the data cache
+    monkeypatch.setattr(dashboard_data, "load_geojson", lambda geo_token: geo_pack)
+    return Source(str(tmp_path), sheets)
+
+
+@pytest.fixture
+def live(source):
+    return LiveData(dashboard_data.SHEETS, dashboard_data.derive, load=source.load, signature=source.signature)
+
+
+def rounds(df):
+    return sorted(df["Survey round"].dropna().astype(str).unique(), key=data_store.survey_round_key)
+
+
+def with_round(df, label, like):
+    """`df` plus a copy of round `like`'s rows as round `label`"""
+    added = df[df["Survey round"].astype(str) == like].astype({"Survey round": object})
+    added["Survey round"] = label
+    return data_store.to_store_types(pd.concat([df.astype({"Survey round": object}), added], ignore_index=True))
+
+
+def warm_views(snapshot):
+    map_views = snapshot["map_views"]
+    years = rounds(snapshot.sheets["Index_score"])
+    return {(year, tuple(p)): map_views.get(year, p) for year in years for p in SELECTIONS}
+
+
+def test_changed_rounds(sheets):
+    scores = sheets["Index_score"]
+    old = data_store.round_hashes(scores)
+    last = rounds(scores)[-1]
+    # Row order doesn't matter
+    assert data_store.changed_rounds(old, data_store.round_hashes(scores.sample(frac=1, random_state=0))) == []
+    assert data_store.changed_rounds(old, data_store.round_hashes(with_round(scores, NEW_ROUND, last))) == [NEW_ROUND]
+
+    edited = scores.copy()
+    edited.loc[(edited["Survey round"] == last) & (edited["Province"] == "Alberta"), SCORE_COL] += 0.5
+    assert data_store.changed_rounds(old, data_store.round_hashes(edited)) == [last]
+    first = rounds(scores)[0]
+    assert data_store.changed_rounds(old, data_store.round_hashes(scores[scores["Survey round"] != first])) == [first]
+
+
+def test_new_round_rebuilds_only_its_views(live, source, sheets):
+    before = live.current()
+    views = warm_views(before)
+    last = rounds(sheets["Index_score"])[-1]
+
+    source.write({"Index_score": with_round(sheets["Index_score"], NEW_ROUND, last)})
+    after = live.current()
+    assert after is not before and after.token != before.token
+    assert after.changed == {"Index_score": [NEW_ROUND], "Index_segment": []}
+
+    map_views = after["map_views"]
+    for (year, provinces), view in views.items():
+        assert map_views.get(year, list(provinces)) is view
+    # Same rows as the round it was copied from, drawn fresh
+    for provinces in SELECTIONS:
+        view = map_views.get(NEW_ROUND, provinces)
+        assert view is not views[(last, tuple(provinces))]
+        assert view["z_codes"] == views[(last, tuple(provinces))]["z_codes"]
+
+    # Index_segment didn't change: the cube and its frame are the same objects
+    assert after["segment_cube"] is before["segment_cube"]
+    assert after["segments_data"] is before["segments_data"]
+
+
+def test_edited_round_rebuilds_only_its_views(live, source, sheets):
+    before = live.current()
+    views = warm_views(before)
+    edited_round = rounds(sheets["Index_score"])[1]
+    scores = sheets["Index_score"].copy()
+    scores.loc[(scores["Survey round"] == edited_round) & (scores["Province"] == "Alberta"), SCORE_COL] += 0.5
+
+    source.write({"Index_score": scores})
+    map_views = live.current()["map_views"]
+    for (year, provinces), view in views.items():
+        assert (map_views.get(year, list(provinces)) is view) == (year != edited_round), (year, provinces)
+
+
+def test_changed_segments_rebuild_the_cube(live, source, sheets):
+    before = live.current()
+    views = warm_views(before)
+    segments = sheets["Index_segment"]
+    source.write({"Index_segment": segments[segments["Survey round"] != rounds(segments)[0]]})
+
+    after = live.current()
+    assert after.changed == {"Index_score": [], "Index_segment": [rounds(segments)[0]]}
+    assert after["segment_cube"] is not before["segment_cube"]
+    assert rounds(segments)[0] not in after["segment_cube"].rounds_with_data()
+    for (year, provinces), view in views.items():
+        assert after["map_views"].get(year, list(provinces)) is view
+
+
+def test_identical_reload_keeps_the_snapshot(live, source, sheets):
+    before = live.current()
+    source.write(sheets)
+    assert source.signature() != live._signature
+    assert live.current() is before
+    assert live.current().token == before.token
+    assert live.refreshes == 1
+    # The new signature was taken: no further reloads for the same files
+    loads = source.loads
+    live.current()
+    assert source.loads == loads
+
+
+def test_failed_load_keeps_the_last_good_snapshot(live, source, sheets):
+    before = live.current()
+    source.fail_with = OSError("caught mid-write")
+    source.write({"Index_score": with_round(sheets["Index_score"], NEW_ROUND, rounds(sheets["Index_score"])[-1])})
+    assert live.current() is before
+    assert live.failed_refreshes == 1
+
+    # Retried on the next run, once the file reads again
+    source.fail_with = None
+    after = live.current()
+    assert after is not before and after.changed["Index_score"] == [NEW_ROUND]
+
+
+def test_watcher_survives_a_failed_load(live, source, sheets):
+    before = live.current()
+    # Not one of the errors current() expects: the watcher thread must log it and carry on
+    source.fail_with = RuntimeError("unexpected")
+    source.write({"Index_score": with_round(sheets["Index_score"], NEW_ROUND, rounds(sheets["Index_score"])[-1])})
+    live.start_watcher(interval=0.01)
+    deadline = time.monotonic() + 5
+    while source.loads < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert source.loads >= 3
+    assert live._snapshot is before
+
+    source.fail_with = None
+    while live._snapshot is before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live._snapshot is not before and live._snapshot.changed["Index_score"] == [NEW_ROUND]
@@ -0,0 +1,38 @@
+# Map figures take their framing from the precomputed province index.
+
+import pytest
+
+from data_store import survey_round_key
+from geo_pack import zoom_settings
+from map_views import ALL_PROVINCES, MapViewCache, map_figure, rounds_figure
+
+
+@pytest.fixture(scope="module")
+def map_views(sheets, geo_pack):
+    return MapViewCache(sheets["Index_score"], geo_pack)
+
+
+@pytest.fixture(scope="module")
+def year(sheets):
+    return max(sheets["Index_score"]["Survey round"].dropna().astype(str), key=survey_round_key)
+
+
+@pytest.mark.parametrize("provinces", [[ALL_PROVINCES], ["Alberta"], ["Alberta", "Manitoba"]])
+def test_map_is_framed_by_the_index(map_views, geo_pack, year, provinces):
+    view = map_views.get(year, provinces)
+    zoom = zoom_settings(geo_pack["provinces"], view["display_provinces"])
+    for fig in [map_figure(view, year), rounds_figure([(year, view)], year)]:
+        geo = fig.to_dict()["layout"]["geo"]
+        # fitbounds would replace the center and scale with its own fit
+        assert geo["fitbounds"] is False
+        assert geo["center"] == zoom["center"]
+        assert geo["projection"]["scale"] == zoom["projection_scale"]
+        assert [geo["lonaxis"]["range"], geo["lataxis"]["range"]] == [zoom["lonaxis_range"], zoom["lataxis_range"]]
+
+
+def test_zoom_scales_are_relative_to_the_country(geo_pack):
+    index = geo_pack["provinces"]
+    assert zoom_settings(index, list(index))["projection_scale"] == 1
+    single = zoom_settings(index, ["Prince Edward Island"])
+    pair = zoom_settings(index, ["Prince Edward Island", "Ontario"])
+    assert single["projection_scale"] > pair["projection_scale"] > 1
@@ -0,0 +1,104 @@
+# MicrodataEngine: the dense cube against the chunked row pass, and both
+# against a plain pandas groupby over the respondent rows.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import microdata
+from resilience_categories import SEGMENT_CATEGORIES, SCORE_THRESHOLDS
+
+QUERIES = [
+    ((), None),
+    (("Survey round",), None),
+    (("Province", "Survey round"), None),
+    (("Income",), {"Province": ["Alberta", "Manitoba"]}),
+    (("Age group", "Household type"), {"Survey round": ["October 2020", "February 2021"], "Income": ["$120k+"]}),
+    (("Survey round",), {"Province": ["Atlantis"]}),
+]
+
+
+@pytest.fixture(scope="module")
+def cube_engine(respondents):
+    engine = microdata.MicrodataEngine(respondents)
+    assert engine.cube is not None
+    return engine
+
+
+@pytest.fixture(scope="module")
+def row_engine(respondents):
+    # No cube, and chunks small enough that every query spans several
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(microdata, "MAX_CUBE_CELLS", 0)
+        mp.setattr(microdata, "CHUNK_ROWS", 4096)
+        engine = microdata.MicrodataEngine(respondents)
+        assert engine.cube is None
+        yield engine
+
+
+def normalized(result, by):
+    result = result.astype({dim: str for dim in by})
+    return result.sort_values(list(by)).reset_index(drop=True) if by else result.reset_index(drop=True)
+
+
+def reference(respondents, by, filters):
+    """The same numbers from a pandas groupby over the rows"""
+    df = respondents
+    for dim, labels in (filters or {}).items():
+        df = df[df[dim].isin(labels)]
+    df = df.dropna(subset=list(by))
+    weight = df[microdata.WEIGHT_COL].astype(float).fillna(0.0)
+    score = df[microdata.RESPONDENT_SCORE_COL].astype(float)
+    scored = score.notna()
+    segment = pd.cut(score, [-np.inf] + SCORE_THRESHOLDS + [np.inf], right=False, labels=SEGMENT_CATEGORIES)
+    frame = pd.DataFrame({
+        "Respondents": 1,
+        "Weight": weight,
+        "scored": weight.where(scored, 0.0),
+        "weighted": (weight * score).where(scored, 0.0),
+    })
+    for seg in SEGMENT_CATEGORIES:
+        frame[seg] = weight.where(segment == seg, 0.0)
+    keys = [df[dim].astype(str) for dim in by] or [np.zeros(len(df), dtype=int)]
+    sums = frame.groupby(keys).sum()
+    out = pd.DataFrame({
+        "Respondents": sums["Respondents"].astype(np.int64),
+        "Weight": sums["Weight"],
+        microdata.SCORE_COL: sums["weighted"] / sums["scored"],
+    })
+    for seg in SEGMENT_CATEGORIES:
+        out[seg] = sums[seg] / sums["scored"]
+    out = out.reset_index(drop=not by)
+    return normalized(out, by)
+
+
+@pytest.mark.parametrize("by, filters", QUERIES)
+def test_cube_matches_row_path(cube_engine, row_engine, by, filters):
+    pd.testing.assert_frame_equal(
+        normalized(cube_engine.aggregate(by, filters), by),
+        normalized(row_engine.aggregate(by, filters), by),
+        rtol=1e-9
+    )
+
+
+@pytest.mark.parametrize("by, filters", QUERIES)
+def test_matches_pandas_groupby(cube_engine, respondents, by, filters):
+    expected = reference(respondents, by, filters)
+    got = normalized(cube_engine.aggregate(by, filters), by)
+    if expected.empty:
+        assert got.empty
+        return
+    pd.testing.assert_frame_equal(got, expected, rtol=1e-9, check_dtype=False)
+
+
+def test_dashboard_sheets_layout(cube_engine):
+    sheets = cube_engine.dashboard_sheets()
+    national = cube_engine.aggregate(("Survey round",))
+    scores = sheets["Index_score"]
+    canada = scores[scores["Province"].isna()]
+    assert canada["Survey round"].astype(str).tolist() == national["Survey round"].astype(str).tolist()
+    assert canada[microdata.SCORE_COL].tolist() == pytest.approx(national[microdata.SCORE_COL].tolist())
+    shares = sheets["Index_segment"].groupby(
+        [sheets["Index_segment"]["Province"].astype(str), sheets["Index_segment"]["Survey round"].astype(str)]
+    )["Proportion"].sum()
+    assert shares.to_numpy() == pytest.approx(1.0)
@@ -0,0 +1,57 @@
+# categorize_scores() against the per-province score_code() loop the map used before.
+
+import pandas as pd
+
+from resilience_categories import categorize_scores, category_labels
+
+SCORE_COL = "Mean Financial Resilience Score"
+
+
+def score_code(val):
+    if pd.isna(val) or val == -1:
+        return -1
+    elif val < 30:
+        return 0
+    elif val < 50:
+        return 1
+    elif val < 70:
+        return 2
+    else:
+        return 3
+
+
+def reference(display_provinces, filtered_map):
+    z_codes, hover_labels = [], []
+    for prov in display_provinces:
+        row = filtered_map[filtered_map['Province'] == prov]
+        if not row.empty:
+            val = row[SCORE_COL].values[0]
+            code = score_code(val)
+            label = f"{prov}<br>Score: {val if not (pd.isna(val) or val==-1) else 'No Data'}<br>{category_labels[code]}"
+        else:
+            code = -1
+            label = f"{prov}<br>No Data"
+        z_codes.append(code)
+        hover_labels.append(label)
+    return z_codes, hover_labels
+
+
+def test_matches_per_province_loop(sheets):
+    scores = sheets["Index_score"]
+    provinces = sorted(scores["Province"].dropna().astype(str).unique())
+    for year in scores["Survey round"].cat.categories:
+        filtered_map = scores[scores["Survey round"] == year]
+        # A province without a row, and one dropped from this round
+        display = provinces[1:] + ["Atlantis"]
+        filtered_map = filtered_map[filtered_map["Province"] != provinces[2]]
+
+        categories = categorize_scores(display, filtered_map)
+        z_codes, hover_labels = reference(display, filtered_map)
+        assert categories["code"].tolist() == z_codes
+        assert categories["hover"].tolist() == hover_labels
+        assert categories["label"].tolist() == [category_labels[c] for c in z_codes]
+
+
+def test_thresholds_are_lower_bounds():
+    table = pd.DataFrame({"Province": list("abcdefg"), SCORE_COL: [0, 29.99, 30, 49.9, 50, 70, 100]})
+    assert categorize_scores(list("abcdefg"), table)["code"].tolist() == [0, 0, 1, 1, 2, 3, 3]
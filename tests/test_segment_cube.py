@@ -0,0 +1,89 @@
+# SegmentCube slices against the boolean filters, pivot_table and groupby the
+# segments dashboard used before.
+
+import pandas as pd
+import pytest
+
+from dashboard_data import CANADA, clean_segments
+from resilience_categories import SEGMENT_CATEGORIES
+from segment_cube import SegmentCube
+
+
+@pytest.fixture(scope="module")
+def segments_data(sheets):
+    return clean_segments(sheets["Index_segment"]).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def cube(segments_data):
+    return SegmentCube(segments_data)
+
+
+def selections(cube):
+    rounds, provinces = cube.rounds, [p for p in cube.provinces if p != CANADA]
+    return [
+        (rounds[-1:], [CANADA], SEGMENT_CATEGORIES),
+        (rounds[-1:], None, SEGMENT_CATEGORIES),
+        (rounds[-3:], provinces[:3], SEGMENT_CATEGORIES),
+        (rounds, [CANADA] + provinces[2:5], SEGMENT_CATEGORIES[1:3]),
+        (rounds[:2], provinces, SEGMENT_CATEGORIES[:1]),
+        (rounds[:1] + ["June 1999"], provinces[:2] + ["Atlantis"], SEGMENT_CATEGORIES),
+    ]
+
+
+def reference_filter(data, years, provinces, segments):
+    filtered = data[data['Survey round'].isin(years) & data['Index segments'].isin(segments)]
+    if provinces:
+        filtered = filtered[filtered['Province'].isin(provinces)]
+    return filtered
+
+
+def test_frame_matches_boolean_filter(cube, segments_data):
+    for selection in selections(cube):
+        pd.testing.assert_frame_equal(cube.frame(*selection), reference_filter(segments_data, *selection))
+
+
+def test_summary_numbers_match_groupby(cube, segments_data):
+    for selection in selections(cube):
+        filtered = reference_filter(segments_data, *selection)
+        assert cube.record_count(*selection) == len(filtered)
+        assert set(cube.rounds_with_data(*selection)) == set(filtered['Survey round'].astype(str).unique())
+        assert set(cube.provinces_with_data(*selection)) == set(filtered['Province'].astype(str).unique())
+
+        expected = filtered.groupby(filtered['Index segments'].astype(str))['Proportion'].mean()
+        means = cube.segment_means(*selection)
+        pd.testing.assert_series_equal(means.sort_index(), expected.sort_index(), check_names=False)
+
+
+def test_pivot_matches_pivot_table(cube, segments_data):
+    for years, provinces, segments in selections(cube):
+        for year in years:
+            bar_data = reference_filter(segments_data, [year], provinces, segments)
+            bar_data = bar_data.astype({"Province": str, "Index segments": str})
+            expected = bar_data.pivot_table(
+                index='Index segments',
+                columns='Province',
+                values='Proportion',
+                aggfunc='mean'
+            )
+            table = cube.pivot(year, provinces, segments)
+            if expected.empty:
+                assert table.empty
+                continue
+            pd.testing.assert_frame_equal(table, expected, check_names=False)
+
+
+def test_pie_data_matches_groupby_sum(cube, segments_data):
+    order = {seg: i for i, seg in enumerate(SEGMENT_CATEGORIES)}
+    combinations = [(y, p) for y in cube.rounds for p in cube.provinces] + [("June 1999", CANADA)]
+    pie_data = cube.pie_data(combinations)
+    for year, prov in combinations:
+        all_rows = segments_data[(segments_data["Survey round"] == year) & (segments_data["Province"] == prov)]
+        expected = (
+            all_rows.groupby(all_rows["Index segments"].astype(str), as_index=False)["Proportion"]
+            .sum()
+            .sort_values("Index segments", key=lambda s: s.map(order))
+        )
+        got = pie_data[(year, prov)]
+        assert got["Index segments"].tolist() == expected["Index segments"].tolist()
+        assert got["Proportion"].tolist() == pytest.approx(expected["Proportion"].tolist())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Offline warm-up of the prebuilt figure store (figure_store.py).
+#
+# Most traffic lands on a handful of views: the latest round with all provinces
+# on the map, and Canada (Overall) with all segments for each chart type. This
+# runs both dashboards headlessly (streamlit.testing.v1.AppTest) through the
+# top-K selections of each, with FRI_FIGURE_CAPTURE=1 so every figure the apps
+# draw is written under <store>/figures/<data version>/<app>/, keyed by the
+# selection exactly as the apps look it up. Uncommon selections keep being
+# drawn live. Figures of older data versions are pruned at the end.
+#
+#     python warm_figures.py                 # top 50 selections per app
+#     python warm_figures.py --top-k 200 --apps dashboard_segments.py
+#
+# Run from the directory the apps run from, after the data store is built;
+# deploy.py calls this as part of its build.
+
+import argparse
+import os
+import sys
+import time
+
+import data_store
+import figure_store
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APPS = ["dashboard_index_score.py", "dashboard_segments.py"]
+# The multipage app (app.py) draws exactly the figures of its pages
+PAGES = {"app.py": APPS}
+DEFAULT_TOP_K = 50
+CHART_TYPES = ["Pie chart", "Bar chart", "Trended line chart"]
+ALL_PROVINCES = "All provinces"
+CANADA = "Canada (Overall)"
+
+
+# ─────────────────────────── Selections, most common first ───────────────────────────
+
+def index_score_selections(years, provinces, default_year):
+    """
+    (survey round, provinces): the page's default round and every other round
+    (newest first) with all provinces, then single provinces in those rounds
+    """
+    rounds = [default_year] + list(reversed(years))
+    selections = [(year, [ALL_PROVINCES]) for year in rounds]
+    selections += [(year, [province]) for year in rounds for province in provinces]
+    return selections
+
+
+def segments_selections(years, provinces):
+    """(chart type, rounds, locations), Canada-wide views before provincial ones"""
+    latest = years[-1:]
+    tiers = [
+        [(latest, [CANADA])],                                    # first page load / "Latest Round"
+        [(years, [CANADA])],                                     # "All Time"
+        [(years[-3:], [CANADA])],
+        [([year], [CANADA]) for year in reversed(years[:-1])],
+        [(latest, [CANADA] + provinces)],                        # "All Provinces"
+        [(latest, [province]) for province in provinces],
+    ]
+    # Each tier for every chart type before moving on to the next tier
+    return [(chart_type, list(y), list(p)) for tier in tiers for y, p in tier for chart_type in CHART_TYPES]
+
+
+def top_k(selections, k):
+    seen, unique = set(), []
+    for selection in selections:
+        key = repr(selection)
+        if key not in seen:
+            seen.add(key)
+            unique.append(selection)
+    return unique[:k]
+
+
+# ─────────────────────────────── Drivers ───────────────────────────────
+
+def _run(at, timeout):
+    at.run(timeout=timeout)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def warm_index_score(at, k, timeout):
+    default_year = at.sidebar.selectbox[0].value
+    years = sorted(at.sidebar.selectbox[0].options, key=data_store.survey_round_key)
+    provinces = [p for p in at.sidebar.multiselect[0].options if p != ALL_PROVINCES]
+    selections = top_k(index_score_selections(years, provinces, default_year), k)
+    for year, selected in selections:
+        at.sidebar.selectbox[0].set_value(year)
+        at.sidebar.multiselect[0].set_value(selected)
+        _run(at, timeout)
+    # The animated map (every round in one figure) as it first opens
+    at.sidebar.selectbox[0].set_value(default_year)
+    at.sidebar.multiselect[0].set_value([ALL_PROVINCES])
+    at.toggle(key="animate_rounds").set_value(True)
+    _run(at, timeout)
+    return len(selections) + 1
+
+
+def warm_segments(at, k, timeout):
+    # Same order as the year filter's options, so "All Time" keys match the preset
+    years = list(at.multiselect(key="year_filter").options)
+    provinces = [p for p in at.multiselect(key="province_filter").options if p != CANADA]
+    selections = top_k(segments_selections(years, provinces), k)
+    for chart_type, year_sel, province_sel in selections:
+        at.sidebar.radio[0].set_value(chart_type)
+        at.multiselect(key="year_filter").set_value(year_sel)
+        at.multiselect(key="province_filter").set_value(province_sel)
+        at.multiselect(key="segment_multiselect").set_value(["All Segments"])
+        _run(at, timeout)
+    return len(selections)
+
+
+DRIVERS = {
+    "dashboard_index_score.py": warm_index_score,
+    "dashboard_segments.py": warm_segments,
+}
+
+
+def warm(apps=APPS, k=DEFAULT_TOP_K, timeout=120):
+    """Render the top-k selections of each app into the figure store; returns {app: selections run}"""
+    from streamlit.testing.v1 import AppTest
+
+    started = time.time()
+    previous = os.environ.get(figure_store.CAPTURE_ENV)
+    os.environ[figure_store.CAPTURE_ENV] = "1"
+    apps = list(dict.fromkeys(page for app in apps for page in PAGES.get(app, [app])))
+    counts = {}
+    try:
+        for app in apps:
+            at = AppTest.from_file(os.path.join(REPO_DIR, app), default_timeout=timeout)
+            _run(at, timeout)
+            counts[app] = DRIVERS[app](at, k, timeout)
+    finally:
+        if previous is None:
+            os.environ.pop(figure_store.CAPTURE_ENV, None)
+        else:
+            os.environ[figure_store.CAPTURE_ENV] = previous
+    # App directories under figures/ are named after the app, without "dashboard_"/".py"
+    names = {app.replace("dashboard_", "").replace(".py", "") for app in apps}
+    figure_store.prune(started, apps=names)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render figure JSON for the most common dashboard selections.")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Selections rendered per app")
+    parser.add_argument("--apps", nargs="+", default=APPS, choices=APPS + list(PAGES))
+    parser.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_DIR)
+    started = time.perf_counter()
+    counts = warm(args.apps, args.top_k, args.timeout)
+    for app, n in counts.items():
+        print(f"{app}: {n} selections rendered")
+    print(f"figure store: {os.path.join(data_store.STORE_DIR, figure_store.FIGURES_DIR)} "
+          f"({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()